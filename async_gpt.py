@@ -0,0 +1,160 @@
+import asyncio
+import time
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from loguru import logger
+
+from gpt import GPT
+
+
+class AsyncGPT(GPT):
+    """
+    asyncio counterpart of `GPT` built on an `AsyncOpenAI` client.
+
+    The prompts, request payloads and `cause_mapper` are shared with `GPT`;
+    only the calls to the model are awaited. Documents are processed
+    concurrently with `process_many`, so throughput is bounded by the
+    provider's limits rather than by the latency of a single request.
+    """
+
+    async def _complete(
+        self, field: str, request: dict, claims_type: str | None = None
+    ) -> str:
+        if self.router is None:
+            return await self._send(field, request)
+
+        models = self.router.models(field, request["model"])
+        for level, model in enumerate(models):
+            content = await self._send(field, {**request, "model": model})
+            valid = self._is_valid(field, content, claims_type)
+            if valid or level == len(models) - 1:
+                self.router.record(field, level, valid)
+                return content
+            logger.info(f"Invalid {field} answer from {model}, escalating")
+
+    async def _send(self, field: str, request: dict) -> str:
+        start = time.perf_counter()
+        if self.cache is not None:
+            content = self.cache.get(field, request)
+            if content is not None:
+                self._record_call(field, request, start, cache_hit=True)
+                return content
+
+        if self.rate_limiter is not None:
+            response = await self.rate_limiter.call_async(
+                request, lambda: self.client.chat.completions.create(**request)
+            )
+        else:
+            response = await self.client.chat.completions.create(**request)
+        content = response.choices[0].message.content
+        self._record_call(field, request, start, response=response)
+
+        # a refusal has no content and must not be served from the cache later
+        if self.cache is not None and content is not None:
+            self.cache.put(field, request, content)
+
+        return content
+
+    async def _resolve_claims_type(self, document: str) -> str | None:
+        try:
+            return self._normalize_claims_type(await self.get_claims_type(document))
+        except ValueError:
+            return None
+
+    async def get_claims_type(self, document: str) -> str:
+        content = await self._complete("type", self.claims_type_request(document))
+
+        return self._parse_answer(content)
+
+    async def get_cause(self, document: str, claims_type: str) -> str:
+        request = self.cause_request(document, claims_type)
+        if request is None:
+            return None
+
+        content = await self._complete("cause", request, claims_type=claims_type)
+
+        return self._parse_answer(content)
+
+    async def get_notifier(self, document: str) -> str:
+        content = await self._complete("notifier", self.notifier_request(document))
+
+        return self._parse_answer(content)
+
+    async def get_claims_date(self, document: str) -> str:
+        content = await self._complete("date", self.claims_date_request(document))
+
+        return self._parse_date(content)
+
+    async def get_claims_objekt(self, document: str) -> str:
+        content = await self._complete(
+            "objekt", self.claims_objekt_request(document)
+        )
+
+        return self._parse_answer(content)
+
+    async def get_fused(self, document: str, resolved: dict | None = None) -> dict:
+        if resolved and self._fully_resolved(resolved):
+            return self._fused_result(None, resolved)
+        content = await self._complete("fused", self.fused_request(document))
+
+        return self._fused_result(content, resolved)
+
+    async def fde_first_notification_of_loss(
+        self, document: str, resolved: dict | None = None
+    ) -> dict:
+        """
+        Awaitable version of `GPT.fde_first_notification_of_loss`.
+
+        Returns the same result dict with the keys type, cause, notifier,
+        date and objekt. Independent fields are always awaited concurrently,
+        and the cause is requested as soon as the type is known.
+        """
+        resolved = self._resolved_fields(document, resolved)
+        if self.fused:
+            return await self.get_fused(document, resolved)
+
+        fields = await self.field_graph.run_async(
+            self._field_tasks(document),
+            resolved=resolved,
+        )
+
+        return self._assemble_result(fields)
+
+    async def process_many(
+        self,
+        documents: Iterable[Tuple[str, str]],
+        max_concurrency: int = 8,
+        on_result: Optional[Callable[[dict], None]] = None,
+    ) -> List[dict]:
+        """
+        Process many documents concurrently.
+
+        Args:
+            documents: Iterable of (doc_id, text) pairs.
+            max_concurrency: Maximum number of documents in flight at once.
+            on_result: Called with each result as soon as its document is
+                finished, e.g. `Checkpoint.write`.
+
+        Returns:
+            One result dict per document, in input order, each carrying its
+            doc_id.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def process(doc_id: str, document: str) -> dict:
+            async with semaphore:
+                result = await self.fde_first_notification_of_loss(document)
+
+            result = {**result, "doc_id": doc_id}
+            if on_result is not None:
+                on_result(result)
+
+            return result
+
+        tasks = [process(doc_id, document) for doc_id, document in documents]
+        logger.info(
+            f"Processing {len(tasks)} documents with "
+            f"max_concurrency={max_concurrency}"
+        )
+
+        return await asyncio.gather(*tasks)
@@ -0,0 +1,205 @@
+import json
+import time
+from typing import Dict, Iterable, List, Tuple
+
+import pandas as pd
+from loguru import logger
+
+from gpt import GPT
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+FINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+class BatchRunner:
+    """
+    Runs the FNOL extraction for a whole DataFrame through the OpenAI Batch API.
+
+    The requests are exactly the ones `GPT`'s field methods would send. Since
+    the cause prompt depends on the claims type, a run has two rounds: the
+    first asks for type, objekt, notifier and date of every document, the
+    second asks for the cause of every document whose type has causes.
+    Results are matched back to doc_id and field through the custom_id of
+    each request line.
+
+    Attributes:
+        gpt (GPT): Provides the request payloads, answer parsing and
+            `cause_mapper`. Its client must expose the files and batches
+            endpoints.
+        poll_interval (float): Seconds between two status checks of a batch.
+        completion_window (str): Completion window requested for each batch.
+        max_requests_per_batch (int): Request lines per submitted batch file.
+    """
+
+    def __init__(
+        self,
+        gpt: GPT,
+        poll_interval: float = 60.0,
+        completion_window: str = "24h",
+        max_requests_per_batch: int = 50_000,
+    ):
+        self.gpt = gpt
+        self.client = gpt.client
+        self.poll_interval = poll_interval
+        self.completion_window = completion_window
+        self.max_requests_per_batch = max_requests_per_batch
+
+    @staticmethod
+    def custom_id(doc_id: str, field: str) -> str:
+        return f"{doc_id}::{field}"
+
+    @staticmethod
+    def parse_custom_id(custom_id: str) -> Tuple[str, str]:
+        doc_id, field = custom_id.rsplit("::", 1)
+
+        return doc_id, field
+
+    def _line(self, doc_id: str, field: str, request: dict) -> dict:
+        return {
+            "custom_id": self.custom_id(doc_id, field),
+            "method": "POST",
+            "url": BATCH_ENDPOINT,
+            "body": request,
+        }
+
+    def build_requests(self, df: pd.DataFrame) -> List[dict]:
+        """Build the first-round request lines for every document in `df`."""
+        builders = {
+            "type": self.gpt.claims_type_request,
+            "objekt": self.gpt.claims_objekt_request,
+            "notifier": self.gpt.notifier_request,
+            "date": self.gpt.claims_date_request,
+        }
+
+        return [
+            self._line(str(doc_id), field, build(text))
+            for doc_id, text in zip(df["doc_id"], df["text"])
+            for field, build in builders.items()
+        ]
+
+    def build_cause_requests(
+        self, df: pd.DataFrame, claims_types: Dict[str, str | None]
+    ) -> List[dict]:
+        """Build the second-round cause request lines for the resolved types."""
+        lines = []
+        for doc_id, text in zip(df["doc_id"], df["text"]):
+            doc_id = str(doc_id)
+            request = self.gpt.cause_request(text, claims_types.get(doc_id))
+            if request is not None:
+                lines.append(self._line(doc_id, "cause", request))
+
+        return lines
+
+    def submit(self, lines: List[dict]) -> str:
+        """Upload the request lines as a JSONL file and create a batch."""
+        payload = "\n".join(json.dumps(line, ensure_ascii=False) for line in lines)
+        input_file = self.client.files.create(
+            file=("batch_requests.jsonl", payload.encode("utf-8")),
+            purpose="batch",
+        )
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window=self.completion_window,
+        )
+        logger.info(f"Submitted batch {batch.id} with {len(lines)} requests")
+
+        return batch.id
+
+    def wait(self, batch_id: str):
+        """Poll a batch until it reaches a final status and return it."""
+        while True:
+            batch = self.client.batches.retrieve(batch_id)
+            if batch.status in FINAL_STATUSES:
+                logger.info(f"Batch {batch_id} finished with status {batch.status}")
+                return batch
+            logger.info(f"Batch {batch_id} is {batch.status}")
+            time.sleep(self.poll_interval)
+
+    def _read_jsonl(self, file_id: str | None) -> Iterable[dict]:
+        if not file_id:
+            return []
+        content = self.client.files.content(file_id).text
+
+        return [json.loads(line) for line in content.splitlines() if line.strip()]
+
+    def fetch_results(self, batch) -> Dict[Tuple[str, str], str]:
+        """
+        Read the output of a finished batch.
+
+        Returns:
+            Mapping of (doc_id, field) to the message content of each
+            successful request. Failed requests are logged and left out.
+        """
+        results = {}
+        for line in self._read_jsonl(batch.output_file_id):
+            key = self.parse_custom_id(line["custom_id"])
+            response = line.get("response") or {}
+            if line.get("error") or response.get("status_code") != 200:
+                logger.warning(f"Request {line['custom_id']} failed: {line.get('error')}")
+                continue
+            results[key] = response["body"]["choices"][0]["message"]["content"]
+
+        errors = self._read_jsonl(batch.error_file_id)
+        if errors:
+            logger.warning(f"Batch {batch.id} reported {len(errors)} failed requests")
+
+        return results
+
+    def _run_round(self, lines: List[dict]) -> Dict[Tuple[str, str], str]:
+        batch_ids = [
+            self.submit(lines[start:start + self.max_requests_per_batch])
+            for start in range(0, len(lines), self.max_requests_per_batch)
+        ]
+        results = {}
+        for batch_id in batch_ids:
+            results.update(self.fetch_results(self.wait(batch_id)))
+
+        return results
+
+    def _parse(self, field: str, content: str | None):
+        if content is None:
+            return None
+        try:
+            if field == "type":
+                return self.gpt._normalize_claims_type(self.gpt._parse_answer(content))
+            if field == "date":
+                return self.gpt._parse_date(content)
+            return self.gpt._parse_answer(content)
+        except (ValueError, IndexError) as e:
+            logger.warning(f"Unparseable {field} answer: {e}")
+            return None
+
+    def run(self, df: pd.DataFrame) -> List[dict]:
+        """
+        Extract all FNOL fields for every document in `df` via the Batch API.
+
+        Args:
+            df: DataFrame with the columns doc_id and text.
+
+        Returns:
+            One result dict per document, in the order of `df`, with the same
+            keys as `GPT.fde_first_notification_of_loss` plus doc_id.
+        """
+        doc_ids = [str(doc_id) for doc_id in df["doc_id"]]
+        first_round = self._run_round(self.build_requests(df))
+
+        claims_types = {
+            doc_id: self._parse("type", first_round.get((doc_id, "type")))
+            for doc_id in doc_ids
+        }
+        second_round = self._run_round(self.build_cause_requests(df, claims_types))
+        answers = {**first_round, **second_round}
+
+        results = []
+        for original_doc_id, doc_id in zip(df["doc_id"], doc_ids):
+            fields = {
+                field: self._parse(field, answers.get((doc_id, field)))
+                for field in ("cause", "objekt", "notifier", "date")
+            }
+            fields["type"] = claims_types[doc_id]
+            results.append(
+                {**self.gpt._assemble_result(fields), "doc_id": original_doc_id}
+            )
+
+        return results
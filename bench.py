@@ -0,0 +1,460 @@
+import argparse
+import asyncio
+import functools
+import json
+import multiprocessing
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Tuple
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+from openai import OpenAI
+
+from async_gpt import AsyncGPT
+from batch import BatchRunner
+from clients import ClientConfig, ClientFactory
+from evaluation import group_sd_urs_art
+from gpt import GPT
+from mock_openai import MockOpenAI, constant_latency, lognormal_latency
+from parallel import ProcessRunner, write_document_store
+from rate_limiter import ModelLimits, RateLimiter
+
+DOCUMENT = (
+    "Sehr geehrte Damen und Herren, gestern hat ein Sturm das Dach unseres "
+    "Hauses beschädigt. Mit freundlichen Grüßen"
+)
+DOCUMENTS = [
+    DOCUMENT,
+    "Eingangszeitpunkt: 08.04.2024 09:29:49\nSehr geehrte Damen und Herren, "
+    "unser gemeinsamer Kunde informierte mich über einen Fahrraddiebstahl.",
+    "Hiermit melde ich einen Leitungswasserschaden. Am 12.02.2024 ist in der "
+    "Küche ein Rohr geplatzt und der Boden ist durchnässt.",
+]
+# cold import budgets in milliseconds for the inference-only modules
+IMPORT_BUDGETS_MS = {"gpt": 250, "async_gpt": 250}
+# heavy dependencies the inference path must not import
+EVALUATION_ONLY_MODULES = ("pandas", "numpy", "pyarrow", "sklearn")
+# generous limits, so the benchmark measures the pipeline and not the pacing
+BENCH_LIMITS = ModelLimits(requests_per_minute=600_000, tokens_per_minute=10**9)
+
+
+def _documents(count: int) -> List[str]:
+    return [f"{DOCUMENTS[i % len(DOCUMENTS)]}\nVorgang {i}" for i in range(count)]
+
+
+def _peak_rss_mb() -> float:
+    """High-water mark of the resident memory of this process.
+
+    The mark never drops, so it is only the memory of one benchmark when
+    that benchmark runs in its own process, see `_isolated`.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def _report(documents: int, seconds: float, latencies: List[float] | None = None) -> dict:
+    report = {
+        "documents": documents,
+        "seconds": seconds,
+        "docs_per_sec": documents / seconds,
+    }
+    if latencies:
+        for q, value in zip((50, 95, 99), np.percentile(latencies, (50, 95, 99))):
+            report[f"latency_p{q}"] = float(value)
+    report["peak_rss_mb"] = _peak_rss_mb()
+
+    return report
+
+
+def _quiet():
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+
+def _isolated(benchmark: Callable[..., dict], *args, **kwargs) -> dict:
+    """
+    Run a benchmark in a freshly spawned interpreter and return its report.
+
+    `ru_maxrss` is a high-water mark per process, so benchmarks sharing one
+    process would all report the largest peak so far. A spawned process
+    starts from a bare interpreter, so every peak_rss_mb is the benchmark's
+    own. Arguments must be picklable, e.g. the mock's base_url.
+    """
+    with ProcessPoolExecutor(
+        max_workers=1,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_quiet,
+    ) as executor:
+        return executor.submit(benchmark, *args, **kwargs).result()
+
+
+def _rate_limiter() -> RateLimiter:
+    limits = {
+        model: BENCH_LIMITS
+        for model in ("gpt-4-turbo", "gpt-3.5-turbo-0125", "gpt-4o-2024-08-06")
+    }
+
+    return RateLimiter(limits)
+
+
+def bench_sync(base_url: str, documents: List[str], parallel: bool = False) -> dict:
+    """`GPT.fde_first_notification_of_loss` one document after another."""
+    clients = ClientFactory(
+        ClientConfig(max_retries=0), api_key="bench", base_url=base_url
+    )
+    with clients:
+        gpt = GPT(clients.openai(), parallel=parallel, rate_limiter=_rate_limiter())
+        latencies = []
+        start = time.perf_counter()
+        for document in documents:
+            document_start = time.perf_counter()
+            gpt.fde_first_notification_of_loss(document)
+            latencies.append(time.perf_counter() - document_start)
+
+        return _report(len(documents), time.perf_counter() - start, latencies)
+
+
+def bench_async(base_url: str, documents: List[str], max_concurrency: int = 32) -> dict:
+    """`AsyncGPT` with up to `max_concurrency` documents in flight."""
+    latencies = []
+
+    async def run():
+        clients = ClientFactory(
+            ClientConfig(max_retries=0), api_key="bench", base_url=base_url
+        )
+        gpt = AsyncGPT(clients.async_openai(), rate_limiter=_rate_limiter())
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def process(document: str):
+            async with semaphore:
+                document_start = time.perf_counter()
+                await gpt.fde_first_notification_of_loss(document)
+                latencies.append(time.perf_counter() - document_start)
+
+        await asyncio.gather(*(process(document) for document in documents))
+        await clients.aclose()
+
+    start = time.perf_counter()
+    asyncio.run(run())
+
+    return _report(len(documents), time.perf_counter() - start, latencies)
+
+
+def _bench_async_gpt(base_url: str) -> AsyncGPT:
+    """`ProcessRunner` worker factory; module level, so it can be pickled."""
+    clients = ClientFactory(ClientConfig(max_retries=0), api_key="bench", base_url=base_url)
+
+    return AsyncGPT(clients.async_openai(), rate_limiter=_rate_limiter())
+
+
+def bench_processes(
+    base_url: str,
+    documents: List[str],
+    process_counts: Tuple[int, ...] = (1, 2, 4),
+    max_concurrency: int = 4,
+) -> dict:
+    """
+    `ProcessRunner` throughput per number of worker processes.
+
+    Every worker keeps `max_concurrency` documents in flight, so throughput
+    should grow with the processes until the mock or the CPUs saturate;
+    the client libraries cost a few milliseconds of CPU per call, so on one
+    core it stays flat. The time includes starting the pool.
+
+    Returns:
+        Report per process count, keyed 'fnol_processes_<n>'.
+    """
+    df = pd.DataFrame({"doc_id": [str(i) for i in range(len(documents))], "text": documents})
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        store = write_document_store(df, os.path.join(directory, "documents.arrow"))
+        for processes in process_counts:
+            runner = ProcessRunner(
+                functools.partial(_bench_async_gpt, base_url),
+                processes=processes,
+                chunk_size=max(1, len(documents) // (processes * 2)),
+                normalize=False,
+                max_concurrency=max_concurrency,
+            )
+            start = time.perf_counter()
+            runner.run(store)
+            results[f"fnol_processes_{processes}"] = {
+                **_report(len(documents), time.perf_counter() - start),
+                "processes": processes,
+                "cpu_count": os.cpu_count(),
+            }
+
+    return results
+
+
+def bench_batch(base_url: str, documents: List[str]) -> dict:
+    """The two-round Batch API path of `BatchRunner`."""
+    df = pd.DataFrame(
+        {"doc_id": [str(i) for i in range(len(documents))], "text": documents}
+    )
+    with ClientFactory(api_key="bench", base_url=base_url) as clients:
+        runner = BatchRunner(GPT(clients.openai()), poll_interval=0.0)
+        start = time.perf_counter()
+        runner.run(df)
+
+        return _report(len(documents), time.perf_counter() - start)
+
+
+def bench_group_sd_urs_art(rows: int = 200_000, repeats: int = 3, seed: int = 1) -> dict:
+    """`group_sd_urs_art` on synthetic labels of all claim types, best of `repeats`."""
+    rng = random.Random(seed)
+    values = {
+        "LW": ["0", "2", "21", "4", "9"],
+        "ST": ["10", "19", "1", "4", "45"],
+        "EL": ["2", "21", "3"],
+        "ED": ["70", "79", "7", "71"],
+        "GL": ["9", "09", "11", "12"],
+        "FE": ["6", "9", "61"],
+        "VK": [51, 562, 564, 57],
+        "TK": [77, 741, 742, 782, 751, 71, 793],
+    }
+    types = [rng.choice(list(values)) for _ in range(rows)]
+    df = pd.DataFrame(
+        {
+            "sd_typ_kennung": types,
+            "schaden_objekt": [rng.choice(["GL", "HR", "WG", "KF"]) for _ in range(rows)],
+            "sd_urs_art": [rng.choice(values[t]) for t in types],
+        }
+    )
+    seconds = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        group_sd_urs_art(df)
+        seconds.append(time.perf_counter() - start)
+
+    return _report(rows, min(seconds))
+
+
+def bench_connection_reuse(documents: int = 200) -> dict:
+    """
+    Compare a new client per document with clients from a shared pool.
+
+    Both variants run `fde_first_notification_of_loss` over `documents`
+    documents against a local `MockOpenAI`, so the difference is the cost of
+    building clients and setting up connections.
+
+    Returns:
+        Seconds and accepted connections per variant.
+    """
+    report = {}
+    with MockOpenAI() as mock:
+        start = time.perf_counter()
+        for _ in range(documents):
+            gpt = GPT(client=OpenAI(api_key="bench", base_url=mock.base_url))
+            gpt.fde_first_notification_of_loss(DOCUMENT)
+            gpt.client.close()
+        report["client_per_document"] = {
+            "seconds": time.perf_counter() - start,
+            "connections": mock.connections,
+        }
+
+        connections = mock.connections
+        start = time.perf_counter()
+        with ClientFactory(ClientConfig(), api_key="bench", base_url=mock.base_url) as clients:
+            for _ in range(documents):
+                gpt = GPT(client=clients.openai())
+                gpt.fde_first_notification_of_loss(DOCUMENT)
+        report["shared_pool"] = {
+            "seconds": time.perf_counter() - start,
+            "connections": mock.connections - connections,
+        }
+
+    return report
+
+
+def import_time_ms(module: str, repeats: int = 5) -> Tuple[float, List[str]]:
+    """
+    Cumulative import time of `module` in a fresh interpreter, best of `repeats`.
+
+    Measured with `python -X importtime`, so it includes the module's own
+    imports but not interpreter startup.
+
+    Returns:
+        Milliseconds and the evaluation-only modules that were imported.
+    """
+    best, imported = float("inf"), set()
+    for _ in range(repeats):
+        stderr = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stderr
+        for line in stderr.splitlines():
+            if not line.startswith("import time:") or "|" not in line:
+                continue
+            _, cumulative, name = line.split("|")
+            name = name.strip()
+            if name.split(".")[0] in EVALUATION_ONLY_MODULES:
+                imported.add(name.split(".")[0])
+            if name == module:
+                best = min(best, int(cumulative) / 1000)
+
+    return best, sorted(imported)
+
+
+def check_import_budgets(budgets: dict = IMPORT_BUDGETS_MS) -> List[str]:
+    """Modules over their import budget or pulling in evaluation-only dependencies."""
+    violations = []
+    for module, budget in budgets.items():
+        milliseconds, imported = import_time_ms(module)
+        logger.warning(f"import {module}: {milliseconds:.1f} ms (budget {budget} ms)")
+        if milliseconds > budget:
+            violations.append(f"import {module} took {milliseconds:.1f} ms > {budget} ms")
+        if imported:
+            violations.append(f"import {module} imports {', '.join(imported)}")
+
+    return violations
+
+
+def run_suite(
+    documents: int = 200,
+    latency: Callable[[], float] | None = None,
+    rate_limit_rate: float = 0.02,
+) -> dict:
+    """
+    Run all benchmarks against a fresh `MockOpenAI`, each in its own process.
+
+    Args:
+        documents: Documents per pipeline benchmark.
+        latency: Latency distribution of the mock; lognormal around 50 ms by
+            default.
+        rate_limit_rate: Share of completions the mock rejects with 429.
+
+    Returns:
+        Report per benchmark with docs_per_sec, latency quantiles where they
+        apply, and the peak resident memory of the benchmark's process.
+    """
+    random.seed(0)
+    texts = _documents(documents)
+    results = {}
+    with MockOpenAI(
+        latency=latency or lognormal_latency(0.05),
+        rate_limit_rate=rate_limit_rate,
+        retry_after=0.05,
+    ) as mock:
+        sequential = texts[: max(1, documents // 4)]
+        results["fnol_sequential"] = _isolated(bench_sync, mock.base_url, sequential)
+        results["fnol_parallel"] = _isolated(
+            bench_sync, mock.base_url, sequential, parallel=True
+        )
+        results["fnol_async"] = _isolated(bench_async, mock.base_url, texts)
+        results.update(_isolated(bench_processes, mock.base_url, texts))
+        rate_limited = mock.rate_limited
+    with MockOpenAI(latency=constant_latency(0.0)) as mock:
+        results["batch"] = _isolated(bench_batch, mock.base_url, texts)
+    results["group_sd_urs_art"] = _isolated(bench_group_sd_urs_art)
+    logger.info(f"Mock answered {rate_limited} completions with 429")
+
+    return results
+
+
+def compare(
+    results: dict,
+    baseline: dict,
+    tolerance: float = 0.2,
+    memory_tolerance: float = 0.1,
+) -> List[str]:
+    """
+    Regressions of `results` against `baseline`.
+
+    A benchmark regresses if its docs_per_sec drops, or its p95 latency
+    grows, by more than `tolerance`, or if its peak RSS grows by more than
+    `memory_tolerance`. Memory is measured in a fresh process per benchmark
+    and varies far less than timings, hence the tighter default.
+    """
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if result["docs_per_sec"] < before["docs_per_sec"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: {result['docs_per_sec']:.1f} docs/sec, "
+                f"baseline {before['docs_per_sec']:.1f}"
+            )
+        if "latency_p95" in before and result["latency_p95"] > before["latency_p95"] * (
+            1 + tolerance
+        ):
+            regressions.append(
+                f"{name}: p95 {result['latency_p95']:.3f}s, "
+                f"baseline {before['latency_p95']:.3f}s"
+            )
+        if "peak_rss_mb" in before and result["peak_rss_mb"] > before["peak_rss_mb"] * (
+            1 + memory_tolerance
+        ):
+            regressions.append(
+                f"{name}: peak RSS {result['peak_rss_mb']:.0f} MB, "
+                f"baseline {before['peak_rss_mb']:.0f} MB"
+            )
+
+    return regressions
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline FNOL pipeline benchmarks")
+    parser.add_argument("--documents", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05, help="median seconds")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.02)
+    parser.add_argument("--save", help="write the results as a baseline JSON file")
+    parser.add_argument("--baseline", help="compare against a baseline JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--memory-tolerance", type=float, default=0.1)
+    parser.add_argument("--connection-reuse", action="store_true")
+    parser.add_argument(
+        "--import-budget", action="store_true", help="check cold import times only"
+    )
+    args = parser.parse_args(argv)
+
+    _quiet()
+
+    if args.import_budget:
+        violations = check_import_budgets()
+        for violation in violations:
+            logger.error(violation)
+        return 1 if violations else 0
+
+    if args.connection_reuse:
+        for variant, result in bench_connection_reuse().items():
+            logger.warning(f"{variant}: {result}")
+        return 0
+
+    results = run_suite(
+        documents=args.documents,
+        latency=lognormal_latency(args.latency),
+        rate_limit_rate=args.rate_limit_rate,
+    )
+    print(pd.DataFrame(results).T.to_string(float_format=lambda x: f"{x:.3f}"))
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(
+                results, json.load(f), args.tolerance, args.memory_tolerance
+            )
+        for regression in regressions:
+            logger.error(f"Regression {regression}")
+        return 1 if regressions else 0
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
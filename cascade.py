@@ -0,0 +1,154 @@
+from typing import Dict, Iterable, List
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+from sklearn.calibration import CalibratedClassifierCV
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+
+from gpt import GPT
+
+FIELD_LABELS = {
+    "type": "sd_typ_kennung",
+    "objekt": "schaden_objekt",
+    "cause": "sd_urs_art",
+}
+
+
+class LocalCascade:
+    """
+    Local classifier stage in front of `GPT`.
+
+    One TF-IDF representation of the documents feeds a calibrated linear
+    model per field, trained on the labelled history (sd_typ_kennung,
+    schaden_objekt and the grouped sd_urs_art). A field is answered locally
+    when the model's probability reaches `threshold`, and by `GPT`
+    otherwise. The cause is only taken locally together with a local type,
+    so a locally predicted cause never contradicts a type from `GPT`.
+
+    Attributes:
+        gpt (GPT): Client used for escalated fields.
+        threshold (float): Minimum calibrated probability to answer locally.
+        calibration_folds (int): Folds used to calibrate each classifier;
+            labels seen fewer times are left out of training.
+    """
+
+    def __init__(self, gpt: GPT, threshold: float = 0.9, calibration_folds: int = 3):
+        self.gpt = gpt
+        self.threshold = threshold
+        self.calibration_folds = calibration_folds
+        self.vectorizer = None
+        self.models = {}
+
+    def fit(self, df: pd.DataFrame) -> "LocalCascade":
+        """Train the vectorizer and one classifier per field from labelled claims.
+
+        Args:
+            df: DataFrame with a text column and the label columns in
+                `FIELD_LABELS`, with sd_urs_art already grouped by
+                `group_sd_urs_art`.
+        """
+        self.vectorizer = TfidfVectorizer(
+            sublinear_tf=True, ngram_range=(1, 2), min_df=2, max_features=200_000
+        )
+        features = self.vectorizer.fit_transform(df["text"].astype(str))
+
+        for field, column in FIELD_LABELS.items():
+            labels = df[column].astype(str).where(df[column].notna())
+            counts = labels.value_counts()
+            keep = labels.isin(counts[counts >= self.calibration_folds].index)
+            if keep.sum() < len(labels):
+                logger.info(
+                    f"{field}: {len(labels) - keep.sum()} rows with rare or "
+                    f"missing labels left out of training"
+                )
+            if labels[keep].nunique() < 2:
+                logger.warning(f"{field}: not enough classes, always escalated")
+                continue
+
+            model = CalibratedClassifierCV(
+                LogisticRegression(max_iter=1000),
+                cv=self.calibration_folds,
+                method="sigmoid",
+            )
+            model.fit(features[keep.to_numpy()], labels[keep].to_numpy())
+            self.models[field] = model
+            logger.success(f"Trained local {field} classifier on {keep.sum()} claims")
+
+        return self
+
+    def predict_proba(self, documents: Iterable[str]) -> Dict[str, pd.DataFrame]:
+        """Return per field the predicted label and its probability per document."""
+        features = self.vectorizer.transform(list(documents))
+        predictions = {}
+        for field, model in self.models.items():
+            probabilities = model.predict_proba(features)
+            best = probabilities.argmax(axis=1)
+            predictions[field] = pd.DataFrame(
+                {
+                    "label": model.classes_[best],
+                    "probability": probabilities[np.arange(len(best)), best],
+                }
+            )
+
+        return predictions
+
+    def local_fields(self, document: str) -> dict:
+        """Fields confident enough to skip the model, as resolved fields for `GPT`."""
+        predictions = self.predict_proba([document])
+        confident = {
+            field: prediction["label"].iloc[0]
+            for field, prediction in predictions.items()
+            if prediction["probability"].iloc[0] >= self.threshold
+        }
+
+        resolved = {}
+        if "type" in confident:
+            resolved["type"] = confident["type"]
+            if "cause" in confident:
+                resolved["cause"] = None
+                resolved["cause_code"] = confident["cause"]
+        if "objekt" in confident:
+            resolved["objekt"] = confident["objekt"]
+
+        return resolved
+
+    def fde_first_notification_of_loss(self, document: str) -> dict:
+        """Answer confident fields locally and escalate the rest to `GPT`."""
+        return self.gpt.fde_first_notification_of_loss(
+            document, resolved=self.local_fields(document)
+        )
+
+    def threshold_report(
+        self, df: pd.DataFrame, thresholds: List[float] = (0.5, 0.7, 0.8, 0.9, 0.95, 0.99)
+    ) -> pd.DataFrame:
+        """
+        Escalation share and local accuracy per field and threshold.
+
+        Args:
+            df: Held-out labelled claims, in the same format as for `fit`.
+            thresholds: Probability thresholds to evaluate.
+
+        Returns:
+            DataFrame with field, threshold, escalated (share of documents
+            sent to `GPT`) and accuracy (accuracy of the local answers on
+            the documents that are not escalated).
+        """
+        predictions = self.predict_proba(df["text"].astype(str))
+        rows = []
+        for field, prediction in predictions.items():
+            labels = df[FIELD_LABELS[field]].astype(str).to_numpy()
+            correct = prediction["label"].to_numpy() == labels
+            for threshold in thresholds:
+                confident = prediction["probability"].to_numpy() >= threshold
+                rows.append(
+                    {
+                        "field": field,
+                        "threshold": threshold,
+                        "escalated": 1 - confident.mean(),
+                        "accuracy": correct[confident].mean() if confident.any() else np.nan,
+                    }
+                )
+
+        return pd.DataFrame(rows)
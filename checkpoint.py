@@ -0,0 +1,172 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, Iterator, List, Set, Tuple
+
+from loguru import logger
+
+
+def run_key(config: dict) -> str:
+    """Short hash of a run configuration, e.g. the prompts and date mode."""
+    payload = json.dumps(config, sort_keys=True, ensure_ascii=False, default=str)
+
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class Checkpoint:
+    """
+    Append-only store of finished predictions for resumable runs.
+
+    Every result of `fde_first_notification_of_loss` is appended as one JSON
+    line, keyed by its doc_id, to a shard in `directory` as soon as it is
+    finished. Each run writes its own shards, rolling over after
+    `shard_size` results, so an interrupted run loses at most the line being
+    written. doc_ids are stored as strings, since the JSON lines turn e.g.
+    NumPy integers from the parquet into strings anyway. On restart `pending` skips the doc_ids that are already done,
+    and `compact` merges all shards into one file outside the shard
+    directory once a run is complete, so the next run starts from scratch.
+
+    Results only carry over between runs with the same `config`: its hash
+    names the shard directory, so a changed prompt or date mode starts a
+    new checkpoint instead of returning the old predictions.
+
+    Attributes:
+        directory (Path): Directory holding the shards.
+        shard_size (int): Results per shard before a new one is started.
+    """
+
+    def __init__(
+        self,
+        directory: str = "predictions",
+        shard_size: int = 1000,
+        config: dict | None = None,
+    ):
+        self.directory = Path(directory)
+        if config is not None:
+            self.directory = self.directory / run_key(config)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.shard_size = shard_size
+        self._run = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        self._shard_index = 0
+        self._shard_count = 0
+        self._file = None
+        self._lock = threading.Lock()
+        self._done = {str(result["doc_id"]) for result in self._read()}
+        if self._done:
+            logger.info(f"Checkpoint {self.directory}: {len(self._done)} documents done")
+
+    def _shards(self) -> List[Path]:
+        return sorted(self.directory.glob("shard-*.jsonl"))
+
+    def _read(self) -> Iterator[dict]:
+        for shard in self._shards():
+            with open(shard, encoding="utf-8") as f:
+                for number, line in enumerate(f, 1):
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        # last line of a shard whose run was killed mid-write
+                        logger.warning(f"Skipping incomplete line {number} in {shard}")
+
+    def _open_shard(self):
+        if self._file is not None:
+            self._file.close()
+        path = self.directory / f"shard-{self._run}-{self._shard_index:05d}.jsonl"
+        while path.exists():
+            self._shard_index += 1
+            path = self.directory / f"shard-{self._run}-{self._shard_index:05d}.jsonl"
+        self._file = open(path, "x", encoding="utf-8")
+        self._shard_index += 1
+        self._shard_count = 0
+
+    @property
+    def done(self) -> Set[str]:
+        """doc_ids, as strings, with a stored result."""
+        return set(self._done)
+
+    def pending(self, documents: Iterable[Tuple[str, str]]) -> List[Tuple[str, str]]:
+        """Filter (doc_id, text) pairs down to those without a stored result."""
+        pending = [
+            (doc_id, text) for doc_id, text in documents if str(doc_id) not in self._done
+        ]
+        logger.info(f"{len(pending)} documents pending, {len(self._done)} already done")
+
+        return pending
+
+    def write(self, result: dict):
+        """Append one finished result, carrying its doc_id, to the current shard."""
+        result = {**result, "doc_id": str(result["doc_id"])}
+        line = json.dumps(result, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            if self._file is None or self._shard_count >= self.shard_size:
+                self._open_shard()
+            self._file.write(line)
+            self._file.flush()
+            self._shard_count += 1
+            self._done.add(result["doc_id"])
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __enter__(self) -> "Checkpoint":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def results(self) -> List[dict]:
+        """
+        All stored results, one per doc_id; a later result replaces an earlier one.
+
+        The doc_id of every result is a string.
+        """
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+            results = {
+                str(result["doc_id"]): {**result, "doc_id": str(result["doc_id"])}
+                for result in self._read()
+            }
+
+        return list(results.values())
+
+    def compact(self) -> Path:
+        """
+        Merge all shards into a single file and remove the shard directory.
+
+        The merged file, `<directory>-<run>.jsonl`, is written next to the
+        shard directory and renamed into place before any shard is deleted,
+        so the results survive an interruption at any point of the
+        compaction. It is not read back by later runs.
+
+        Returns:
+            Path of the compacted file.
+        """
+        self.close()
+        results = self.results()
+        path = self.directory.with_name(f"{self.directory.name}-{self._run}.jsonl")
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            for result in results:
+                f.write(json.dumps(result, ensure_ascii=False, default=str) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+        shards = self._shards()
+        for shard in shards:
+            shard.unlink()
+        if not any(self.directory.iterdir()):
+            self.directory.rmdir()
+        self._done = set()
+        logger.success(
+            f"Compacted {len(shards)} shards into {path} ({len(results)} results)"
+        )
+
+        return path
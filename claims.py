@@ -0,0 +1,200 @@
+from dataclasses import dataclass
+from functools import reduce
+from typing import Dict, Iterable, List
+
+import numpy as np
+import pandas as pd
+
+CLAIM_FIELDS = ("schaden_objekt", "schaden_typ", "sd_urs_art", "schaden_datum")
+CATEGORY_FIELDS = ("schaden_objekt", "schaden_typ", "sd_urs_art")
+
+PREDICTION_KEYS = {
+    "schaden_objekt": "objekt",
+    "schaden_typ": "type",
+    "sd_urs_art": "cause",
+    "schaden_datum": "date",
+}
+LABEL_COLUMNS = {
+    "schaden_objekt": "schaden_objekt",
+    "schaden_typ": "sd_typ_kennung",
+    "sd_urs_art": "sd_urs_art",
+    "schaden_datum": "schadentag",
+}
+
+
+def _as_strings(values: pd.Series) -> pd.Series:
+    """Values as strings, integral floats without '.0', missing values as None."""
+    values = values.astype(object)
+    present = values.notna()
+    strings = values[present].map(
+        lambda value: str(int(value))
+        if isinstance(value, float) and value.is_integer()
+        else str(value)
+    )
+
+    return strings.reindex(values.index).where(present, None)
+
+
+class ClaimTable:
+    """
+    Columnar collection of claims.
+
+    Holds one row per doc_id with the fields of `FirstNotificationOfLoss`.
+    Every field is a dictionary-encoded categorical column (integer codes
+    plus a small table of distinct values), so millions of claims take a
+    few bytes per field, and comparisons run on the codes. Values are kept
+    as strings, so a label 1 (or 1.0) from the parquet and a predicted '1'
+    are the same category.
+
+    Attributes:
+        frame (pd.DataFrame): doc_id plus one categorical column per field.
+    """
+
+    def __init__(
+        self,
+        doc_id: Iterable,
+        schaden_objekt: Iterable,
+        schaden_typ: Iterable,
+        sd_urs_art: Iterable,
+        schaden_datum: Iterable,
+    ):
+        frame = pd.DataFrame(
+            {
+                "doc_id": doc_id,
+                "schaden_objekt": schaden_objekt,
+                "schaden_typ": schaden_typ,
+                "sd_urs_art": sd_urs_art,
+                "schaden_datum": schaden_datum,
+            }
+        )
+        for field in CLAIM_FIELDS:
+            frame[field] = _as_strings(frame[field])
+        self.frame = frame.astype({field: "category" for field in CLAIM_FIELDS})
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "ClaimTable":
+        """Build the table from labelled claims as prepared in main.py."""
+        return cls(
+            doc_id=df["doc_id"].to_numpy(),
+            **{field: df[column].to_numpy() for field, column in LABEL_COLUMNS.items()},
+        )
+
+    @classmethod
+    def from_predictions(cls, predictions: List[dict]) -> "ClaimTable":
+        """Build the table from `fde_first_notification_of_loss` results with doc_id."""
+        return cls(
+            doc_id=[prediction["doc_id"] for prediction in predictions],
+            **{
+                field: [prediction[key] for prediction in predictions]
+                for field, key in PREDICTION_KEYS.items()
+            },
+        )
+
+    def compare(self, labels: "ClaimTable") -> "ClaimComparison":
+        """
+        Compare these claims with `labels`, joined on doc_id.
+
+        Two values match if they are equal or both missing (None or NaN).
+        This is looser than `FirstNotificationOfLoss.__eq__`, where a
+        missing label (NaN) never equalled a missing prediction (None).
+
+        Returns:
+            ClaimComparison with per-field and whole-record match masks and a
+            confusion matrix per category field.
+        """
+        merged = self.frame.merge(
+            labels.frame, on="doc_id", how="inner", suffixes=("_pred", "_true")
+        )
+        matches = {}
+        confusion = {}
+        for field in CLAIM_FIELDS:
+            pred = merged[f"{field}_pred"]
+            true = merged[f"{field}_true"]
+            categories = pred.cat.categories.union(true.cat.categories)
+            pred_codes = pred.cat.set_categories(categories).cat.codes.to_numpy()
+            true_codes = true.cat.set_categories(categories).cat.codes.to_numpy()
+            matches[field] = pred_codes == true_codes
+
+            if field in CATEGORY_FIELDS:
+                confusion[field] = _confusion_matrix(true_codes, pred_codes, categories)
+
+        masks = pd.DataFrame(matches, index=pd.Index(merged["doc_id"], name="doc_id"))
+        masks["record"] = masks.all(axis=1)
+
+        return ClaimComparison(masks=masks, confusion=confusion)
+
+
+def _confusion_matrix(true_codes, pred_codes, categories) -> pd.DataFrame:
+    """Confusion matrix from category codes, with missing values as 'None'."""
+    size = len(categories) + 1
+    counts = np.bincount(
+        (true_codes + 1) * size + (pred_codes + 1), minlength=size * size
+    ).reshape(size, size)
+    labels = ["None"] + [str(category) for category in categories]
+    matrix = pd.DataFrame(
+        counts,
+        index=pd.Index(labels, name="true"),
+        columns=pd.Index(labels, name="pred"),
+    )
+    used = (counts.sum(axis=0) + counts.sum(axis=1)) > 0
+
+    return matrix.loc[used, used]
+
+
+@dataclass
+class ClaimComparison:
+    """
+    Result of comparing predicted claims with labelled claims.
+
+    Attributes:
+        masks (pd.DataFrame): One boolean column per field plus 'record'
+            (all fields match), indexed by doc_id.
+        confusion (Dict[str, pd.DataFrame]): Confusion matrix (true x pred)
+            per category field.
+    """
+
+    masks: pd.DataFrame
+    confusion: Dict[str, pd.DataFrame]
+
+    def summary(self) -> pd.DataFrame:
+        """Matches, total and accuracy per field and for whole records."""
+        matches = self.masks.sum()
+
+        return pd.DataFrame(
+            {
+                "matches": matches,
+                "total": len(self.masks),
+                "accuracy": matches / max(len(self.masks), 1),
+            }
+        )
+
+    @classmethod
+    def combine(cls, comparisons: Iterable["ClaimComparison"]) -> "ClaimComparison":
+        """
+        Combine the comparisons of disjoint batches of claims.
+
+        The masks are concatenated once, so combining the batches of a
+        whole run stays linear in the number of claims.
+        """
+        comparisons = list(comparisons)
+        confusion = {
+            field: reduce(
+                lambda total, matrix: total.add(matrix, fill_value=0),
+                (comparison.confusion[field] for comparison in comparisons),
+            )
+            .fillna(0)
+            .astype(int)
+            for field in comparisons[0].confusion
+        }
+
+        return cls(
+            masks=pd.concat([comparison.masks for comparison in comparisons]),
+            confusion=confusion,
+        )
+
+    def __add__(self, other: "ClaimComparison") -> "ClaimComparison":
+        """Combine the comparisons of two disjoint batches of claims."""
+        return ClaimComparison.combine([self, other])
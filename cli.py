@@ -0,0 +1,144 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+from typing import List, TextIO
+
+from dotenv import find_dotenv, load_dotenv
+from loguru import logger
+
+from async_gpt import AsyncGPT
+from clients import ClientConfig, ClientFactory
+from normalize import normalize_document
+from response_cache import ResponseCache
+from service import default_rate_limiter
+
+
+async def stream(
+    gpt: AsyncGPT,
+    source: TextIO,
+    sink: TextIO,
+    max_concurrency: int = 16,
+    normalize: bool = False,
+) -> int:
+    """
+    Extract the FNOL fields of JSONL documents and write results as they finish.
+
+    Each input line is a JSON object with doc_id and text. Every result is
+    written to `sink` as one JSON line with its doc_id as soon as its
+    document is done, so the output order follows completion, not input.
+    At most `max_concurrency` documents are in flight and at most as many
+    more are read ahead, so memory stays bounded for any input size.
+    Documents that fail are written with an 'error' key instead of fields.
+
+    Returns:
+        Number of documents processed.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=max_concurrency)
+    processed = 0
+
+    async def read():
+        number = 0
+        while line := await loop.run_in_executor(None, source.readline):
+            number += 1
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                document = (record["doc_id"], record["text"])
+            except (ValueError, KeyError, TypeError):
+                logger.warning(f"Skipping line {number}: expected doc_id and text")
+                continue
+            await queue.put(document)
+        for _ in range(max_concurrency):
+            await queue.put(None)
+
+    async def work():
+        nonlocal processed
+        while (document := await queue.get()) is not None:
+            doc_id, text = document
+            if normalize:
+                text = normalize_document(text)
+            try:
+                result = await gpt.fde_first_notification_of_loss(text)
+            except Exception as e:
+                logger.error(f"{doc_id}: {e}")
+                result = {"error": str(e)}
+            sink.write(json.dumps({**result, "doc_id": doc_id}, ensure_ascii=False) + "\n")
+            sink.flush()
+            processed += 1
+
+    await asyncio.gather(read(), *(work() for _ in range(max_concurrency)))
+
+    return processed
+
+
+def make_gpt(
+    clients: ClientFactory, cache: str | None = None, form_parser: bool = False
+) -> AsyncGPT:
+    """
+    `AsyncGPT` of the CLI on the asyncio client of `clients`.
+
+    Nothing is written to disk unless `cache` names a response cache file,
+    and templated forms are only read without the model with `form_parser`.
+    """
+    return AsyncGPT(
+        client=clients.async_openai(),
+        cache=ResponseCache(cache) if cache else None,
+        rate_limiter=default_rate_limiter(),
+        form_parser=form_parser,
+    )
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Extract FNOL fields from JSONL documents (doc_id, text)"
+    )
+    parser.add_argument("input", nargs="?", default="-", help="JSONL file, - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="JSONL file, - for stdout")
+    parser.add_argument("--max-concurrency", type=int, default=16)
+    parser.add_argument("--normalize", action="store_true", help="strip email noise first")
+    parser.add_argument("--base-url", help="OpenAI-compatible endpoint, e.g. a mock")
+    parser.add_argument("--cache", metavar="PATH", help="SQLite response cache to use")
+    parser.add_argument(
+        "--form-parser",
+        action="store_true",
+        help="read templated forms without the model",
+    )
+    args = parser.parse_args(argv)
+
+    load_dotenv(find_dotenv())
+    api_key = os.getenv("OPENAI_API_KEY", "mock" if args.base_url else None)
+    # the RateLimiter retries 429s itself, so the SDK must not
+    clients = ClientFactory(
+        ClientConfig(max_retries=0), api_key=api_key, base_url=args.base_url
+    )
+    gpt = make_gpt(clients, cache=args.cache, form_parser=args.form_parser)
+
+    async def run() -> int:
+        try:
+            return await stream(gpt, source, sink, args.max_concurrency, args.normalize)
+        finally:
+            # the asyncio pool must be closed in the loop that used it
+            await clients.aclose()
+
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    sink = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        processed = asyncio.run(run())
+    finally:
+        if gpt.cache is not None:
+            gpt.cache.close()
+        if source is not sys.stdin:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
+    logger.success(f"Processed {processed} documents")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+import threading
+from dataclasses import dataclass
+
+import httpx
+from loguru import logger
+from openai import AsyncOpenAI, OpenAI
+
+
+@dataclass
+class ClientConfig:
+    """
+    Connection settings for the OpenAI clients built by `ClientFactory`.
+
+    Attributes:
+        max_connections (int): Upper bound of open connections in the pool.
+        max_keepalive_connections (int): Idle connections kept for reuse.
+        keepalive_expiry (float): Seconds an idle connection is kept open.
+        http2 (bool): Negotiate HTTP/2, so concurrent requests share one
+            connection. Requires `httpx[http2]`.
+        connect_timeout (float): Seconds to establish a connection.
+        read_timeout (float): Seconds to wait for response data.
+        write_timeout (float): Seconds to send the request.
+        pool_timeout (float): Seconds to wait for a free connection.
+        max_retries (int): Retries of the OpenAI client itself; set to 0 when
+            a `RateLimiter` handles retries.
+    """
+
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+    http2: bool = False
+    connect_timeout: float = 5.0
+    read_timeout: float = 120.0
+    write_timeout: float = 30.0
+    pool_timeout: float = 30.0
+    max_retries: int = 2
+
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    def timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(
+            connect=self.connect_timeout,
+            read=self.read_timeout,
+            write=self.write_timeout,
+            pool=self.pool_timeout,
+        )
+
+
+class ClientFactory:
+    """
+    Hands out OpenAI clients that share one tuned connection pool.
+
+    `openai` always returns the same `OpenAI` client on one `httpx.Client`,
+    which is thread-safe, so every `GPT` instance and thread reuses the
+    pool's open connections instead of paying TCP and TLS setup per client.
+    `async_openai` does the same for `AsyncGPT` and asyncio tasks; its pool
+    belongs to the event loop it is first used in.
+
+    Usage:
+        with ClientFactory(ClientConfig(http2=True), api_key=api_key) as clients:
+            gpt = GPT(clients.openai())
+    """
+
+    def __init__(
+        self,
+        config: ClientConfig | None = None,
+        api_key: str | None = None,
+        base_url: str | None = None,
+    ):
+        self.config = config or ClientConfig()
+        self.api_key = api_key
+        self.base_url = base_url
+        self._client = None
+        self._async_client = None
+        self._lock = threading.Lock()
+
+    def _http_options(self) -> dict:
+        return dict(
+            limits=self.config.limits(),
+            timeout=self.config.timeout(),
+            http2=self.config.http2,
+        )
+
+    def openai(self) -> OpenAI:
+        """The shared synchronous client."""
+        with self._lock:
+            if self._client is None:
+                self._client = OpenAI(
+                    api_key=self.api_key,
+                    base_url=self.base_url,
+                    max_retries=self.config.max_retries,
+                    http_client=httpx.Client(**self._http_options()),
+                )
+                logger.info(f"Created shared OpenAI client with {self.config}")
+
+        return self._client
+
+    def async_openai(self) -> AsyncOpenAI:
+        """The shared asyncio client."""
+        with self._lock:
+            if self._async_client is None:
+                self._async_client = AsyncOpenAI(
+                    api_key=self.api_key,
+                    base_url=self.base_url,
+                    max_retries=self.config.max_retries,
+                    http_client=httpx.AsyncClient(**self._http_options()),
+                )
+                logger.info(f"Created shared AsyncOpenAI client with {self.config}")
+
+        return self._async_client
+
+    def close(self):
+        """Close the synchronous pool."""
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+    async def aclose(self):
+        """Close the asyncio pool; await it in the loop that used it."""
+        with self._lock:
+            client, self._async_client = self._async_client, None
+        if client is not None:
+            await client.close()
+
+    def __enter__(self) -> "ClientFactory":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
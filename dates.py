@@ -0,0 +1,302 @@
+import re
+from datetime import date, timedelta
+from typing import Iterator, Optional, Set
+
+from loguru import logger
+
+MONTHS = {
+    "januar": 1,
+    "jan": 1,
+    "jänner": 1,
+    "februar": 2,
+    "feb": 2,
+    "märz": 3,
+    "maerz": 3,
+    "mär": 3,
+    "mrz": 3,
+    "april": 4,
+    "apr": 4,
+    "mai": 5,
+    "juni": 6,
+    "jun": 6,
+    "juli": 7,
+    "jul": 7,
+    "august": 8,
+    "aug": 8,
+    "september": 9,
+    "sep": 9,
+    "sept": 9,
+    "oktober": 10,
+    "okt": 10,
+    "november": 11,
+    "nov": 11,
+    "dezember": 12,
+    "dez": 12,
+}
+WEEKDAYS = {
+    "montag": 0,
+    "dienstag": 1,
+    "mittwoch": 2,
+    "donnerstag": 3,
+    "freitag": 4,
+    "samstag": 5,
+    "sonnabend": 5,
+    "sonntag": 6,
+}
+NUMBERS = {"einem": 1, "einen": 1, "zwei": 2, "drei": 3, "vier": 4, "fünf": 5, "sechs": 6}
+
+MONTH = r"(?P<month_name>" + "|".join(sorted(MONTHS, key=len, reverse=True)) + r")\.?"
+WEEKDAY = r"(?P<weekday>" + "|".join(WEEKDAYS) + r")"
+YEAR = r"(?P<year>\d{4}|\d{2})"
+
+# Dates of the email itself; the first one found is the anchor of relative dates
+ANCHOR_PATTERNS = [
+    re.compile(r"Eingangszeitpunkt:?\s*(?P<day>\d{1,2})\.(?P<month>\d{1,2})\.(?P<year>\d{4})"),
+    re.compile(
+        r"(?:Gesendet|Datum|Sent|Date):?\s*(?:\w+,\s*)?(?P<day>\d{1,2})\.\s*"
+        + MONTH
+        + r"\s+(?P<year>\d{4})",
+        re.IGNORECASE,
+    ),
+    re.compile(
+        r"(?:Gesendet|Datum):?\s*(?:\w+,\s*)?(?P<day>\d{1,2})\.(?P<month>\d{1,2})\.(?P<year>\d{4})"
+    ),
+    re.compile(r"(?P<day>\d{1,2})\.(?P<month>\d{1,2})\.(?P<year>\d{4})\s+\d{1,2}:\d{2}"),
+]
+
+# Header lines of the email and clauses about the contract, the paperwork or
+# the customer's availability
+HEADER_LINE = re.compile(
+    r"^\s*(?:Von|An|Cc|Gesendet|Betreff|Datum|Date|Sent|From|To|Eingangszeitpunkt)\b",
+    re.IGNORECASE,
+)
+OTHER_DATE_CLAUSE = re.compile(
+    r"Vertrag|Versicherungsbeginn|geboren|Geburtsdatum|Rechnung|Angebot"
+    r"|Kostenvoranschlag|Frist|bis zum|Termin"
+    r"|(?:Schreiben|Mail|Nachricht|Brief|meldung|Telefonat|Gespräch)\s+vom"
+    r"|Bezug|besprochen|erreichbar|Rückruf|zurückrufen|Besichtigung|Urlaub",
+    re.IGNORECASE,
+)
+# Only sentences about the loss itself name the loss date
+LOSS_CUE = re.compile(
+    r"Schad|Schäd|passiert|eingetreten|ereignet|geschehen|Sturm|Unwetter|Hagel"
+    r"|Gewitter|Blitz|Brand|brannt|Feuer|Wasser|Rohr|geplatzt|ausgelaufen|ausgetreten"
+    r"|Leck|undicht|überflutet|Überschwemm|Einbruch|eingebrochen|gestohlen|Diebstahl"
+    r"|entwendet|aufgebrochen|kaputt|zerstört|gesprungen|gerissen|zerbrochen|Unfall"
+    r"|Vandalismus|bemerkt|festgestellt|entdeckt|umgestürzt",
+    re.IGNORECASE,
+)
+SENTENCE_SEPARATOR = re.compile(r"(?<!\d)[.!?;]\s+")
+CLAUSE_SEPARATOR = re.compile(r",\s+")
+# Timestamps of emails and forwards, unlike "am 21.03.2024 um 14 Uhr"
+DATE_WITH_TIME = re.compile(
+    r"\d{1,2}\.\s*(?:\d{1,2}\.\d{2,4}|\w+\.?\s+\d{4}),?\s+\d{1,2}:\d{2}(?::\d{2})?(?!\s*Uhr)"
+)
+
+# "21./22.03.2024", "21. oder 22. März", "Nacht vom 19. auf den 20.03.2024"
+RANGE_SEPARATOR = r"(?:/|-|–|oder|und|bis|auf)\s*(?:zum\s+|dem\s+|den\s+)?"
+NUMERIC_RANGE = re.compile(
+    r"(?<![\d.])(?P<first>\d{1,2})\.?\s*" + RANGE_SEPARATOR +
+    r"(?P<day>\d{1,2})\.(?P<month>\d{1,2})\.(?:" + YEAR + r")?(?![\d])"
+)
+NAMED_RANGE = re.compile(
+    r"(?<![\d.])(?P<first>\d{1,2})\.\s*" + RANGE_SEPARATOR +
+    r"(?P<day>\d{1,2})\.\s*" + MONTH + r"(?:\s+" + YEAR + r")?",
+    re.IGNORECASE,
+)
+NUMERIC_DATE = re.compile(
+    r"(?<![\d.])(?P<day>\d{1,2})\.(?P<month>\d{1,2})\.(?:" + YEAR + r"(?!\.?\d)|(?=\s))"
+)
+NAMED_DATE = re.compile(
+    r"(?<![\d.])(?P<day>\d{1,2})\.\s*" + MONTH + r"(?:\s+" + YEAR + r")?(?![\w])",
+    re.IGNORECASE,
+)
+
+RELATIVE_DAYS = [
+    (re.compile(r"\bvorgestern\b", re.IGNORECASE), 2),
+    (re.compile(r"\bgestern\b", re.IGNORECASE), 1),
+    (re.compile(r"\b(?:letzte|vergangene|letzten|vergangenen) Nacht\b", re.IGNORECASE), 1),
+]
+DAYS_AGO = re.compile(
+    r"\bvor (?P<count>\d+|" + "|".join(NUMBERS) + r") Tag(?:en)?\b", re.IGNORECASE
+)
+LAST_WEEK_WEEKDAY = re.compile(
+    r"\b(?:letzte|vergangene)n? Woche,? (?:am )?" + WEEKDAY + r"\b"
+    r"|\b"
+    + WEEKDAY.replace("weekday", "weekday2")
+    + r",? (?:der )?(?:letzten|vergangenen) Woche\b",
+    re.IGNORECASE,
+)
+RECENT_WEEKDAY = re.compile(
+    r"\b(?:am|letzten|vergangenen) " + WEEKDAY + r"\b", re.IGNORECASE
+)
+WEEKEND = re.compile(r"\b(?:am|letztes|vergangenes|übers?) Wochenende\b", re.IGNORECASE)
+
+
+def _year(value: Optional[str], anchor: Optional[date]) -> Optional[int]:
+    if value:
+        year = int(value)
+        return year + 2000 if year < 100 else year
+
+    return anchor.year if anchor is not None else None
+
+
+def _make_date(year: Optional[int], month: int, day: int, anchor: Optional[date]) -> Optional[date]:
+    if year is None:
+        return None
+    try:
+        result = date(year, month, day)
+    except ValueError:
+        return None
+    # a date without year after the anchor belongs to the previous year
+    if anchor is not None and result > anchor and year == anchor.year:
+        try:
+            result = date(year - 1, month, day)
+        except ValueError:
+            return None
+
+    return result
+
+
+def _month(match: re.Match) -> int:
+    if match.groupdict().get("month_name"):
+        return MONTHS[match.group("month_name").lower()]
+
+    return int(match.group("month"))
+
+
+def find_anchor(document: str) -> Optional[date]:
+    """Date the email was received or sent, e.g. from 'Eingangszeitpunkt:'."""
+    for pattern in ANCHOR_PATTERNS:
+        if match := pattern.search(document):
+            try:
+                return date(int(match.group("year")), _month(match), int(match.group("day")))
+            except ValueError:
+                continue
+
+    return None
+
+
+def loss_clauses(document: str) -> Iterator[str]:
+    """
+    Clauses of sentences about the loss, without email headers and timestamps.
+
+    A sentence needs a word of `LOSS_CUE`, e.g. 'Schaden' or 'gestohlen', and
+    its clauses about the contract, letters or appointments are left out, so
+    'Ihr Schreiben vom 15.03.2024' or 'ich bin am Montag erreichbar' give no
+    loss date.
+    """
+    for line in document.splitlines():
+        if HEADER_LINE.search(line):
+            continue
+        for sentence in SENTENCE_SEPARATOR.split(DATE_WITH_TIME.sub(" ", line)):
+            if not LOSS_CUE.search(sentence):
+                continue
+            for clause in CLAUSE_SEPARATOR.split(sentence):
+                if not OTHER_DATE_CLAUSE.search(clause):
+                    yield clause
+
+
+def explicit_dates(document: str, anchor: Optional[date] = None) -> Set[date]:
+    """Dates written out in the loss description, without email and contract dates."""
+    dates = set()
+    for clause in loss_clauses(document):
+        for pattern in (NUMERIC_RANGE, NAMED_RANGE):
+            for match in pattern.finditer(clause):
+                year = _year(match.group("year"), anchor)
+                month = _month(match)
+                for day in (match.group("first"), match.group("day")):
+                    if (found := _make_date(year, month, int(day), anchor)) is not None:
+                        dates.add(found)
+            clause = pattern.sub(" ", clause)
+        for pattern in (NUMERIC_DATE, NAMED_DATE):
+            for match in pattern.finditer(clause):
+                found = _make_date(
+                    _year(match.group("year"), anchor),
+                    _month(match),
+                    int(match.group("day")),
+                    anchor,
+                )
+                if found is not None:
+                    dates.add(found)
+
+    if anchor is not None:
+        dates = {found for found in dates if found <= anchor}
+
+    return dates
+
+
+def relative_dates(document: str, anchor: date) -> Set[date]:
+    """Dates of German relative expressions such as 'vorgestern', resolved against `anchor`."""
+    document = "\n".join(loss_clauses(document))
+    dates = set()
+    for pattern, days in RELATIVE_DAYS:
+        if pattern.search(document):
+            dates.add(anchor - timedelta(days=days))
+
+    for match in DAYS_AGO.finditer(document):
+        count = match.group("count").lower()
+        days = int(count) if count.isdigit() else NUMBERS[count]
+        dates.add(anchor - timedelta(days=days))
+
+    last_week = set()
+    for match in LAST_WEEK_WEEKDAY.finditer(document):
+        weekday = WEEKDAYS[(match.group("weekday") or match.group("weekday2")).lower()]
+        monday = anchor - timedelta(days=anchor.weekday() + 7)
+        last_week.add(monday + timedelta(days=weekday))
+    dates |= last_week
+    if not last_week:
+        for match in RECENT_WEEKDAY.finditer(document):
+            weekday = WEEKDAYS[match.group("weekday").lower()]
+            days = (anchor.weekday() - weekday) % 7
+            if days:
+                dates.add(anchor - timedelta(days=days))
+
+    if WEEKEND.search(document) and anchor.weekday() < 5:
+        dates.add(anchor - timedelta(days=anchor.weekday() + 2))
+
+    return dates
+
+
+def first_of_consecutive(dates: Set[date]) -> Optional[date]:
+    """The single date, or the first of consecutive dates; None if they spread further."""
+    if not dates:
+        return None
+    ordered = sorted(dates)
+    if (ordered[-1] - ordered[0]).days != len(ordered) - 1 or len(ordered) > 3:
+        return None
+
+    return ordered[0]
+
+
+def resolve_claims_date(document: str) -> Optional[str]:
+    """
+    Resolve the loss date of a claim document without the model.
+
+    Explicit dates of sentences about the loss and German relative expressions
+    ('gestern', 'vorgestern', 'vor drei Tagen', 'letzte Woche Dienstag', 'am
+    Wochenende') resolved against the email's Eingangszeitpunkt or sent date
+    are collected. If they name one day, or consecutive days, the first of
+    which is chosen as in the date prompt, that day is returned. Anything
+    else, e.g. 'kurz vor Ostern' or dates far apart, is left to the model.
+
+    Args:
+        document: Text of the claim document.
+
+    Returns:
+        The loss date as TT.MM.JJJJ, or None if it is not unambiguous.
+    """
+    anchor = find_anchor(document)
+    dates = explicit_dates(document, anchor)
+    if anchor is not None:
+        dates |= relative_dates(document, anchor)
+
+    resolved = first_of_consecutive(dates)
+    if resolved is None:
+        if dates:
+            logger.debug(f"Schadentag mehrdeutig: {sorted(map(str, dates))}")
+        return None
+
+    logger.debug(f"Schadentag direkt ermittelt: {resolved:%d.%m.%Y}")
+
+    return f"{resolved:%d.%m.%Y}"
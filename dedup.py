@@ -0,0 +1,246 @@
+import re
+import threading
+import zlib
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from normalize import normalize_document
+
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+WORD_PATTERN = re.compile(r"\w+")
+LABEL_COLUMNS = ("sd_typ_kennung", "schaden_objekt", "sd_urs_art", "schadentag")
+
+
+def shingles(document: str, size: int = 3) -> np.ndarray:
+    """Hashes of the word `size`-grams of a document, as uint64."""
+    words = WORD_PATTERN.findall(document.lower())
+    if len(words) < size:
+        words = words + [""] * (size - len(words))
+    grams = {" ".join(words[i : i + size]) for i in range(len(words) - size + 1)}
+
+    return np.fromiter(
+        (zlib.crc32(gram.encode("utf-8")) for gram in grams),
+        dtype=np.uint64,
+        count=len(grams),
+    )
+
+
+class NearDuplicateIndex:
+    """
+    Incremental MinHash/LSH index grouping near-duplicate claim documents.
+
+    Documents are normalized with `normalize_document`, split into word
+    shingles and summarised by a MinHash signature. Signatures are split into
+    `bands` bands that are hashed into buckets, so candidates are found
+    without comparing against every earlier document. A document joins the
+    group of the most similar candidate if their estimated Jaccard
+    similarity reaches `threshold`, and starts a new group otherwise. The
+    first document of a group is its representative.
+
+    Attributes:
+        threshold (float): Minimum estimated Jaccard similarity of duplicates.
+        num_perm (int): Length of the MinHash signatures.
+        bands (int): LSH bands; `num_perm` must be divisible by it.
+        shingle_size (int): Words per shingle.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.8,
+        num_perm: int = 128,
+        bands: int = 16,
+        shingle_size: int = 3,
+        seed: int = 1,
+    ):
+        if num_perm % bands:
+            raise ValueError(f"num_perm={num_perm} is not divisible by bands={bands}")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        # a < 2**32 keeps a * shingle below 2**64
+        self._a = rng.integers(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self._buckets = [defaultdict(list) for _ in range(bands)]
+        self._signatures: Dict[str, np.ndarray] = {}
+        self._representative: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def signature(self, document: str) -> np.ndarray:
+        """MinHash signature of the normalized document."""
+        hashes = shingles(normalize_document(document), self.shingle_size)
+        permuted = np.outer(hashes, self._a) % MERSENNE_PRIME
+        permuted = (permuted + self._b) % MERSENNE_PRIME
+
+        return permuted.min(axis=0)
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [band.tobytes() for band in np.split(signature, self.bands)]
+
+    def _best_match(self, signature: np.ndarray, keys: List[bytes]) -> Optional[str]:
+        candidates = {
+            doc_id
+            for bucket, key in zip(self._buckets, keys)
+            for doc_id in bucket.get(key, ())
+        }
+        best, best_similarity = None, self.threshold
+        for doc_id in candidates:
+            similarity = float(np.mean(self._signatures[doc_id] == signature))
+            if similarity >= best_similarity:
+                best, best_similarity = doc_id, similarity
+
+        return best
+
+    def query(self, document: str) -> Optional[str]:
+        """Representative of the group `document` would join, without adding it."""
+        signature = self.signature(document)
+        with self._lock:
+            match = self._best_match(signature, self._band_keys(signature))
+
+            return None if match is None else self._representative[match]
+
+    def add(self, doc_id: str, document: str) -> str:
+        """Add a document and return the representative doc_id of its group."""
+        signature = self.signature(document)
+        keys = self._band_keys(signature)
+        with self._lock:
+            if doc_id in self._representative:
+                return self._representative[doc_id]
+            match = self._best_match(signature, keys)
+            representative = doc_id if match is None else self._representative[match]
+            self._signatures[doc_id] = signature
+            self._representative[doc_id] = representative
+            for bucket, key in zip(self._buckets, keys):
+                bucket[key].append(doc_id)
+
+        return representative
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._representative
+
+    def representative(self, doc_id: str) -> str:
+        return self._representative[doc_id]
+
+    def groups(self) -> Dict[str, List[str]]:
+        """Members per representative, for groups with more than one document."""
+        groups = defaultdict(list)
+        with self._lock:
+            for doc_id, representative in self._representative.items():
+                groups[representative].append(doc_id)
+
+        return {rep: members for rep, members in groups.items() if len(members) > 1}
+
+
+class Deduplicator:
+    """
+    Runs `fde_first_notification_of_loss` once per group of near-duplicates.
+
+    Each incoming document is added to a `NearDuplicateIndex`. Only the
+    representative of a group is sent to the model; every other member gets
+    a copy of the representative's result, marked with 'duplicate_of'.
+    Results are kept, so documents arriving later reuse them as well.
+
+    Attributes:
+        gpt: `GPT` or `AsyncGPT` used for the representatives.
+        index (NearDuplicateIndex): Index grouping the documents.
+        results (Dict[str, dict]): Result per representative doc_id.
+    """
+
+    def __init__(self, gpt, index: NearDuplicateIndex | None = None):
+        self.gpt = gpt
+        self.index = index or NearDuplicateIndex()
+        self.results: Dict[str, dict] = {}
+
+    def _fan_out(self, doc_id: str, representative: str) -> dict:
+        result = {**self.results[representative], "doc_id": doc_id}
+        result["duplicate_of"] = None if doc_id == representative else representative
+
+        return result
+
+    def _group(
+        self, documents: Iterable[Tuple[str, str]]
+    ) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]]]:
+        """Index the documents; return their representatives and the new ones to predict."""
+        assignments, pending = [], []
+        for doc_id, document in documents:
+            representative = self.index.add(doc_id, document)
+            assignments.append((doc_id, representative))
+            if representative == doc_id and doc_id not in self.results:
+                pending.append((doc_id, document))
+        logger.info(
+            f"{len(assignments)} documents, {len(pending)} new groups to predict"
+        )
+
+        return assignments, pending
+
+    def run(self, documents: Iterable[Tuple[str, str]]) -> List[dict]:
+        """Process (doc_id, text) pairs with a `GPT`; results in input order."""
+        assignments, pending = self._group(documents)
+        for doc_id, document in pending:
+            self.results[doc_id] = self.gpt.fde_first_notification_of_loss(document)
+
+        return [self._fan_out(doc_id, rep) for doc_id, rep in assignments]
+
+    async def run_async(
+        self,
+        documents: Iterable[Tuple[str, str]],
+        max_concurrency: int = 8,
+        on_result: Optional[Callable[[dict], None]] = None,
+    ) -> List[dict]:
+        """Process (doc_id, text) pairs with an `AsyncGPT`; results in input order.
+
+        Args:
+            documents: Iterable of (doc_id, text) pairs.
+            max_concurrency: Maximum number of representatives in flight.
+            on_result: Called with every result, duplicates included.
+        """
+        assignments, pending = self._group(documents)
+        for result in await self.gpt.process_many(pending, max_concurrency=max_concurrency):
+            result = dict(result)
+            self.results[result.pop("doc_id")] = result
+
+        results = [self._fan_out(doc_id, rep) for doc_id, rep in assignments]
+        if on_result is not None:
+            for result in results:
+                on_result(result)
+
+        return results
+
+    def disagreements(
+        self,
+        labels: pd.DataFrame,
+        columns: Sequence[str] = LABEL_COLUMNS,
+    ) -> pd.DataFrame:
+        """
+        Groups whose members carry different labels.
+
+        Reusing a prediction is only safe if near-duplicates share their
+        labels; these groups show where the threshold merges different claims.
+
+        Args:
+            labels: DataFrame with doc_id and the label columns.
+            columns: Label columns to check.
+
+        Returns:
+            One row per group with disagreement: representative, members and a
+            boolean column per label telling whether it differs in the group.
+        """
+        members = labels[labels["doc_id"].map(self.index.__contains__)]
+        representative = members["doc_id"].map(self.index.representative)
+        distinct = members.groupby(representative)[list(columns)].nunique(dropna=False)
+        differs = distinct[(distinct > 1).any(axis=1)] > 1
+        groups = members.groupby(representative)["doc_id"].agg(list)
+        flagged = differs.assign(members=groups.reindex(differs.index))
+        flagged.index.name = "representative"
+        if len(flagged):
+            logger.warning(f"{len(flagged)} near-duplicate groups with differing labels")
+
+        return flagged.reset_index()
@@ -0,0 +1,258 @@
+from dataclasses import dataclass
+from typing import List
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from claims import ClaimTable
+from dates import resolve_claims_date
+from gpt import FirstNotificationOfLoss
+
+
+@dataclass
+class DirksClaims:
+    """
+    A class representing a collection of claims data for Dirk's insurance claims
+     processing.
+
+    Attributes:
+        doc_id_list (List[str]): List of document identifiers for the claims.
+        schaden_objekt_list (List[str]): List of objects involved in the claims.
+        schaden_typ_list (List[str]): List of types of damage involved in the
+        claims.
+        sd_urs_art_list (List[str]): List of cause types for the damages.
+        schaden_datum_list (List[str]): List of dates when the damages occurred.
+
+    The class aggregates information from individual lists into structured
+    claims data using the `FirstNotificationOfLoss` class for each claim entry.
+    """
+
+    doc_id_list: List[str]
+    schaden_objekt_list: List[str]
+    schaden_typ_list: List[str]
+    sd_urs_art_list: List[str]
+    schaden_datum_list: List[str]
+    
+    def __post_init__(self):
+        """
+        Post-initialization processing to convert lists of claims data into a
+        columnar `ClaimTable`.
+
+        This method automatically runs after the class is instantiated to bundle
+        the provided claims lists into one table with a dictionary-encoded
+        column per field. `info` still provides the claims as
+        `FirstNotificationOfLoss` objects when needed.
+
+        Raises:
+            ValueError: If the lengths of the input lists do not match,
+                indicating inconsistent data which cannot be correctly paired
+                into claims.
+        """
+        if not all(
+            len(lst) == len(self.doc_id_list)
+            for lst in [
+                self.schaden_objekt_list,
+                self.schaden_typ_list,
+                self.sd_urs_art_list,
+                self.schaden_datum_list,
+            ]
+        ):
+            raise ValueError("All input lists must have the same length.")
+
+        self.table = ClaimTable(
+            doc_id=self.doc_id_list,
+            schaden_objekt=self.schaden_objekt_list,
+            schaden_typ=self.schaden_typ_list,
+            sd_urs_art=self.sd_urs_art_list,
+            schaden_datum=self.schaden_datum_list,
+        )
+
+    @property
+    def info(self) -> List[FirstNotificationOfLoss]:
+        """The claims as a list of `FirstNotificationOfLoss` objects."""
+        frame = self.table.frame.astype(object)
+        frame = frame.where(frame.notna(), None)
+
+        return [
+            FirstNotificationOfLoss(**record)
+            for record in frame.to_dict(orient="records")
+        ]
+
+
+URS_ART_CATEGORIES = {
+    "VK": {1: [51], 2: [562], 3: [564, 561, 57, 563, 565]},
+    "TK": {
+        77: [77],
+        741: [741, 742, 743, 744],
+        782: [782],
+        751: [751],
+        733: [
+            71,
+            78,
+            781,
+            72,
+            79,
+            791,
+            76,
+            753,
+            731,
+            732,
+            752,
+            733,
+            734,
+            771,
+            783,
+            792,
+            793,
+        ],
+    },
+}
+URS_ART_LOOKUP = {
+    sd_typ_kennung: {val: k for k, l in categories.items() for val in l}
+    for sd_typ_kennung, categories in URS_ART_CATEGORIES.items()
+}
+
+
+def group_sd_urs_art(df: pd.DataFrame) -> pd.DataFrame:
+    """Group sd_urs_art into main categories based on sd_typ_kennung.
+
+    The rule of each sd_typ_kennung (and for GL the schaden_objekt) only
+    depends on the sd_urs_art value, so it is evaluated once per distinct
+    value into a lookup table and applied to the rows by their factorized
+    codes. Row order and index are kept. As before, rows without
+    sd_typ_kennung or schaden_objekt are dropped, and rows of other types
+    keep their sd_urs_art unchanged.
+
+    Args:
+        df: pd.DataFrame to be grouped
+
+    Returns:
+        DataFrame containing main categories for sd_urs_art based on sd_typ_kennung
+    """
+    logger.info("Grouping sd_urs_art and schaden_objekt")
+    df = df[df["sd_typ_kennung"].notna() & df["schaden_objekt"].notna()]
+    sd_typ_kennung = pd.Categorical(df["sd_typ_kennung"])
+    schaden_objekt = pd.Categorical(df["schaden_objekt"])
+
+    codes, uniques = pd.factorize(df["sd_urs_art"])
+    # A missing value gets code -1, which then picks the trailing "nan" entry.
+    text = np.append(pd.Series(uniques, dtype=object).astype(str).to_numpy(object), "nan")
+    first = np.array([value[:1] for value in text], dtype=object)
+    result = df["sd_urs_art"].to_numpy(dtype=object, copy=True)
+
+    def apply_rule(mask, table):
+        result[mask] = np.asarray(table, dtype=object)[codes[mask]]
+
+    apply_rule(
+        sd_typ_kennung == "LW",
+        np.where(np.isin(first, ["0", "2", "4", "9"]), first, "0"),
+    )
+    apply_rule(
+        sd_typ_kennung == "ST",
+        np.where(
+            np.isin(text, ["10", "19"]),
+            text,
+            np.where(np.isin(first, ["0", "4", "7"]), first, "10"),
+        ),
+    )
+    apply_rule(sd_typ_kennung == "EL", np.where(first == "2", "2", "0"))
+    apply_rule(
+        sd_typ_kennung == "ED",
+        np.where(np.isin(text, ["70", "79"]), text, np.where(first == "7", "70", "0")),
+    )
+    apply_rule(
+        (sd_typ_kennung == "GL") & (schaden_objekt == "GL"),
+        np.where(
+            np.isin(text, ["9", "09"]),
+            "09",
+            np.where(np.isin(text, ["11", "12"]), text, "00"),
+        ),
+    )
+    apply_rule(
+        (sd_typ_kennung == "GL") & schaden_objekt.isin(["HR", "WG"]),
+        np.full(len(text), "00", dtype=object),
+    )
+    apply_rule(
+        sd_typ_kennung == "FE",
+        np.where(np.isin(first, ["6", "9"]), first, "0"),
+    )
+
+    for typ, lookup in URS_ART_LOOKUP.items():
+        mask = sd_typ_kennung == typ
+        if not mask.any():
+            continue
+        if (codes[mask] < 0).any():
+            raise ValueError(f"Missing sd_urs_art for sd_typ_kennung {typ}")
+        mapped = pd.Series(uniques, dtype=object)[np.unique(codes[mask])]
+        mapped = mapped.astype(int).map(lookup)
+        categories = np.full(len(text), np.nan)
+        categories[mapped.index] = mapped.to_numpy(dtype=float)
+        row_categories = categories[codes[mask]]
+        # Categories are mapped per (sd_typ_kennung, schaden_objekt) group;
+        # a group with an unmapped value holds floats, e.g. "1.0" and "nan".
+        unmapped = pd.Series(np.isnan(row_categories))
+        has_unmapped = unmapped.groupby(
+            np.asarray(schaden_objekt[mask], dtype=object)
+        ).transform("any")
+        as_float = pd.Series(row_categories).astype(str)
+        as_int = pd.Series(row_categories).astype("Int64").astype(str)
+        result[mask] = np.where(has_unmapped, as_float, as_int)
+
+    return df.assign(sd_urs_art=result)
+
+
+@dataclass
+class DateResolverReport:
+    """
+    Coverage and accuracy of `resolve_claims_date` against the labels.
+
+    Attributes:
+        documents (int): Documents checked.
+        resolved (int): Documents the resolver answered without the model.
+        correct (int): Resolved documents matching their schadentag.
+    """
+
+    documents: int = 0
+    resolved: int = 0
+    correct: int = 0
+
+    def __add__(self, other: "DateResolverReport") -> "DateResolverReport":
+        return DateResolverReport(
+            self.documents + other.documents,
+            self.resolved + other.resolved,
+            self.correct + other.correct,
+        )
+
+    @property
+    def coverage(self) -> float:
+        """Share of documents that need no date call."""
+        return self.resolved / self.documents if self.documents else 0.0
+
+    @property
+    def accuracy(self) -> float:
+        """Share of resolved documents whose date matches the label."""
+        return self.correct / self.resolved if self.resolved else 0.0
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "DateResolverReport":
+        """
+        Run the resolver on a batch with text and the normalized schadentag.
+
+        Args:
+            df: DataFrame with the columns text and schadentag (TT.MM.JJJJ).
+        """
+        dates = df["text"].map(resolve_claims_date)
+        resolved = dates.notna()
+
+        return cls(
+            documents=len(df),
+            resolved=int(resolved.sum()),
+            correct=int((dates[resolved] == df["schadentag"][resolved]).sum()),
+        )
+
+    def __str__(self) -> str:
+        return (
+            f"{self.resolved}/{self.documents} resolved locally "
+            f"(coverage {self.coverage:.1%}), accuracy {self.accuracy:.1%}"
+        )
@@ -0,0 +1,288 @@
+from __future__ import annotations
+
+import json
+import math
+import re
+from collections import Counter
+from typing import TYPE_CHECKING, List, Mapping, Sequence, Tuple
+
+import numpy as np
+from loguru import logger
+
+from rate_limiter import estimate_tokens
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+TOKEN_PATTERN = re.compile(r"[^\W\d_]{2,}")
+# Key of the example answers; answers are parsed by position, so any key works
+ANSWER_KEYS = {
+    "type": "Kategorie",
+    "cause": "Ursache",
+    "objekt": "Kategorie",
+    "notifier": "Kürzel",
+    "date": "Date",
+}
+# Label columns of the parquet per field
+LABEL_COLUMNS = {
+    "type": "sd_typ_kennung",
+    "cause": "sd_urs_art",
+    "objekt": "schaden_objekt",
+    "date": "schadentag",
+}
+# Reasoning of the date examples in the prompt asking for 'Thinking' and 'Date'
+DATE_THINKING = "Laut Schadenmeldung ist der Schaden am {} eingetreten."
+
+
+class TfidfIndex:
+    """
+    TF-IDF vectors of a fixed set of documents with cosine nearest-neighbour search.
+
+    The vocabulary holds the `max_features` words found in most documents,
+    leaving out words found in more than `max_df` of them. Vectors use
+    sublinear term frequency and smoothed idf and are L2-normalized, so the
+    similarity of two documents is a dot product. All vectors are kept in
+    one dense float32 matrix.
+    """
+
+    def __init__(
+        self,
+        documents: Sequence[str],
+        max_features: int = 4096,
+        max_df: float = 0.5,
+    ):
+        tokens = [TOKEN_PATTERN.findall(document.lower()) for document in documents]
+        document_frequency = Counter(word for words in tokens for word in set(words))
+        limit = max(1, int(max_df * len(documents)))
+        frequent = [
+            (count, word) for word, count in document_frequency.items() if count <= limit
+        ]
+        vocabulary = sorted(frequent, reverse=True)[:max_features]
+        self.vocabulary = {word: i for i, (_, word) in enumerate(vocabulary)}
+        self.idf = np.array(
+            [math.log((1 + len(documents)) / (1 + count)) + 1 for count, _ in vocabulary],
+            dtype=np.float32,
+        )
+        self.matrix = np.zeros((len(documents), len(self.vocabulary)), dtype=np.float32)
+        for row, words in enumerate(tokens):
+            self._fill(self.matrix[row], words)
+
+    def __len__(self) -> int:
+        return len(self.matrix)
+
+    def _fill(self, vector: np.ndarray, words: List[str]):
+        counts = Counter(word for word in words if word in self.vocabulary)
+        if not counts:
+            return
+        columns = np.fromiter((self.vocabulary[word] for word in counts), dtype=np.int64)
+        frequencies = np.fromiter(counts.values(), dtype=np.float32)
+        vector[columns] = (1 + np.log(frequencies)) * self.idf[columns]
+        vector /= np.linalg.norm(vector)
+
+    def vector(self, document: str) -> np.ndarray:
+        """Normalized TF-IDF vector of a new document."""
+        vector = np.zeros(len(self.vocabulary), dtype=np.float32)
+        self._fill(vector, TOKEN_PATTERN.findall(document.lower()))
+
+        return vector
+
+    def similarities(self, document: str) -> np.ndarray:
+        """Cosine similarity of `document` to every indexed document."""
+        return self.matrix @ self.vector(document)
+
+
+class FewShotSelector:
+    """
+    Picks the labelled claims most similar to a document as few-shot examples.
+
+    Instead of fixed examples every request gets the `k` nearest labelled
+    documents of its field from a `TfidfIndex`, rendered like the prompt's
+    <example_n> blocks with a JSON answer. Examples are added while they fit
+    into `token_budget` (estimated as for the rate limiter); long documents
+    are cut to the remaining budget, date examples around their date, and
+    skipped if the date does not fit. Neighbours at or above
+    `max_similarity` are skipped, so a near-duplicate of a document does not
+    answer it; the indexed claims themselves belong out of any evaluation.
+
+    Only `fields` get examples. By default that is the date, whose prompt
+    had fixed examples before; the other fields' prompts have none and grow
+    with examples, so they are opt-in.
+
+    Attributes:
+        documents (List[str]): Texts of the labelled claims.
+        labels (Dict[str, List]): Answer per document for each field; None
+            where a document has no label for the field.
+        k (int): Maximum number of examples per request.
+        token_budget (int): Maximum estimated tokens of all examples.
+        max_similarity (float): Similarity from which a neighbour is skipped.
+        fields (Tuple[str, ...]): Fields whose requests get examples.
+    """
+
+    def __init__(
+        self,
+        documents: Sequence[str],
+        labels: Mapping[str, Sequence],
+        k: int = 2,
+        token_budget: int = 400,
+        max_similarity: float = 0.95,
+        min_example_tokens: int = 40,
+        fields: Sequence[str] = ("date",),
+        index: TfidfIndex | None = None,
+    ):
+        self.documents = list(documents)
+        self.labels = {field: list(values) for field, values in labels.items()}
+        self.k = k
+        self.token_budget = token_budget
+        self.max_similarity = max_similarity
+        self.min_example_tokens = min_example_tokens
+        self.fields = tuple(fields)
+        self.index = index or TfidfIndex(self.documents)
+        self._masks = {
+            field: np.array([value is not None for value in values], dtype=bool)
+            for field, values in self.labels.items()
+        }
+        self._types = np.array(
+            self.labels.get("type", [None] * len(self.documents)), dtype=object
+        )
+
+    @classmethod
+    def from_frame(
+        cls,
+        df: pd.DataFrame,
+        cause_mapping: Mapping[str, Mapping[str, int]] | None = None,
+        **kwargs,
+    ) -> "FewShotSelector":
+        """
+        Build a selector from labelled claims as prepared in main.py.
+
+        Args:
+            df: DataFrame with text and the label columns of `LABEL_COLUMNS`,
+                with grouped sd_urs_art and schadentag as TT.MM.JJJJ.
+            cause_mapping: `GPT.cause_mapping`; grouped sd_urs_art codes are
+                turned back into the cause names the model answers with.
+                Without it there are no cause examples.
+            **kwargs: Passed on to `FewShotSelector`.
+        """
+        df = df[df["text"].notna()]
+        labels = {}
+        for field, column in LABEL_COLUMNS.items():
+            if column not in df.columns:
+                continue
+            values = df[column].astype(object)
+            labels[field] = values.where(values.notna(), None).tolist()
+        if "cause" in labels:
+            # cause names depend on the claims type, so both are needed
+            if cause_mapping is None or "type" not in labels:
+                del labels["cause"]
+            else:
+                causes = {
+                    claims_type: {str(code): cause for cause, code in mapping.items()}
+                    for claims_type, mapping in cause_mapping.items()
+                }
+                labels["cause"] = [
+                    causes.get(claims_type, {}).get(str(code))
+                    for claims_type, code in zip(labels["type"], labels["cause"])
+                ]
+        selector = cls(df["text"].tolist(), labels, **kwargs)
+        logger.info(
+            f"Few-shot index of {len(selector.documents)} claims, "
+            f"{len(selector.index.vocabulary)} terms"
+        )
+
+        return selector
+
+    def neighbours(
+        self, field: str, document: str, claims_type: str | None = None
+    ) -> List[Tuple[int, float]]:
+        """Up to `k` (row, similarity) pairs of the nearest labelled documents."""
+        if field not in self.fields or field not in self._masks:
+            return []
+        mask = self._masks[field]
+        if field == "cause" and claims_type is not None:
+            mask = mask & (self._types == claims_type)
+        similarities = self.index.similarities(document)
+        candidates = np.flatnonzero(mask & (similarities < self.max_similarity))
+        if not len(candidates):
+            return []
+        top = candidates[np.argsort(-similarities[candidates], kind="stable")[: self.k]]
+
+        return [(int(row), float(similarities[row])) for row in top]
+
+    def _answer(self, field: str, row: int, reasoning: bool) -> str:
+        label = self.labels[field][row]
+        if reasoning and field == "date":
+            return json.dumps(
+                {"Thinking": DATE_THINKING.format(label), "Date": label},
+                ensure_ascii=False,
+            )
+
+        return json.dumps({ANSWER_KEYS.get(field, "Antwort"): label}, ensure_ascii=False)
+
+    @staticmethod
+    def _cut(text: str, size: int, answer: str | None = None) -> str | None:
+        """
+        About `size` characters of `text` cut at words, or None if none are left.
+
+        If `answer` is in the text, the cut is centred on it; if it is not
+        in the cut, None is returned, so an example never answers with a
+        date its text no longer states.
+        """
+        start = 0
+        if answer and answer in text:
+            start = max(0, text.index(answer) - (size - len(answer)) // 2)
+        end = start + size
+        cut = text[start:end]
+        # drop words cut in half at either end
+        if start > 0 and not text[start - 1].isspace():
+            cut = re.sub(r"^\S*", "", cut, count=1)
+        if end < len(text) and not text[end].isspace():
+            cut = re.sub(r"\S*$", "", cut, count=1)
+        cut = cut.strip()
+        if start > 0:
+            cut = "... " + cut
+        if end < len(text):
+            cut += " ..."
+        if not cut.strip(" .") or (answer and answer in text and answer not in cut):
+            return None
+
+        return cut
+
+    def examples(
+        self,
+        field: str,
+        document: str,
+        claims_type: str | None = None,
+        reasoning: bool = False,
+    ) -> str:
+        """
+        The nearest examples of `field` as <example_n> blocks, or '' if none fit.
+
+        Args:
+            field: Field of the request: type, cause, objekt, notifier or date.
+            document: Document of the request.
+            claims_type: Claims type of a cause request; cause examples are
+                taken from claims of the same type only.
+            reasoning: Whether the prompt asks for 'Thinking' before the
+                answer; date examples then answer with both keys.
+        """
+        blocks = []
+        remaining = self.token_budget
+        for row, _ in self.neighbours(field, document, claims_type):
+            answer = self._answer(field, row, reasoning)
+            number = len(blocks) + 1
+            frame = f"<example_{number}>\n\n\n{answer}\n</example_{number}>"
+            available = remaining - estimate_tokens(frame)
+            if available < self.min_example_tokens:
+                break
+            text = self.documents[row]
+            if estimate_tokens(text) > available:
+                date = self.labels[field][row] if field == "date" else None
+                text = self._cut(text, available * 4, date)
+                if text is None:
+                    continue
+            block = f"<example_{number}>\n{text}\n\n{answer}\n</example_{number}>"
+            blocks.append(block)
+            remaining -= estimate_tokens(block)
+
+        return "\n\n".join(blocks)
+
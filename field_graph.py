@@ -0,0 +1,128 @@
+import asyncio
+from concurrent.futures import FIRST_COMPLETED, Executor, wait
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+FIELD_DEPENDENCIES = {
+    "type": (),
+    "cause": ("type",),
+    "objekt": (),
+    "notifier": (),
+    "date": (),
+}
+
+
+class FieldGraph:
+    """
+    Executes field extraction tasks in dependency order.
+
+    Every task whose dependencies are resolved is started at once, and a
+    dependent task starts as soon as the last of its dependencies finishes.
+    For the FNOL fields only 'cause' waits for 'type', so a document takes
+    about two call latencies instead of five.
+
+    Tasks are called with the results of their dependencies as positional
+    arguments, in the order they are listed in `dependencies`.
+    """
+
+    def __init__(self, dependencies: Dict[str, Tuple[str, ...]] = FIELD_DEPENDENCIES):
+        self.dependencies = dependencies
+        self._check_acyclic()
+
+    def _check_acyclic(self):
+        visited, in_progress = set(), set()
+
+        def visit(name):
+            if name in visited:
+                return
+            if name in in_progress:
+                raise ValueError(f"Cyclic field dependency at '{name}'")
+            in_progress.add(name)
+            for dependency in self.dependencies.get(name, ()):
+                visit(dependency)
+            in_progress.discard(name)
+            visited.add(name)
+
+        for name in self.dependencies:
+            visit(name)
+
+    def _ready(self, pending: Dict[str, Callable], results: Dict[str, Any]) -> list:
+        return [
+            name
+            for name in pending
+            if all(dep in results for dep in self.dependencies.get(name, ()))
+        ]
+
+    def _arguments(self, name: str, results: Dict[str, Any]) -> list:
+        return [results[dep] for dep in self.dependencies.get(name, ())]
+
+    def run(
+        self,
+        tasks: Dict[str, Callable[..., Any]],
+        executor: Executor | None = None,
+        resolved: Dict[str, Any] | None = None,
+    ) -> Dict[str, Any]:
+        """
+        Run tasks on an executor, or one after another if none is given.
+
+        Args:
+            tasks: Mapping of field name to a callable producing its value.
+            executor: Executor used to run independent tasks concurrently.
+            resolved: Field values that are already known and are not run.
+
+        Returns:
+            Mapping of field name to value for all tasks and resolved fields.
+        """
+        results = dict(resolved or {})
+        pending = {name: task for name, task in tasks.items() if name not in results}
+
+        if executor is None:
+            while pending:
+                ready = self._ready(pending, results)
+                if not ready:
+                    raise ValueError(f"Unresolvable fields: {list(pending)}")
+                for name in ready:
+                    results[name] = pending.pop(name)(*self._arguments(name, results))
+            return results
+
+        running = {}
+        while pending or running:
+            for name in self._ready(pending, results):
+                task = pending.pop(name)
+                future = executor.submit(task, *self._arguments(name, results))
+                running[future] = name
+            if not running:
+                raise ValueError(f"Unresolvable fields: {list(pending)}")
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[running.pop(future)] = future.result()
+
+        return results
+
+    async def run_async(
+        self,
+        tasks: Dict[str, Callable[..., Awaitable[Any]]],
+        resolved: Dict[str, Any] | None = None,
+    ) -> Dict[str, Any]:
+        """Awaitable version of `run` for tasks that return coroutines."""
+        results = dict(resolved or {})
+        pending = {name: task for name, task in tasks.items() if name not in results}
+
+        running = {}
+        try:
+            while pending or running:
+                for name in self._ready(pending, results):
+                    task = pending.pop(name)
+                    coroutine = task(*self._arguments(name, results))
+                    running[asyncio.ensure_future(coroutine)] = name
+                if not running:
+                    raise ValueError(f"Unresolvable fields: {list(pending)}")
+                done, _ = await asyncio.wait(
+                    running, return_when=asyncio.FIRST_COMPLETED
+                )
+                for future in done:
+                    results[running.pop(future)] = future.result()
+        finally:
+            for future in running:
+                future.cancel()
+
+        return results
@@ -0,0 +1,91 @@
+import re
+
+from loguru import logger
+
+FORM_MARKERS = (
+    "Schadenanzeige",
+    "Vertragsdaten",
+    "VS-Nr.",
+    "VN:",
+    "Schadendaten",
+    "Schadentag:",
+    "Schaden-Ort:",
+    "Schadenhergang:",
+    "Schadenumfang:",
+    "Anspruchsteller-Daten",
+)
+MIN_MARKERS = 4
+
+OBJEKT_PRODUCTS = {
+    "wohngebäude": "WG",
+    "gebäude": "WG",
+    "hausrat": "HR",
+    "glas": "GL",
+    "glasversicherung": "GL",
+    "kasko": "KF",
+    "teilkasko": "KF",
+    "vollkasko": "KF",
+    "kfz-haftpflicht": "KH",
+    "kraftfahrthaftpflicht": "KH",
+}
+
+NOTIFIER_PHRASES = {
+    "AD": (
+        "Schadenanzeige unseres Kunden",
+        "Schadenanzeige unserer Kundin",
+        "unser gemeinsamer Kunde",
+        "unsere gemeinsame Kundin",
+    ),
+    "VN": (
+        "Meldende Person: VN",
+        "Meldender: Versicherungsnehmer",
+        "Meldende Person: Versicherungsnehmer",
+    ),
+}
+
+PRODUCT_PATTERN = re.compile(r"Produkt:?[ \t]+([\wÄÖÜäöüß\-]+)")
+DATE_PATTERN = re.compile(r"Schadentag:?[ \t]*(\d{1,2})\.(\d{1,2})\.(\d{4})")
+
+
+def is_schadenanzeige(document: str) -> bool:
+    """Recognise the templated broker Schadenanzeige by its field labels."""
+    return sum(marker in document for marker in FORM_MARKERS) >= MIN_MARKERS
+
+
+def parse_schadenanzeige(document: str) -> dict:
+    """
+    Read objekt, notifier and date directly from a templated Schadenanzeige.
+
+    Only fields that the template states explicitly are returned, so the
+    result can be passed as already resolved fields and `GPT` is only asked
+    for the rest. Documents that are not recognised as the template return
+    an empty dict.
+
+    Args:
+        document: Text of the claim document.
+
+    Returns:
+        Dict with the keys objekt, notifier and date, for those that could
+        be resolved.
+    """
+    if not is_schadenanzeige(document):
+        return {}
+
+    fields = {}
+    if match := PRODUCT_PATTERN.search(document):
+        objekt = OBJEKT_PRODUCTS.get(match.group(1).lower())
+        if objekt is not None:
+            fields["objekt"] = objekt
+
+    if match := DATE_PATTERN.search(document):
+        day, month, year = match.groups()
+        fields["date"] = f"{int(day):02d}.{int(month):02d}.{year}"
+
+    for notifier, phrases in NOTIFIER_PHRASES.items():
+        if any(phrase in document for phrase in phrases):
+            fields["notifier"] = notifier
+            break
+
+    logger.info(f"Schadenanzeige erkannt, direkt ermittelt: {fields}")
+
+    return fields
@@ -1,52 +1,294 @@
 import json
+import re
+import time
 from loguru import logger
 from dataclasses import dataclass
-import pandas as pd
-from typing import List
-from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dates import resolve_claims_date
+from field_graph import FIELD_DEPENDENCIES, FieldGraph
+from forms import parse_schadenanzeige
+from metrics import Metrics
+from rate_limiter import RateLimiter
+from response_cache import ResponseCache
+from router import ModelRouter
+
+DATE_MODES = ("reasoning", "strict")
+# '{"Date":"TT.MM.JJJJ"}' is about 10 tokens
+STRICT_DATE_MAX_TOKENS = 16
+DATE_PATTERN = re.compile(r"\d{2}\.\d{2}\.\d{4}")
 
 class GPT:
-    def __init__(self, client):
-        """Initialize a GPT instance with a given version."""
-        self.client = client
-        self.cause_mapping = {
-            "LW": {
-                "Sonstiges": 0,
-                "Rohrbruch": 2,
-                "Armaturen": 4,
-                "Fehlverhalten": 9,
-            },
-            "ST": {
-                "Sturm sonstiges": 10,
-                "Sturm Grundstücksbestandteile": 19,
-                "Hagel": 4,
-                "Gartenmöbel": 7,
-            },
-            "EL": {
-                "Überflutung durch Starkregen": 2,
-                "Sonstiges": 0,
-            },
-            "ED": {
-                "Sonstiges": 0,
-                "einfacher Diebstahl": 70,
-                "Fahrraddiebstahl": 79,
-                "Vandalismus": 9,
-            },
-            "FE": {
-                "Sonstiges": 0,
-                "Überspannung": 6,
-                "Fehlverhalten": 9,
-            },
-        }
-        self.special_cases = {("GL", "GL"): 4711}
-        self.prompt = """
+    # Lookup tables and prompt are shared by all instances, so a GPT is cheap
+    # to create per thread, task or worker.
+    cause_mapping = {
+        "LW": {
+            "Sonstiges": 0,
+            "Rohrbruch": 2,
+            "Armaturen": 4,
+            "Fehlverhalten": 9,
+        },
+        "ST": {
+            "Sturm sonstiges": 10,
+            "Sturm Grundstücksbestandteile": 19,
+            "Hagel": 4,
+            "Gartenmöbel": 7,
+        },
+        "EL": {
+            "Überflutung durch Starkregen": 2,
+            "Sonstiges": 0,
+        },
+        "ED": {
+            "Sonstiges": 0,
+            "einfacher Diebstahl": 70,
+            "Fahrraddiebstahl": 79,
+            "Vandalismus": 9,
+        },
+        "FE": {
+            "Sonstiges": 0,
+            "Überspannung": 6,
+            "Fehlverhalten": 9,
+        },
+    }
+    cause_types = {
+        "LW": [
+            "Rohrbruch",
+            "Armaturen",
+            "Fehlverhalten",
+            "Sonstiges",
+        ],
+        "ST": [
+            "Sturm Grundstücksbestandteile",
+            "Sturm sonstiges",
+            "Hagel",
+            "Gartenmöbel",
+        ],
+        "EL": [
+            "Überflutung durch Starkregen",
+            "Sonstiges",
+        ],
+        "ED": [
+            "einfacher Diebstahl",
+            "Fahrraddiebstahl",
+            "Vandalismus",
+            "Sonstiges",
+        ],
+        "GL": [
+            "Display Schaden",
+            "Einfachverglasung",
+            "Sonderverglasung",
+            "Sonstiges",
+        ],
+        "FE": [
+            "Überspannung",
+            "Fehlverhalten",
+            "Sonstiges",
+        ],
+    }
+    claims_types = ["LW", "ST", "FE", "EL", "ED", "GL", "Other"]
+    objekt_types = ["GL", "HR", "WG", "KF", "KH", "Other"]
+    notifier_types = ["VN", "AD", "Other"]
+    special_cases = {("GL", "GL"): 4711}
+    prompt = """
         Du bist ein intelligenter Assistent in der Schadenbearbeitung einer \
         Versicherung. Bitte lies das nachfolgende Dokument aufmerksam und führe \
         anschließend die Anweisungen exakt durch.\
         Bitte geben Sie die Antwort in einem json Format zurück.
         """
-    
-    def get_claims_type(self, document:str) -> str:
+
+    def __init__(
+        self,
+        client,
+        fused: bool = False,
+        parallel: bool = False,
+        cache: ResponseCache | None = None,
+        rate_limiter: RateLimiter | None = None,
+        metrics: Metrics | None = None,
+        form_parser: bool = False,
+        date_mode: str = "reasoning",
+        router: ModelRouter | None = None,
+        date_resolver: bool = False,
+        few_shot=None,
+    ):
+        """Initialize a GPT instance with a given version.
+
+        Args:
+            client: OpenAI client used for all completion calls.
+            fused: If True, `fde_first_notification_of_loss` extracts all
+                fields with one structured call instead of five.
+            parallel: If True, independent fields of one document are
+                requested concurrently on a thread pool.
+            cache: Optional response cache consulted before every call.
+            rate_limiter: Optional client-side limiter that paces calls per
+                model and retries them on 429.
+            metrics: Optional collector recording latency and token usage
+                of every call.
+            form_parser: If True, fields stated explicitly in a templated
+                Schadenanzeige are read directly instead of asking the model.
+            date_mode: 'reasoning' asks for the date after a written
+                reasoning with few-shot examples; 'strict' asks only for the
+                date under a strict JSON schema with capped output.
+            router: Optional per-field model routing; invalid answers are
+                retried on the next, stronger model of the field's route.
+            date_resolver: If True, a loss date that explicit dates and German
+                relative expressions ('vorgestern', 'letzte Woche Dienstag')
+                determine unambiguously is resolved locally; only the
+                remaining documents ask the model.
+            few_shot: Optional `fewshot.FewShotSelector`; every field
+                request gets the most similar labelled claims as examples,
+                which replace the fixed examples of the date prompt.
+        """
+        if date_mode not in DATE_MODES:
+            raise ValueError(
+                f"Unknown date_mode {date_mode!r}, expected one of {DATE_MODES}"
+            )
+        self.client = client
+        self.fused = fused
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.metrics = metrics
+        self.form_parser = form_parser
+        self.date_mode = date_mode
+        self.router = router
+        self.date_resolver = date_resolver
+        self.few_shot = few_shot
+        self.field_graph = FieldGraph(FIELD_DEPENDENCIES)
+        self.executor = (
+            ThreadPoolExecutor(max_workers=len(FIELD_DEPENDENCIES))
+            if parallel
+            else None
+        )
+
+    def _complete(
+        self, field: str, request: dict, claims_type: str | None = None
+    ) -> str:
+        """Send one chat completion request and return the message content.
+
+        Every field method goes through here, so this is the single place
+        where requests reach the OpenAI client. With a router the request is
+        sent to the models of the field's route until the answer is valid.
+        """
+        if self.router is None:
+            return self._send(field, request)
+
+        models = self.router.models(field, request["model"])
+        for level, model in enumerate(models):
+            content = self._send(field, {**request, "model": model})
+            valid = self._is_valid(field, content, claims_type)
+            if valid or level == len(models) - 1:
+                self.router.record(field, level, valid)
+                return content
+            logger.info(f"Invalid {field} answer from {model}, escalating")
+
+    def _send(self, field: str, request: dict) -> str:
+        start = time.perf_counter()
+        if self.cache is not None:
+            content = self.cache.get(field, request)
+            if content is not None:
+                self._record_call(field, request, start, cache_hit=True)
+                return content
+
+        if self.rate_limiter is not None:
+            response = self.rate_limiter.call(
+                request, lambda: self.client.chat.completions.create(**request)
+            )
+        else:
+            response = self.client.chat.completions.create(**request)
+        content = response.choices[0].message.content
+        self._record_call(field, request, start, response=response)
+
+        # a refusal has no content and must not be served from the cache later
+        if self.cache is not None and content is not None:
+            self.cache.put(field, request, content)
+
+        return content
+
+    def _record_call(
+        self, field: str, request: dict, start: float, response=None, cache_hit=False
+    ):
+        if self.metrics is None:
+            return
+        self.metrics.record_call(
+            field=field,
+            model=request["model"],
+            latency=time.perf_counter() - start,
+            usage=getattr(response, "usage", None),
+            cache_hit=cache_hit,
+        )
+
+    @staticmethod
+    def _parse_answer(content: str, position: int = 0) -> str:
+        answer_dict = json.loads(content)
+
+        return list(answer_dict.values())[position]
+
+    @classmethod
+    def _parse_date(cls, content: str) -> str | None:
+        """Read the date by its 'Date' key, or positionally after 'Thinking'."""
+        answer_dict = json.loads(content)
+        if "Date" in answer_dict:
+            return answer_dict["Date"]
+
+        return cls._parse_answer(content, position=1)
+
+    def _is_valid(
+        self, field: str, content: str, claims_type: str | None = None
+    ) -> bool:
+        """Whether an answer parses to a value `fde_first_notification_of_loss` can use."""
+        try:
+            if field == "type":
+                answer = self._normalize_claims_type(self._parse_answer(content))
+                return answer in self.claims_types
+            if field == "cause":
+                allowed = self.cause_mapping.get(
+                    claims_type, self.cause_types.get(claims_type, ())
+                )
+                answer = self._parse_answer(content)
+                return isinstance(answer, str) and answer.strip() in allowed
+            if field == "objekt":
+                return self._parse_answer(content) in self.objekt_types
+            if field == "notifier":
+                return self._parse_answer(content) in self.notifier_types
+            if field == "date":
+                answer = self._parse_date(content)
+                return answer in (None, "None") or (
+                    isinstance(answer, str) and DATE_PATTERN.fullmatch(answer) is not None
+                )
+        except (ValueError, IndexError, TypeError, AttributeError):
+            # not JSON, not an object, too few keys, or no content (a refusal)
+            return False
+
+        return True
+
+    @staticmethod
+    def _normalize_claims_type(claims_type) -> str | None:
+        if isinstance(claims_type, str):
+            return claims_type.strip()
+
+        return None
+
+    def _few_shot(
+        self,
+        field: str,
+        document: str,
+        claims_type: str | None = None,
+        reasoning: bool = False,
+    ) -> str:
+        """Retrieved examples of `field` for the instructions, or ''."""
+        if self.few_shot is None:
+            return ""
+        examples = self.few_shot.examples(
+            field, document, claims_type=claims_type, reasoning=reasoning
+        )
+        if not examples:
+            return ""
+
+        return f"""
+        Beispiele ähnlicher Schadenmeldungen mit der richtigen Antwort:
+
+        {examples}
+        """
+
+    def claims_type_request(self, document: str) -> dict:
         instructions = """
         - Beantworte, unter Verwendung der entsprechenden Kategorie, in welche \
         Schaden-Kategorie das obige Dokument am besten klassifierziert werden kann.
@@ -58,75 +300,31 @@ class GPT:
         Elementar = 'EL', Diebstahl = 'ED', Glass = 'GL', Sonstige = 'Other'
         """
         
+        instructions += self._few_shot("type", document)
+
         messages=[
             {"role": "system", "content": self.prompt},
             {"role": "user", "content": document},
             {"role": "user", "content": instructions}
         ]
 
-        response = self.client.chat.completions.create(
+        return dict(
             model="gpt-4-turbo",
             response_format={ "type": "json_object" },
             messages=messages
         )
-        
-        claims_type_dict = json.loads(response.choices[0].message.content)
-        claims_type = list(claims_type_dict.values())[0]
+
+    def get_claims_type(self, document:str) -> str:
+        content = self._complete("type", self.claims_type_request(document))
+        claims_type = self._parse_answer(content)
         
         return claims_type
     
-    def get_cause(self, document: str, claims_type: str) -> str:
-        """
-        Classifies the type of an insurance claim based on the content of the
-            document.
-
-            This method generates a prompt for the language model using a specific
-            template, sends the prompt to the model, and returns the model's
-            response. The response classifies the claim into predefined categories
-            based on the document content.
-        
-        """
+    def cause_request(self, document: str, claims_type: str) -> dict | None:
+        """Build the cause request, or None if the claims type has no causes."""
         
-        if claims_type == "LW":
-            cause_types = [
-                "Rohrbruch",
-                "Armaturen",
-                "Fehlverhalten",
-                "Sonstiges",
-            ]
-        elif claims_type == "ST":
-            cause_types = [
-                "Sturm Grundstücksbestandteile",
-                "Sturm sonstiges",
-            "Hagel",
-                    "Gartenmöbel",
-                ]
-        elif claims_type == "EL":
-            cause_types = [
-                "Überflutung durch Starkregen",
-                "Sonstiges",
-            ]
-        elif claims_type == "ED":
-            cause_types = [
-                "einfacher Diebstahl",
-                "Fahrraddiebstahl",
-                "Vandalismus",
-                "Sonstiges",
-            ]
-        elif claims_type == "GL":
-            cause_types = [
-                "Display Schaden",
-                "Einfachverglasung",
-                "Sonderverglasung",
-                "Sonstiges",
-            ]
-        elif claims_type == "FE":
-            cause_types = [
-                "Überspannung",
-                "Fehlverhalten",
-                "Sonstiges",
-            ]
-        else:
+        cause_types = self.cause_types.get(claims_type)
+        if cause_types is None:
             logger.info(
                 f"Schaden-Typ: {claims_type}, "
                 f"daher wird keine SD-URS-ART ermittelt"
@@ -145,35 +343,42 @@ class GPT:
             </instructions>
             """
             
+        instructions += self._few_shot("cause", document, claims_type)
+
         messages=[
                 {"role": "system", "content": self.prompt},
                 {"role": "user", "content": document},
                 {"role": "user", "content": instructions}
             ]
         
-        response = self.client.chat.completions.create(
+        return dict(
                 model="gpt-3.5-turbo-0125",
                 response_format={ "type": "json_object" },
                 messages=messages
             )
-            
-        cause_type_dict = json.loads(response.choices[0].message.content)
-        cause_type = list(cause_type_dict.values())[0]
-        
-        return cause_type
-    
-    def get_notifier(self, document: str) -> str:
-        
+
+    def get_cause(self, document: str, claims_type: str) -> str:
         """
-        Determines who reported the insurance claim based on the document
-        content.
+        Classifies the type of an insurance claim based on the content of the
+            document.
 
-        This method uses a specific template to generate a prompt for the
-        language model.The prompt asks the model to identify who reported
-        the damage from the content of the document. The response
-        categorizes the notifier into predefined groups: policyholder,
-        field agent, or others.
+            This method generates a prompt for the language model using a specific
+            template, sends the prompt to the model, and returns the model's
+            response. The response classifies the claim into predefined categories
+            based on the document content.
+        
         """
+        request = self.cause_request(document, claims_type)
+        if request is None:
+            return None
+
+        content = self._complete("cause", request, claims_type=claims_type)
+        cause_type = self._parse_answer(content)
+        
+        return cause_type
+    
+    def notifier_request(self, document: str) -> dict:
+        """Build the notifier request for the given document."""
         
         instructions = """
                 <instructions>
@@ -187,35 +392,41 @@ class GPT:
                 </instructions>
                 """
                             
+        instructions += self._few_shot("notifier", document)
+
         messages=[
                 {"role": "system", "content": self.prompt},
                 {"role": "user", "content": document},
                 {"role": "user", "content": instructions}
             ]
         
-        response = self.client.chat.completions.create(
+        return dict(
                 model="gpt-3.5-turbo-0125",
                 response_format={ "type": "json_object" },
                 messages=messages
             )
-            
-        notifier_dict = json.loads(response.choices[0].message.content)
-        notifier = list(notifier_dict.values())[0]
+
+    def get_notifier(self, document: str) -> str:
+        """
+        Determines who reported the insurance claim based on the document
+        content.
+
+        This method uses a specific template to generate a prompt for the
+        language model.The prompt asks the model to identify who reported
+        the damage from the content of the document. The response
+        categorizes the notifier into predefined groups: policyholder,
+        field agent, or others.
+        """
+        content = self._complete("notifier", self.notifier_request(document))
+        notifier = self._parse_answer(content)
         
         return notifier
     
-    def get_claims_date(self, document: str) -> str:
-        """
-        Extracts the date of the insurance claim from the document using a
-        structured prompt.
+    def claims_date_request(self, document: str) -> dict:
+        """Build the claims date request for the given document."""
+        if self.date_mode == "strict":
+            return self.strict_claims_date_request(document)
 
-        This method formats a detailed prompt that instructs the language
-        model to read through the provided insurance claim document and
-        return the date of the claim in a JSON format. The prompt emphasizes
-        careful reading and structured JSON response that includes both the
-        reasoning process ("Thinking") and the identified date ("Date").
-        
-        """
         instructions = """
             Ihre Aufgabe besteht darin, den Text aus dem Schadensbericht zu 
             lesen und einen JSON mit Ihrem Denkprozess und dem Schadensdatum 
@@ -229,7 +440,8 @@ class GPT:
             - Das JSON soll die keys 'Thinking' und 'Date' enthalten.
             - Geben Sie Datum unter dem key 'Date' im Format TT.MM.JJJJ zurück.
             </instructions>
-
+"""
+        examples = self._few_shot("date", document, reasoning=True) or """
             <example_1>
             "120552.78005.076-00; Schadenmeldung Vetragsnr.: 5432862421
             Eve Tokes An. NKO Importer PROD.de 08.04.2024 09:30
@@ -286,6 +498,7 @@ class GPT:
             </example_2>
             
             """
+        instructions += examples
             
         messages=[
             {"role": "system", "content": self.prompt},
@@ -293,28 +506,74 @@ class GPT:
             {"role": "user", "content": instructions}
         ]
         
-        response = self.client.chat.completions.create(
+        return dict(
                 model="gpt-3.5-turbo-0125",
                 response_format={ "type": "json_object" },
                 messages=messages
             )
-        
-        date_dict = json.loads(response.choices[0].message.content)
-        date = list(date_dict.values())[1]
-        
-        return date
-        
-    def get_claims_objekt(self, document: str) -> str:
+
+    def strict_claims_date_request(self, document: str) -> dict:
         """
-        Identifies the category of the object involved in the insurance claim
-        based on the document content.
+        Build the date request of the 'strict' date mode.
 
-        This method uses a predefined template to generate a prompt that
-        instructs the language model
-        to categorize the damage or loss reported in the insurance claim document.
-        The model is expected to respond with an abbreviation representing the
-        best-fitting category among predefined options.
+        The model returns nothing but the date: no reasoning and, without
+        a `few_shot` selector, no examples in the prompt, a strict schema
+        with the single key 'Date' and a small `max_tokens`.
+        """
+        instructions = """
+        - Gib das Datum zurück, an dem der Schaden eingetreten ist, im Format \
+        TT.MM.JJJJ unter dem key 'Date'.
+        - Bei aufeinanderfolgenden Daten zum Vorfall wähle immer das erste Datum.
+        - Nenne das Dokument kein Schadensdatum, gib null zurück.
         """
+
+        instructions += self._few_shot("date", document)
+
+        messages=[
+            {"role": "system", "content": self.prompt},
+            {"role": "user", "content": document},
+            {"role": "user", "content": instructions}
+        ]
+
+        return dict(
+            model="gpt-4o-mini-2024-07-18",
+            response_format={
+                "type": "json_schema",
+                "json_schema": {
+                    "name": "claims_date",
+                    "strict": True,
+                    "schema": {
+                        "type": "object",
+                        "properties": {"Date": {"type": ["string", "null"]}},
+                        "required": ["Date"],
+                        "additionalProperties": False,
+                    },
+                },
+            },
+            max_tokens=STRICT_DATE_MAX_TOKENS,
+            messages=messages
+        )
+
+    def get_claims_date(self, document: str) -> str:
+        """
+        Extracts the date of the insurance claim from the document using a
+        structured prompt.
+
+        This method formats a detailed prompt that instructs the language
+        model to read through the provided insurance claim document and
+        return the date of the claim in a JSON format. The prompt emphasizes
+        careful reading and structured JSON response that includes both the
+        reasoning process ("Thinking") and the identified date ("Date").
+        With `date_mode='strict'` only the date is requested, see
+        `strict_claims_date_request`.
+        """
+        content = self._complete("date", self.claims_date_request(document))
+        date = self._parse_date(content)
+        
+        return date
+        
+    def claims_objekt_request(self, document: str) -> dict:
+        """Build the claims object request for the given document."""
         
         instructions = """
                 <instructions>
@@ -331,23 +590,169 @@ class GPT:
                 </instructions>
                 """
                 
+        instructions += self._few_shot("objekt", document)
+
         messages=[
             {"role": "system", "content": self.prompt},
             {"role": "user", "content": document},
             {"role": "user", "content": instructions}
         ]
         
-        response = self.client.chat.completions.create(
+        return dict(
                 model="gpt-3.5-turbo-0125",
                 response_format={ "type": "json_object" },
                 messages=messages
             )
-        
-        claims_object_dict = json.loads(response.choices[0].message.content)
-        claims_object = list(claims_object_dict.values())[0]
+
+    def get_claims_objekt(self, document: str) -> str:
+        """
+        Identifies the category of the object involved in the insurance claim
+        based on the document content.
+
+        This method uses a predefined template to generate a prompt that
+        instructs the language model
+        to categorize the damage or loss reported in the insurance claim document.
+        The model is expected to respond with an abbreviation representing the
+        best-fitting category among predefined options.
+        """
+        content = self._complete("objekt", self.claims_objekt_request(document))
+        claims_object = self._parse_answer(content)
         
         return claims_object
     
+    def fused_request(self, document: str) -> dict:
+        """
+        Build a single request that asks for all FNOL fields at once.
+
+        The answer is constrained by a strict JSON schema. Type and cause are
+        returned together as 'claim', whose variants pair every claims type
+        with its own list of causes from `cause_types`, so the cause still
+        depends on the chosen type.
+        """
+        instructions = """
+                <instructions>
+                - Beantworte alle folgenden Fragen zum obigen Dokument in einem
+                JSON mit den keys 'claim', 'objekt', 'notifier' und 'date'.
+                - 'claim': In welche Schaden-Kategorie das Dokument am besten
+                klassifiziert werden kann, als Kürzel unter 'type':
+                Leitungswasser = 'LW', Sturm = 'ST', Feuer = 'FE',
+                Elementar = 'EL', Diebstahl = 'ED', Glass = 'GL',
+                Sonstige = 'Other'. Unter 'cause' die zugehörige
+                Schaden-Ursache aus der Liste dieser Kategorie, bei 'Other'
+                null.
+                - 'objekt': Kürzel der am besten passenden Kategorie:
+                Glass = 'GL', Hausrat = 'HR', Wohngebäude = 'WG', Kasko = 'KF',
+                Kraftfahrthaftpflicht = 'KH', Sonstige = 'Other'. Ein
+                Fahrraddiebstahl fällt in der Regel in die Kategorie 'Hausrat'.
+                - 'notifier': Wer den Schaden gemeldet hat:
+                Versicherungsnehmer = 'VN', Außendienstler = 'AD',
+                Sonstige = 'Other'.
+                - 'date': Das Schadensdatum im Format TT.MM.JJJJ oder null,
+                wenn kein Datum genannt ist. Bei aufeinanderfolgenden Daten
+                zum Vorfall wählen Sie immer das erste Datum.
+                </instructions>
+                """
+
+        claim_variants = [
+            {
+                "type": "object",
+                "properties": {
+                    "type": {"type": "string", "enum": [claims_type]},
+                    "cause": {"type": "string", "enum": cause_types},
+                },
+                "required": ["type", "cause"],
+                "additionalProperties": False,
+            }
+            for claims_type, cause_types in self.cause_types.items()
+        ]
+        claim_variants.append(
+            {
+                "type": "object",
+                "properties": {
+                    "type": {"type": "string", "enum": ["Other"]},
+                    "cause": {"type": "null"},
+                },
+                "required": ["type", "cause"],
+                "additionalProperties": False,
+            }
+        )
+        schema = {
+            "type": "object",
+            "properties": {
+                "claim": {"anyOf": claim_variants},
+                "objekt": {"type": "string", "enum": self.objekt_types},
+                "notifier": {"type": "string", "enum": self.notifier_types},
+                "date": {"type": ["string", "null"]},
+            },
+            "required": ["claim", "objekt", "notifier", "date"],
+            "additionalProperties": False,
+        }
+
+        messages=[
+            {"role": "system", "content": self.prompt},
+            {"role": "user", "content": document},
+            {"role": "user", "content": instructions}
+        ]
+
+        return dict(
+            model="gpt-4o-2024-08-06",
+            response_format={
+                "type": "json_schema",
+                "json_schema": {
+                    "name": "first_notification_of_loss",
+                    "strict": True,
+                    "schema": schema,
+                },
+            },
+            messages=messages
+        )
+
+    def _fused_result(self, content: str | None, resolved: dict | None = None) -> dict:
+        """Turn a fused answer into the `fde_first_notification_of_loss` dict.
+
+        Fields in `resolved` override the fused answer. If the resolved type
+        differs from the fused one, the fused cause belongs to the wrong
+        type and is dropped unless a cause is resolved as well.
+        """
+        resolved = resolved or {}
+        answer = json.loads(content) if content is not None else {}
+        claim = answer.get("claim") or {}
+        fields = {
+            "type": self._normalize_claims_type(claim.get("type")),
+            "cause": claim.get("cause"),
+            "objekt": answer.get("objekt"),
+            "notifier": answer.get("notifier"),
+            "date": answer.get("date"),
+        }
+        if (
+            "type" in resolved
+            and resolved["type"] != fields["type"]
+            and "cause" not in resolved
+            and "cause_code" not in resolved
+        ):
+            fields["cause"] = None
+        fields.update(resolved)
+
+        return self._assemble_result(fields)
+
+    @staticmethod
+    def _fully_resolved(resolved: dict) -> bool:
+        return all(field in resolved for field in FIELD_DEPENDENCIES)
+
+    def get_fused(self, document: str, resolved: dict | None = None) -> dict:
+        """
+        Extracts type, cause, objekt, notifier and date with a single call.
+
+        The document is sent once, so its input tokens are paid once per
+        claim instead of once per field. Fields in `resolved` take precedence
+        over the answer; if all fields are resolved, no call is made.
+        """
+        if resolved and self._fully_resolved(resolved):
+            return self._fused_result(None, resolved)
+        content = self._complete("fused", self.fused_request(document))
+
+        return self._fused_result(content, resolved)
+
     def cause_mapper(
         self, claims_object: str, claims_type: str, cause_type: str
     ) -> str | None:
@@ -375,49 +780,98 @@ class GPT:
             logger.warning(f"Invalid {e.args[0]}")
             return None
         
-    def fde_first_notification_of_loss(self, document: str) -> dict:
-        """
-        Executes all related methods to process the first notification of loss
-        based on the given document.
-
-        This function orchestrates the execution of several methods to extract
-        comprehensive information
-        about an insurance claim from a document. It first determines the claims
-        type and, based on that,
-        it may conditionally proceed to determine the cause type and other
-        details.
-        """
-        
+    def _resolve_claims_type(self, document: str) -> str | None:
         try:
-            claims_type = self.get_claims_type(document)
-            if isinstance(claims_type, str):
-                claims_type = claims_type.strip()
-            else:
-                claims_type = None
+            return self._normalize_claims_type(self.get_claims_type(document))
         except ValueError:
-            claims_type = None
+            return None
+
+    def _field_tasks(self, document: str) -> dict:
+        """Map every FNOL field to the call extracting it from the document."""
+        return {
+            "type": lambda: self._resolve_claims_type(document),
+            "cause": lambda claims_type: self.get_cause(
+                document=document, claims_type=claims_type
+            ),
+            "objekt": lambda: self.get_claims_objekt(document),
+            "notifier": lambda: self.get_notifier(document),
+            "date": lambda: self.get_claims_date(document),
+        }
+
+    def _resolved_fields(self, document: str, resolved: dict | None = None) -> dict:
+        """Fields that can be determined without calling the model."""
+        resolved = dict(resolved or {})
+        if self.form_parser:
+            for field, value in parse_schadenanzeige(document).items():
+                resolved.setdefault(field, value)
+        if self.date_resolver and "date" not in resolved:
+            if (date := resolve_claims_date(document)) is not None:
+                resolved["date"] = date
+
+        return resolved
 
-        if desc := self.get_cause(document=document, claims_type=claims_type):
+    def _assemble_result(self, fields: dict) -> dict:
+        """Map the extracted cause and build the FNOL result dict.
+
+        A 'cause_code' field holds a cause that is already in its
+        alphanumerical form and is used as is instead of `cause_mapper`.
+        """
+        if desc := fields.get("cause"):
             cause_description = desc.strip()
         else:
             cause_description = None
 
-        claims_object = self.get_claims_objekt(document)
-        cause_alphanumerical = self.cause_mapper(
-            claims_object=claims_object,
-            claims_type=claims_type,
-            cause_type=cause_description,
-        )
+        if "cause_code" in fields:
+            cause_alphanumerical = fields["cause_code"]
+        else:
+            cause_alphanumerical = self.cause_mapper(
+                claims_object=fields.get("objekt"),
+                claims_type=fields.get("type"),
+                cause_type=cause_description,
+            )
 
         result = {
-            "type": claims_type,
+            "type": fields.get("type"),
             "cause": cause_alphanumerical,
-            "notifier": self.get_notifier(document),
-            "date": self.get_claims_date(document),
-            "objekt": claims_object,
+            "notifier": fields.get("notifier"),
+            "date": fields.get("date"),
+            "objekt": fields.get("objekt"),
         }
 
         return result
+
+    def fde_first_notification_of_loss(
+        self, document: str, resolved: dict | None = None
+    ) -> dict:
+        """
+        Executes all related methods to process the first notification of loss
+        based on the given document.
+
+        This function orchestrates the execution of several methods to extract
+        comprehensive information
+        about an insurance claim from a document. It first determines the claims
+        type and, based on that,
+        it may conditionally proceed to determine the cause type and other
+        details.
+
+        The calls are scheduled by a `FieldGraph`. With `parallel=True` the
+        independent fields run concurrently and the cause starts as soon as
+        the type is known; otherwise they run one after another. With
+        `fused=True` everything is extracted by `get_fused` in one call.
+        Fields passed in `resolved` or found by `_resolved_fields` are not
+        requested from the model, or with `fused=True` override its answer.
+        """
+        resolved = self._resolved_fields(document, resolved)
+        if self.fused:
+            return self.get_fused(document, resolved)
+
+        fields = self.field_graph.run(
+            self._field_tasks(document),
+            executor=self.executor,
+            resolved=resolved,
+        )
+
+        return self._assemble_result(fields)
     
 @dataclass   
 class FirstNotificationOfLoss:
@@ -445,374 +899,15 @@ class FirstNotificationOfLoss:
     schaden_datum: str
 
 
-    def group_sd_urs_art(df: pd.DataFrame) -> pd.DataFrame:
-        """Group sd_urs_art into main categories based on sd_typ_kennung.
-
-        Args:
-            df: pd.DataFrame to be grouped
-
-        Returns:
-            DataFrame containing main categories for sd_urs_art based on sd_typ_kennung
-        """
-        logger.info("Grouping sd_urs_art and schaden_objekt")
-        list_sub_dfs = [
-            y
-            for x, y in df.groupby(
-                ["sd_typ_kennung", "schaden_objekt"], as_index=False
-            )
-        ]
-
-        result_df_list = []
-
-        for sub_df in list_sub_dfs:
-            if sub_df["sd_typ_kennung"].iloc[0] == "LW":
-                sub_df.sd_urs_art = sub_df.sd_urs_art.astype(str)
-                sub_df.sd_urs_art = sub_df.sd_urs_art.apply(lambda x: x[0])
-                sub_df = sub_df.replace(
-                    {"sd_urs_art": {r"^[^0249]*$": "0"}}, regex=True
-                )
-                result_df_list.append(sub_df)
-
-            elif sub_df["sd_typ_kennung"].iloc[0] == "ST":
-                sub_df.sd_urs_art = sub_df.sd_urs_art.astype(str)
-                sub_df["sd_urs_art"] = (
-                    sub_df["sd_urs_art"]
-                    .apply(lambda x: x[0] if x not in ["10", "19"] else x)
-                    .apply(
-                        lambda x: x
-                        if x in ["0", "1", "10", "19", "4", "7"]
-                        else "1"
-                    )
-                    .apply(lambda x: "10" if x == "1" else x)
-                )
-                result_df_list.append(sub_df)
-
-            elif sub_df["sd_typ_kennung"].iloc[0] == "EL":
-                sub_df.sd_urs_art = sub_df.sd_urs_art.astype(str)
-                sub_df.sd_urs_art = sub_df.sd_urs_art.apply(lambda x: x[0])
-                sub_df = sub_df.replace(
-                    {"sd_urs_art": {r"^.*[^2]$": "0"}}, regex=True, inplace=False
-                )
-                result_df_list.append(sub_df)
-
-            elif sub_df["sd_typ_kennung"].iloc[0] == "ED":
-                sub_df["sd_urs_art"] = (
-                    sub_df["sd_urs_art"]
-                    .astype(str)
-                    .apply(lambda x: x[0] if x not in ["70", "79"] else x)
-                    .apply(lambda x: x if x in ["0", "7", "70", "79"] else "0")
-                    .apply(lambda x: "70" if x == "7" else x)
-                )
-
-                result_df_list.append(sub_df)
-
-            elif (
-                sub_df["sd_typ_kennung"].iloc[0] == "GL"
-                and sub_df["schaden_objekt"].iloc[0] == "GL"
-            ):
-                sub_df.sd_urs_art = sub_df.sd_urs_art.astype(str)
-                sub_df["sd_urs_art"] = sub_df["sd_urs_art"].replace("9", "09")
-                sub_df["sd_urs_art"] = sub_df["sd_urs_art"].replace(
-                    {"^(?!09$|11$|12$).*$": "00"}, regex=True, inplace=False
-                )
-                result_df_list.append(sub_df)
-
-            elif sub_df["sd_typ_kennung"].iloc[0] == "GL" and (
-                sub_df["schaden_objekt"].iloc[0] in ["HR", "WG"]
-            ):
-                sub_df.sd_urs_art = sub_df.sd_urs_art.astype(str)
-                sub_df["sd_urs_art"] = "00"
-                result_df_list.append(sub_df)
-
-            elif sub_df["sd_typ_kennung"].iloc[0] == "FE":
-                sub_df.sd_urs_art = sub_df.sd_urs_art.astype(str)
-                sub_df.sd_urs_art = sub_df.sd_urs_art.apply(lambda x: x[0]).apply(
-                    lambda x: x if x in ["6", "9"] else "0"
-                )
-
-                result_df_list.append(sub_df)
-
-            elif (
-                sub_df["sd_typ_kennung"].iloc[0] == "VK"
-                or sub_df["sd_typ_kennung"].iloc[0] == "TK"
-            ):
-                sd_typ_kennung = sub_df["sd_typ_kennung"].iloc[0]
-                sub_df.sd_urs_art = sub_df.sd_urs_art.astype(int)
-                categories = {
-                    "VK": {1: [51], 2: [562], 3: [564, 561, 57, 563, 565]},
-                    "TK": {
-                        77: [77],
-                        741: [741, 742, 743, 744],
-                        782: [782],
-                        751: [751],
-                        733: [
-                            71,
-                            78,
-                            781,
-                            72,
-                            79,
-                            791,
-                            76,
-                            753,
-                            731,
-                            732,
-                            752,
-                            733,
-                            734,
-                            771,
-                            783,
-                            792,
-                            793,
-                        ],
-                    },
-                }
-
-                categories_mapping = {
-                    **{
-                        "VK": {
-                            val: k
-                            for k, l in categories["VK"].items()
-                            for val in l
-                        }
-                    },
-                    **{
-                        "TK": {
-                            val: k
-                            for k, l in categories["TK"].items()
-                            for val in l
-                        }
-                    },
-                }
-
-                sub_df["sd_urs_art"] = sub_df["sd_urs_art"].map(
-                    categories_mapping[sd_typ_kennung]
-                )
-                sub_df.sd_urs_art = sub_df.sd_urs_art.astype(str)
-                result_df_list.append(sub_df)
-            else:
-                result_df_list.append(sub_df)
-
-        result_df = pd.concat(result_df_list)
-        result_df = result_df.reset_index(drop=True)
-
-        return result_df
-        
-@dataclass
-class DirksClaims:
-    """
-    A class representing a collection of claims data for Dirk's insurance claims
-     processing.
-
-    Attributes:
-        doc_id_list (List[str]): List of document identifiers for the claims.
-        schaden_objekt_list (List[str]): List of objects involved in the claims.
-        schaden_typ_list (List[str]): List of types of damage involved in the
-        claims.
-        sd_urs_art_list (List[str]): List of cause types for the damages.
-        schaden_datum_list (List[str]): List of dates when the damages occurred.
-
-    The class aggregates information from individual lists into structured
-    claims data using the `FirstNotificationOfLoss` class for each claim entry.
-    """
-
-    doc_id_list: List[str]
-    schaden_objekt_list: List[str]
-    schaden_typ_list: List[str]
-    sd_urs_art_list: List[str]
-    schaden_datum_list: List[str]
-    
-    def __post_init__(self):
-        """
-        Post-initialization processing to convert lists of claims data into a
-        list of `FirstNotificationOfLoss` objects.
-
-        This method automatically runs after the class is instantiated to bundle
-        the provided claims lists into structured objects. It iterates over the
-        combined entries of all provided lists and creates a
-        `FirstNotificationOfLoss` object for each set of entries.
-
-        Raises:
-            ValueError: If the lengths of the input lists do not match,
-                indicating inconsistent data which cannot be correctly paired
-                into claims.
-        """
-        if not all(
-            len(lst) == len(self.doc_id_list)
-            for lst in [
-                self.schaden_objekt_list,
-                self.schaden_typ_list,
-                self.sd_urs_art_list,
-                self.schaden_datum_list,
-            ]
-        ):
-            raise ValueError("All input lists must have the same length.")
-
-        self.info = [
-            FirstNotificationOfLoss(
-                doc_id=doc_id,
-                schaden_objekt=schaden_objekt,
-                schaden_typ=schaden_typ,
-                sd_urs_art=sd_urs_art,
-                schaden_datum=schaden_datum,
-            )
-            for doc_id, schaden_objekt, schaden_typ, sd_urs_art, schaden_datum in zip(
-                self.doc_id_list,
-                self.schaden_objekt_list,
-                self.schaden_typ_list,
-                self.sd_urs_art_list,
-                self.schaden_datum_list,
-            )
-        ]
-               
-
-def group_sd_urs_art(df: pd.DataFrame) -> pd.DataFrame:
-    """Group sd_urs_art into main categories based on sd_typ_kennung.
-
-    Args:
-        df: pd.DataFrame to be grouped
-
-    Returns:
-        DataFrame containing main categories for sd_urs_art based on sd_typ_kennung
-    """
-    logger.info("Grouping sd_urs_art and schaden_objekt")
-    list_sub_dfs = [
-        y
-        for x, y in df.groupby(
-            ["sd_typ_kennung", "schaden_objekt"], as_index=False
-        )
-    ]
-
-    result_df_list = []
+# Evaluation code lives in `evaluation`, so the inference path does not
+# import pandas. The names stay importable from here for existing callers.
+EVALUATION_NAMES = ("DirksClaims", "URS_ART_CATEGORIES", "URS_ART_LOOKUP", "group_sd_urs_art")
 
-    for sub_df in list_sub_dfs:
-        if sub_df["sd_typ_kennung"].iloc[0] == "LW":
-            sub_df.sd_urs_art = sub_df.sd_urs_art.astype(str)
-            sub_df.sd_urs_art = sub_df.sd_urs_art.apply(lambda x: x[0])
-            sub_df = sub_df.replace(
-                {"sd_urs_art": {r"^[^0249]*$": "0"}}, regex=True
-            )
-            result_df_list.append(sub_df)
-
-        elif sub_df["sd_typ_kennung"].iloc[0] == "ST":
-            sub_df.sd_urs_art = sub_df.sd_urs_art.astype(str)
-            sub_df["sd_urs_art"] = (
-                sub_df["sd_urs_art"]
-                .apply(lambda x: x[0] if x not in ["10", "19"] else x)
-                .apply(
-                    lambda x: x
-                    if x in ["0", "1", "10", "19", "4", "7"]
-                    else "1"
-                )
-                .apply(lambda x: "10" if x == "1" else x)
-            )
-            result_df_list.append(sub_df)
 
-        elif sub_df["sd_typ_kennung"].iloc[0] == "EL":
-            sub_df.sd_urs_art = sub_df.sd_urs_art.astype(str)
-            sub_df.sd_urs_art = sub_df.sd_urs_art.apply(lambda x: x[0])
-            sub_df = sub_df.replace(
-                {"sd_urs_art": {r"^.*[^2]$": "0"}}, regex=True, inplace=False
-            )
-            result_df_list.append(sub_df)
-
-        elif sub_df["sd_typ_kennung"].iloc[0] == "ED":
-            sub_df["sd_urs_art"] = (
-                sub_df["sd_urs_art"]
-                .astype(str)
-                .apply(lambda x: x[0] if x not in ["70", "79"] else x)
-                .apply(lambda x: x if x in ["0", "7", "70", "79"] else "0")
-                .apply(lambda x: "70" if x == "7" else x)
-            )
-
-            result_df_list.append(sub_df)
-
-        elif (
-            sub_df["sd_typ_kennung"].iloc[0] == "GL"
-            and sub_df["schaden_objekt"].iloc[0] == "GL"
-        ):
-            sub_df.sd_urs_art = sub_df.sd_urs_art.astype(str)
-            sub_df["sd_urs_art"] = sub_df["sd_urs_art"].replace("9", "09")
-            sub_df["sd_urs_art"] = sub_df["sd_urs_art"].replace(
-                {"^(?!09$|11$|12$).*$": "00"}, regex=True, inplace=False
-            )
-            result_df_list.append(sub_df)
-
-        elif sub_df["sd_typ_kennung"].iloc[0] == "GL" and (
-            sub_df["schaden_objekt"].iloc[0] in ["HR", "WG"]
-        ):
-            sub_df.sd_urs_art = sub_df.sd_urs_art.astype(str)
-            sub_df["sd_urs_art"] = "00"
-            result_df_list.append(sub_df)
-
-        elif sub_df["sd_typ_kennung"].iloc[0] == "FE":
-            sub_df.sd_urs_art = sub_df.sd_urs_art.astype(str)
-            sub_df.sd_urs_art = sub_df.sd_urs_art.apply(lambda x: x[0]).apply(
-                lambda x: x if x in ["6", "9"] else "0"
-            )
-
-            result_df_list.append(sub_df)
-
-        elif (
-            sub_df["sd_typ_kennung"].iloc[0] == "VK"
-            or sub_df["sd_typ_kennung"].iloc[0] == "TK"
-        ):
-            sd_typ_kennung = sub_df["sd_typ_kennung"].iloc[0]
-            sub_df.sd_urs_art = sub_df.sd_urs_art.astype(int)
-            categories = {
-                "VK": {1: [51], 2: [562], 3: [564, 561, 57, 563, 565]},
-                "TK": {
-                    77: [77],
-                    741: [741, 742, 743, 744],
-                    782: [782],
-                    751: [751],
-                    733: [
-                        71,
-                        78,
-                        781,
-                        72,
-                        79,
-                        791,
-                        76,
-                        753,
-                        731,
-                        732,
-                        752,
-                        733,
-                        734,
-                        771,
-                        783,
-                        792,
-                        793,
-                    ],
-                },
-            }
-
-            categories_mapping = {
-                **{
-                    "VK": {
-                        val: k
-                        for k, l in categories["VK"].items()
-                        for val in l
-                    }
-                },
-                **{
-                    "TK": {
-                        val: k
-                        for k, l in categories["TK"].items()
-                        for val in l
-                    }
-                },
-            }
-
-            sub_df["sd_urs_art"] = sub_df["sd_urs_art"].map(
-                categories_mapping[sd_typ_kennung]
-            )
-            sub_df.sd_urs_art = sub_df.sd_urs_art.astype(str)
-            result_df_list.append(sub_df)
-        else:
-            result_df_list.append(sub_df)
+def __getattr__(name):
+    if name in EVALUATION_NAMES:
+        import evaluation
 
-    result_df = pd.concat(result_df_list)
-    result_df = result_df.reset_index(drop=True)
+        return getattr(evaluation, name)
 
-    return result_df
\ No newline at end of file
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
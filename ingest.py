@@ -0,0 +1,42 @@
+from typing import Iterator, List
+
+import pandas as pd
+import pyarrow.parquet as pq
+from loguru import logger
+
+EVALUATION_COLUMNS = [
+    "doc_id",
+    "text",
+    "schaden_objekt",
+    "sd_typ_kennung",
+    "sd_urs_art",
+    "schadentag",
+]
+
+
+def iter_claim_batches(
+    path: str, columns: List[str] = EVALUATION_COLUMNS, batch_size: int = 5_000
+) -> Iterator[pd.DataFrame]:
+    """
+    Stream claims from a Parquet file in batches of at most `batch_size` rows.
+
+    Row groups are read one after another through pyarrow and only `columns`
+    are decoded, so peak memory depends on the batch size rather than on the
+    size of the file.
+
+    Args:
+        path: Path of the Parquet file.
+        columns: Columns to read; by default those needed for the evaluation.
+        batch_size: Maximum number of rows per batch.
+
+    Yields:
+        One DataFrame per batch with a fresh RangeIndex.
+    """
+    parquet_file = pq.ParquetFile(path)
+    metadata = parquet_file.metadata
+    logger.info(
+        f"Streaming {metadata.num_rows} rows in {metadata.num_row_groups} row groups "
+        f"from {path}, columns {columns}"
+    )
+    for batch in parquet_file.iter_batches(batch_size=batch_size, columns=columns):
+        yield batch.to_pandas()
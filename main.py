@@ -1,12 +1,22 @@
 
 from dotenv import load_dotenv, find_dotenv
 import os
-from openai import OpenAI
-from gpt import GPT, FirstNotificationOfLoss, group_sd_urs_art, DirksClaims
-import pandas as pd
+import asyncio
+from async_gpt import AsyncGPT
+from evaluation import DateResolverReport, group_sd_urs_art
+from fewshot import FewShotSelector
+from gpt import GPT
+from checkpoint import Checkpoint
+from clients import ClientConfig, ClientFactory
+from claims import ClaimComparison, ClaimTable
+from ingest import iter_claim_batches
+from metrics import Metrics
+from normalize import normalize_column
+from rate_limiter import ModelLimits, RateLimiter
+from response_cache import ResponseCache
+from router import ModelRouter
 import time
 from loguru import logger
-from collections import Counter
 
 
 
@@ -42,105 +52,211 @@ context = """
 
                     Best regards\nRenna Wahlt
                     """
-     
-     
-# logger.info(f"Operation Started at {start_time}")
-
-logger.info(f"connect to OpenAI")
-load_dotenv(find_dotenv())
-api_key = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=api_key)
-gpt = GPT(client=client)
-logger.success("Connected to OpenAI with Key")             
-# claims_type = gpt.get_claims_type(context)
-# print(claims_type)
-# cause_type = gpt.get_cause(context, claims_type=claims_type)
-# print(cause_type)
-# notifier = gpt.get_notifier(context)
-# print(notifier)
-date = gpt.get_claims_date(context)
-print(date)
-# claims_object = gpt.get_claims_objekt(context)
-# print(claims_object)
-
-# print(gpt.fde_first_notification_of_loss(context))
-
-df = pd.read_parquet("df_dirk_date_anon.parquet")
-
-start_time = time.time()
-
-logger.info(f"Operation Started at {start_time}")
-
-logger.info(f"connect to OpenAI")
-load_dotenv(find_dotenv())
-api_key = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=api_key)
-gpt = GPT(client=client)
-logger.success("Connected to OpenAI with Key")
-
-doc = df.iloc[3]['text'] 
-
-logger.info("Starting predictions")
-claim = gpt.fde_first_notification_of_loss(doc)
-logger.success(f"Predictions done:{claim}")
-
-end_time = time.time()
-total_time = end_time - start_time
-logger.success(f"Operation done at {end_time}")
-
-logger.info(f"Processing Time: {total_time}")
-
-logger.info("Preparing SD-URS-ART")
-
-df = group_sd_urs_art(df.copy())
-logger.info("Preparing Schaden-Datum")
-df["schadentag"] = df["schadentag"].apply(lambda x: x.replace("-", "."))
-
-hive_data = DirksClaims(
-        doc_id_list=df["doc_id"].to_list(),
-        schaden_objekt_list=df["schaden_objekt"].to_list(),
-        schaden_typ_list=df["sd_typ_kennung"].to_list(),
-        sd_urs_art_list=df["sd_urs_art"].to_list(),
-        schaden_datum_list=df["schadentag"].to_list(),
-    ).info
-
-logger.success("Hive Data Prepared")
-
-logger.info("Big Evaluation")
-start_time = time.time()
-
-gpt_predictions = [
-        GPT(client).fde_first_notification_of_loss(
-            document=text
+
+PARQUET_PATH = "df_dirk_date_anon.parquet"
+BATCH_SIZE = 5_000
+FEW_SHOT_EXAMPLES = 2_000
+
+
+def run_config(gpt: GPT, document: str) -> dict:
+    """Prompts and settings that decide the predictions; they scope the checkpoint."""
+    return {
+        "requests": {
+            "type": gpt.claims_type_request(document),
+            "cause": gpt.cause_request(document, claims_type="LW"),
+            "notifier": gpt.notifier_request(document),
+            "date": gpt.claims_date_request(document),
+            "objekt": gpt.claims_objekt_request(document),
+            "fused": gpt.fused_request(document),
+        },
+        "fused": gpt.fused,
+        "form_parser": gpt.form_parser,
+        "date_resolver": gpt.date_resolver,
+        "routes": gpt.router.routes if gpt.router is not None else None,
+    }
+
+
+def main():
+    # logger.info(f"Operation Started at {start_time}")
+    logger.info(f"connect to OpenAI")
+    load_dotenv(find_dotenv())
+    api_key = os.getenv("OPENAI_API_KEY")
+    # 'reasoning' or 'strict'; compare runs on the schaden_datum accuracy and
+    # the date latency in the metrics
+    date_mode = os.getenv("FNOL_DATE_MODE", "reasoning")
+    # '1' resolves unambiguous loss dates without the model; keep it off until
+    # the DateResolverReport logged below is accurate enough on schadentag
+    date_resolver = os.getenv("FNOL_DATE_RESOLVER") == "1"
+    # the SDK retries the sync calls, which run without a RateLimiter
+    clients = ClientFactory(ClientConfig(), api_key=api_key)
+    gpt = GPT(client=clients.openai())
+    logger.success("Connected to OpenAI with Key")             
+    # claims_type = gpt.get_claims_type(context)
+    # print(claims_type)
+    # cause_type = gpt.get_cause(context, claims_type=claims_type)
+    # print(cause_type)
+    # notifier = gpt.get_notifier(context)
+    # print(notifier)
+    date = gpt.get_claims_date(context)
+    print(date)
+    # claims_object = gpt.get_claims_objekt(context)
+    # print(claims_object)
+
+    # print(gpt.fde_first_notification_of_loss(context))
+
+    metrics = Metrics()
+
+    with metrics.span("parquet_load"):
+        df = next(iter_claim_batches(PARQUET_PATH, batch_size=BATCH_SIZE))
+
+    start_time = time.time()
+
+    logger.info(f"Operation Started at {start_time}")
+
+    doc = df.iloc[3]['text'] 
+
+    logger.info("Starting predictions")
+    claim = gpt.fde_first_notification_of_loss(doc)
+    logger.success(f"Predictions done:{claim}")
+
+    end_time = time.time()
+    total_time = end_time - start_time
+    logger.success(f"Operation done at {end_time}")
+
+    logger.info(f"Processing Time: {total_time}")
+
+    logger.info("Big Evaluation")
+    start_time = time.time()
+
+    cache = ResponseCache("llm_cache.sqlite")
+    rate_limiter = RateLimiter(
+        {
+            "gpt-4-turbo": ModelLimits(requests_per_minute=500, tokens_per_minute=300_000),
+            "gpt-3.5-turbo-0125": ModelLimits(
+                requests_per_minute=3_500, tokens_per_minute=1_000_000
+            ),
+            "gpt-4o-mini-2024-07-18": ModelLimits(
+                requests_per_minute=5_000, tokens_per_minute=2_000_000
+            ),
+            "gpt-4o-2024-08-06": ModelLimits(
+                requests_per_minute=5_000, tokens_per_minute=800_000
+            ),
+        }
+    )
+    router = ModelRouter()
+
+    logger.info("Building few-shot index")
+    with metrics.span("few_shot_index"):
+        examples = group_sd_urs_art(
+            df.sample(n=min(FEW_SHOT_EXAMPLES, len(df)), random_state=0)
         )
-        for text in df["text"]
-    ]
-
-end_time = time.time()
-total_time = end_time - start_time
-logger.info(f"Mass Processing Time: {total_time}")
-
-logger.info("Start Preparing Predictions for Comparison")
-
-doc_ids = df["doc_id"].to_list()
-gpt_predictions = [
-    {**cl, "doc_id": doc_id}
-    for doc_id, cl in zip(doc_ids, gpt_predictions)
-]
-
-preds = [
-        FirstNotificationOfLoss(
-            doc_id=cl["doc_id"],
-            schaden_objekt=cl["objekt"],
-            schaden_typ=cl["type"],
-            sd_urs_art=cl["cause"],
-            schaden_datum=cl["date"],
+        examples["schadentag"] = examples["schadentag"].str.replace("-", ".")
+        few_shot = FewShotSelector.from_frame(
+            normalize_column(examples, column="text"),
+            cause_mapping=GPT.cause_mapping,
         )
-        for cl in gpt_predictions
-    ]
-
-logger.info("Preparation for Comparison completed")
-
-match = [i == j for i, j in zip(preds, hive_data)]
-
-logger.info(f"Results for all fields: {Counter(match)}")
+    # the indexed claims would get themselves as examples, so they are held out
+    held_out = set(examples["doc_id"])
+
+    async_gpt = AsyncGPT(
+        # the RateLimiter retries 429s itself, so the SDK must not
+        client=clients.async_openai().with_options(max_retries=0),
+        cache=cache,
+        rate_limiter=rate_limiter,
+        metrics=metrics,
+        date_mode=date_mode,
+        router=router,
+        date_resolver=date_resolver,
+        few_shot=few_shot,
+    )
+    # a new prompt or setting starts a new checkpoint; a finished run is compacted
+    checkpoint = Checkpoint("predictions", config=run_config(async_gpt, context))
+    stored = {result["doc_id"]: result for result in checkpoint.results()}
+
+    date_report = DateResolverReport()
+
+    async def evaluate() -> ClaimComparison:
+        """Predict and compare the claims batch by batch as they are read."""
+        nonlocal date_report
+        batches = iter_claim_batches(PARQUET_PATH, batch_size=BATCH_SIZE)
+        comparisons = []
+        compared = 0
+        while True:
+            with metrics.span("parquet_load"):
+                df = next(batches, None)
+            if df is None:
+                return ClaimComparison.combine(comparisons)
+            df = df[~df["doc_id"].isin(held_out)]
+            if df.empty:
+                continue
+
+            logger.info("Preparing SD-URS-ART")
+            with metrics.span("group_sd_urs_art"):
+                df = group_sd_urs_art(df)
+            logger.info("Preparing Schaden-Datum")
+            df["schadentag"] = df["schadentag"].str.replace("-", ".")
+
+            hive_data = ClaimTable.from_frame(df)
+
+            logger.info("Normalizing documents")
+            with metrics.span("normalization"):
+                df = normalize_column(df, column="text")
+
+            with metrics.span("date_resolver"):
+                date_report += DateResolverReport.from_frame(df)
+
+            documents = list(zip(df["doc_id"], df["text"]))
+            with metrics.span("prediction"):
+                gpt_predictions = await async_gpt.process_many(
+                    checkpoint.pending(documents),
+                    max_concurrency=16,
+                    on_result=checkpoint.write,
+                )
+            # stored doc_ids are strings; keep the parquet's for the join with the labels
+            gpt_predictions += [
+                {**stored[str(doc_id)], "doc_id": doc_id}
+                for doc_id, _ in documents
+                if str(doc_id) in stored
+            ]
+
+            with metrics.span("comparison"):
+                batch_comparison = ClaimTable.from_predictions(gpt_predictions).compare(
+                    hive_data
+                )
+            comparisons.append(batch_comparison)
+            compared += len(batch_comparison.masks)
+            logger.success(f"Batch done, {compared} claims compared")
+
+    async def run() -> ClaimComparison:
+        try:
+            return await evaluate()
+        finally:
+            # the asyncio pool must be closed in the loop that used it
+            await clients.aclose()
+
+    with checkpoint:
+        comparison = asyncio.run(run())
+    checkpoint.compact()
+
+    end_time = time.time()
+    total_time = end_time - start_time
+    logger.info(f"Mass Processing Time: {total_time}")
+    logger.info(f"Response cache: {cache.stats()}")
+    for field, stats in router.report().items():
+        logger.info(f"Escalation {field}: {stats}")
+    logger.info(f"Date resolver: {date_report}")
+
+    logger.info(f"Results per field:\n{comparison.summary()}")
+    for field, matrix in comparison.confusion.items():
+        logger.info(f"Confusion matrix {field}:\n{matrix}")
+
+    for (field, model), stats in metrics.summary().items():
+        logger.info(f"{field} on {model}: {stats}")
+    metrics.to_parquet("metrics.parquet")
+    with open("metrics.prom", "w") as f:
+        f.write(metrics.to_prometheus())
+    clients.close()
+
+
+if __name__ == "__main__":
+    main()
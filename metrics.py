@@ -0,0 +1,212 @@
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import List
+
+
+@dataclass
+class CallRecord:
+    """
+    One completion call made by `GPT`.
+
+    Attributes:
+        field (str): Field the call extracted, e.g. 'type' or 'date'.
+        model (str): Model the request was sent to.
+        latency (float): Wall-clock seconds until the answer was available.
+        prompt_tokens (int): Prompt tokens reported in `response.usage`.
+        completion_tokens (int): Completion tokens reported in `response.usage`.
+        cached_tokens (int): Prompt tokens served from the provider's cache.
+        cache_hit (bool): Whether the answer came from the local response cache.
+        timestamp (float): Unix time at which the call finished.
+    """
+
+    field: str
+    model: str
+    latency: float
+    prompt_tokens: int
+    completion_tokens: int
+    cached_tokens: int
+    cache_hit: bool
+    timestamp: float
+
+
+@dataclass
+class SpanRecord:
+    """
+    Timing of one pipeline stage.
+
+    Attributes:
+        stage (str): Name of the stage, e.g. 'parquet_load'.
+        duration (float): Wall-clock seconds the stage took.
+        timestamp (float): Unix time at which the stage started.
+    """
+
+    stage: str
+    duration: float
+    timestamp: float
+
+
+def quantile(values: List[float], q: float) -> float:
+    """The `q` quantile of `values` (nearest rank), NaN if there are none."""
+    ordered = sorted(values)
+    if not ordered:
+        return float("nan")
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+
+    return ordered[index]
+
+
+def prometheus_labels(**labels) -> str:
+    """Labels in the Prometheus text format, e.g. field="date",model="gpt-4o"."""
+    return ",".join(f'{name}="{value}"' for name, value in labels.items())
+
+
+class Metrics:
+    """
+    Collects per-call and per-stage measurements of the FNOL pipeline.
+
+    `GPT` records every completion call when it is given a `Metrics`
+    instance. Pipeline stages are timed with `span`. The data can be
+    exported in the Prometheus text format or written to a Parquet log.
+    """
+
+    QUANTILES = (0.5, 0.95, 0.99)
+
+    def __init__(self):
+        self.calls: List[CallRecord] = []
+        self.spans: List[SpanRecord] = []
+        self._lock = threading.Lock()
+
+    def record_call(
+        self,
+        field: str,
+        model: str,
+        latency: float,
+        usage=None,
+        cache_hit: bool = False,
+    ):
+        details = getattr(usage, "prompt_tokens_details", None)
+        record = CallRecord(
+            field=field,
+            model=model,
+            latency=latency,
+            prompt_tokens=getattr(usage, "prompt_tokens", None) or 0,
+            completion_tokens=getattr(usage, "completion_tokens", None) or 0,
+            cached_tokens=getattr(details, "cached_tokens", None) or 0,
+            cache_hit=cache_hit,
+            timestamp=time.time(),
+        )
+        with self._lock:
+            self.calls.append(record)
+
+    @contextmanager
+    def span(self, stage: str):
+        """Time the enclosed block as pipeline stage `stage`."""
+        timestamp = time.time()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record = SpanRecord(
+                stage=stage,
+                duration=time.perf_counter() - start,
+                timestamp=timestamp,
+            )
+            with self._lock:
+                self.spans.append(record)
+
+    def summary(self) -> dict:
+        """Aggregate calls per (field, model) with token sums and latency quantiles."""
+        groups = defaultdict(list)
+        with self._lock:
+            for record in self.calls:
+                groups[(record.field, record.model)].append(record)
+
+        return {
+            key: {
+                "calls": len(records),
+                "cache_hits": sum(record.cache_hit for record in records),
+                "prompt_tokens": sum(record.prompt_tokens for record in records),
+                "completion_tokens": sum(record.completion_tokens for record in records),
+                "cached_tokens": sum(record.cached_tokens for record in records),
+                "latency_sum": sum(record.latency for record in records),
+                **{
+                    f"latency_p{int(q * 100)}": quantile(
+                        [record.latency for record in records], q
+                    )
+                    for q in self.QUANTILES
+                },
+            }
+            for key, records in groups.items()
+        }
+
+    def to_prometheus(self) -> str:
+        """Render all measurements in the Prometheus text exposition format."""
+        lines = [
+            "# HELP fnol_llm_calls_total Completion calls per field and model.",
+            "# TYPE fnol_llm_calls_total counter",
+        ]
+        summary = self.summary()
+        for (field, model), stats in summary.items():
+            labels = prometheus_labels(field=field, model=model)
+            lines.append(f"fnol_llm_calls_total{{{labels}}} {stats['calls']}")
+        lines += [
+            "# HELP fnol_llm_cache_hits_total Calls answered by the response cache.",
+            "# TYPE fnol_llm_cache_hits_total counter",
+        ]
+        for (field, model), stats in summary.items():
+            labels = prometheus_labels(field=field, model=model)
+            lines.append(f"fnol_llm_cache_hits_total{{{labels}}} {stats['cache_hits']}")
+        lines += [
+            "# HELP fnol_llm_tokens_total Tokens reported by the API.",
+            "# TYPE fnol_llm_tokens_total counter",
+        ]
+        for (field, model), stats in summary.items():
+            for kind in ("prompt", "completion", "cached"):
+                labels = prometheus_labels(field=field, model=model, kind=kind)
+                lines.append(f"fnol_llm_tokens_total{{{labels}}} {stats[f'{kind}_tokens']}")
+        lines += [
+            "# HELP fnol_llm_latency_seconds Wall latency of completion calls.",
+            "# TYPE fnol_llm_latency_seconds summary",
+        ]
+        for (field, model), stats in summary.items():
+            for q in self.QUANTILES:
+                labels = prometheus_labels(field=field, model=model, quantile=q)
+                lines.append(
+                    f"fnol_llm_latency_seconds{{{labels}}} "
+                    f"{stats[f'latency_p{int(q * 100)}']}"
+                )
+            labels = prometheus_labels(field=field, model=model)
+            lines.append(f"fnol_llm_latency_seconds_sum{{{labels}}} {stats['latency_sum']}")
+            lines.append(f"fnol_llm_latency_seconds_count{{{labels}}} {stats['calls']}")
+
+        stages = defaultdict(list)
+        with self._lock:
+            for record in self.spans:
+                stages[record.stage].append(record.duration)
+        lines += [
+            "# HELP fnol_stage_duration_seconds Duration of pipeline stages.",
+            "# TYPE fnol_stage_duration_seconds summary",
+        ]
+        for stage, durations in stages.items():
+            labels = prometheus_labels(stage=stage)
+            lines.append(f"fnol_stage_duration_seconds_sum{{{labels}}} {sum(durations)}")
+            lines.append(f"fnol_stage_duration_seconds_count{{{labels}}} {len(durations)}")
+
+        return "\n".join(lines) + "\n"
+
+    def to_parquet(self, path: str):
+        """Write the call log to `path` and the stage log next to it."""
+        import pandas as pd
+
+        with self._lock:
+            calls = [asdict(record) for record in self.calls]
+            spans = [asdict(record) for record in self.spans]
+
+        pd.DataFrame(calls, columns=list(CallRecord.__dataclass_fields__)).to_parquet(path)
+        stage_path = path.removesuffix(".parquet") + "_stages.parquet"
+        pd.DataFrame(spans, columns=list(SpanRecord.__dataclass_fields__)).to_parquet(
+            stage_path
+        )
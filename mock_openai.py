@@ -0,0 +1,302 @@
+import itertools
+import math
+import json
+import random
+import threading
+import time
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable
+
+from loguru import logger
+
+
+def canned_answer(request: dict) -> dict:
+    """
+    Return a valid JSON answer for a request built by one of `GPT`'s methods.
+
+    The field is recognised from the instruction message, so every field
+    method gets an answer of the shape it parses.
+    """
+    instructions = request["messages"][-1]["content"]
+    if "'claim'" in instructions:
+        return {
+            "claim": {"type": "ST", "cause": "Sturm sonstiges"},
+            "objekt": "WG",
+            "notifier": "VN",
+            "date": "25.01.2024",
+        }
+    if "Leitungswasser = 'LW'" in instructions:
+        return {"Kategorie": "ST"}
+    if "Schaden-Ursache" in instructions:
+        return {"Ursache": "Sturm sonstiges"}
+    if "Versicherungsnehmer = 'VN'" in instructions:
+        return {"Kürzel": "VN"}
+    if "Wohngebäude = 'WG'" in instructions:
+        return {"Kürzel": "WG"}
+    if "Thinking" in instructions:
+        return {"Thinking": "Das Datum steht im Dokument.", "Date": "25.01.2024"}
+
+    return {"Date": "25.01.2024"}
+
+
+def constant_latency(seconds: float) -> Callable[[], float]:
+    """Latency distribution for `MockOpenAI` that always waits `seconds`."""
+    return lambda: seconds
+
+
+def lognormal_latency(median: float, sigma: float = 0.5) -> Callable[[], float]:
+    """Right-skewed latency distribution for `MockOpenAI`, like real completions."""
+    mu = math.log(median)
+
+    return lambda: random.lognormvariate(mu, sigma)
+
+
+def chat_completion(request: dict, answer: Callable[[dict], dict]) -> dict:
+    content = json.dumps(answer(request), ensure_ascii=False)
+    prompt_tokens = sum(len(m["content"]) for m in request["messages"]) // 4
+
+    return {
+        "id": f"chatcmpl-{time.time_ns()}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request.get("model", "mock"),
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }
+        ],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": len(content) // 4,
+            "total_tokens": prompt_tokens + len(content) // 4,
+        },
+    }
+
+
+class _Server(ThreadingHTTPServer):
+    # the default backlog of 5 drops connections when many clients connect at once
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+class MockOpenAI:
+    """
+    Local stand-in for the OpenAI chat completions, files and batches endpoints.
+
+    Batches advance one status per retrieve (validating, in_progress,
+    completed) and are processed with the same canned answers as the chat
+    endpoint, so a client polling the batch sees a realistic lifecycle.
+    `connections` counts the accepted TCP connections, which shows whether
+    clients reuse them.
+
+    Chat completions wait for a delay drawn from `latency`, and a share
+    `rate_limit_rate` of them is rejected with 429 and a Retry-After of
+    `retry_after` seconds, so clients can be benchmarked and their retry
+    handling exercised offline. `rate_limited` counts the rejections.
+
+    Usage:
+        with MockOpenAI() as mock:
+            client = OpenAI(api_key="test", base_url=mock.base_url)
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        answer: Callable[[dict], dict] = canned_answer,
+        latency: Callable[[], float] | None = None,
+        rate_limit_rate: float = 0.0,
+        retry_after: float = 0.1,
+    ):
+        self.answer = answer
+        self.latency = latency
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.rate_limited = 0
+        self.files = {}
+        self.batches = {}
+        self.connections = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._server = _Server((host, port), self._handler())
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "MockOpenAI":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        logger.info(f"Mock OpenAI listening on {self.base_url}")
+
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "MockOpenAI":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _new_id(self, prefix: str) -> str:
+        with self._lock:
+            return f"{prefix}-{next(self._ids)}"
+
+    def _store_file(self, filename: str, content: bytes, purpose: str) -> dict:
+        file = {
+            "id": self._new_id("file"),
+            "object": "file",
+            "bytes": len(content),
+            "created_at": int(time.time()),
+            "filename": filename,
+            "purpose": purpose,
+            "status": "processed",
+        }
+        self.files[file["id"]] = (file, content)
+
+        return file
+
+    def _create_batch(self, body: dict) -> dict:
+        batch = {
+            "id": self._new_id("batch"),
+            "object": "batch",
+            "endpoint": body["endpoint"],
+            "input_file_id": body["input_file_id"],
+            "completion_window": body["completion_window"],
+            "status": "validating",
+            "created_at": int(time.time()),
+        }
+        self.batches[batch["id"]] = batch
+
+        return batch
+
+    def _advance_batch(self, batch: dict) -> dict:
+        if batch["status"] == "validating":
+            batch["status"] = "in_progress"
+        elif batch["status"] == "in_progress":
+            _, content = self.files[batch["input_file_id"]]
+            lines = [json.loads(line) for line in content.decode().splitlines() if line]
+            output = [
+                {
+                    "id": f"batch_req_{index}",
+                    "custom_id": line["custom_id"],
+                    "response": {
+                        "status_code": 200,
+                        "request_id": f"req_{index}",
+                        "body": chat_completion(line["body"], self.answer),
+                    },
+                    "error": None,
+                }
+                for index, line in enumerate(lines)
+            ]
+            payload = "\n".join(json.dumps(line, ensure_ascii=False) for line in output)
+            output_file = self._store_file(
+                "batch_output.jsonl", payload.encode("utf-8"), "batch_output"
+            )
+            batch["output_file_id"] = output_file["id"]
+            batch["request_counts"] = {
+                "total": len(lines),
+                "completed": len(lines),
+                "failed": 0,
+            }
+            batch["status"] = "completed"
+            batch["completed_at"] = int(time.time())
+
+        return batch
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # keep connections open, so clients can reuse them like with the API
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with mock._lock:
+                    mock.connections += 1
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status: int, body: dict, headers: dict | None = None):
+                payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _read_body(self) -> bytes:
+                return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+            def do_POST(self):
+                body = self._read_body()
+                if self.path == "/v1/chat/completions":
+                    if mock.latency is not None:
+                        time.sleep(mock.latency())
+                    if random.random() < mock.rate_limit_rate:
+                        with mock._lock:
+                            mock.rate_limited += 1
+                        self._send_json(
+                            429,
+                            {"error": {"message": "Rate limit reached", "type": "requests"}},
+                            headers={
+                                "retry-after-ms": str(int(mock.retry_after * 1000)),
+                                "retry-after": str(math.ceil(mock.retry_after)),
+                            },
+                        )
+                        return
+                    self._send_json(200, chat_completion(json.loads(body), mock.answer))
+                elif self.path == "/v1/files":
+                    message = BytesParser(policy=HTTP).parsebytes(
+                        f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode()
+                        + body
+                    )
+                    parts = {
+                        part.get_param("name", header="content-disposition"): part
+                        for part in message.iter_parts()
+                    }
+                    file = mock._store_file(
+                        parts["file"].get_filename(),
+                        parts["file"].get_payload(decode=True),
+                        parts["purpose"].get_content(),
+                    )
+                    self._send_json(200, file)
+                elif self.path == "/v1/batches":
+                    self._send_json(200, mock._create_batch(json.loads(body)))
+                else:
+                    self._send_json(404, {"error": {"message": f"Unknown {self.path}"}})
+
+            def do_GET(self):
+                parts = self.path.strip("/").split("/")
+                if parts[:2] == ["v1", "batches"] and len(parts) == 3:
+                    batch = mock.batches.get(parts[2])
+                    if batch is None:
+                        self._send_json(404, {"error": {"message": "No such batch"}})
+                    else:
+                        self._send_json(200, mock._advance_batch(batch))
+                elif parts[:2] == ["v1", "files"] and parts[3:] == ["content"]:
+                    _, content = mock.files[parts[2]]
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/octet-stream")
+                    self.send_header("Content-Length", str(len(content)))
+                    self.end_headers()
+                    self.wfile.write(content)
+                else:
+                    self._send_json(404, {"error": {"message": f"Unknown {self.path}"}})
+
+        return Handler
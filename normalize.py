@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import re
+from typing import TYPE_CHECKING
+
+from loguru import logger
+
+from rate_limiter import estimate_tokens
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+WHITESPACE_PATTERNS = [
+    (r"[ \t\r\f\v]+", " "),
+    (r"(?m)^ +| +$", ""),
+    (r"\n{3,}", "\n\n"),
+]
+
+HEADER_LINE = re.compile(r"(?:Von|An|AN|Gesendet|Betreff|From|To|Sent|Subject):[^\n]*")
+
+
+def _drop_repeated_headers(match: re.Match) -> str:
+    """Keep the first occurrence of each header line and drop later copies."""
+    seen = set()
+    lines = []
+    for line in match.group(0).split("\n"):
+        if HEADER_LINE.fullmatch(line):
+            if line in seen:
+                continue
+            seen.add(line)
+        lines.append(line)
+
+    return "\n".join(lines)
+
+
+NOISE_PATTERNS = [
+    # quoted replies and their attribution line
+    (r"(?m)^>.*(?:\n|$)", ""),
+    (r"(?m)^Am .{0,120} schrieb .{0,120}:(?:\n|$)", ""),
+    # reply-to and carbon copy headers; the colon (or the address right after
+    # 'Bitte Antwort an') keeps body lines such as "Kopie an uns weiter." intact
+    (r"(?m)^(?:CC|Cc|Kopie an|Bitte Antwort an):[^\n]*(?:\n|$)", ""),
+    (r"(?m)^Bitte Antwort an \S+@[^\n]*(?:\n|$)", ""),
+    # header lines repeated further down the forwarded chain; the match runs
+    # from the first header line to the end of the document
+    (r"(?ms)^" + HEADER_LINE.pattern + r".*", _drop_repeated_headers),
+    # phone, fax, bank and registration details of signatures
+    (
+        r"(?i)(?<![^\W\d_])(?:Telefon|Tel\.?|Telefax|Fax|Mobil|Handy)[ :]*"
+        r"\+?\d[\d /()\-]{4,}\d",
+        "",
+    ),
+    (r"(?i)(?:Büroanschrift|Postanschrift):[^\n]*", ""),
+    (r"\bIBAN:? ?[A-Z]{2}\d{2}(?: ?[\dA-Z]{4}){2,7}(?: ?[\dA-Z]{1,4})?", ""),
+    (r"(?i)\bRegistrierungsnummer:? ?[\w\-]+;?", ""),
+    (r"(?i)\b(?:Amtsgericht|Registergericht|HRB|USt-IdNr\.?|Steuernummer)\b[^\n]*", ""),
+    # confidentiality disclaimers
+    (
+        r"(?is)Diese (?:E-Mail|Nachricht) (?:enthält|kann) vertrauliche.*?(?:\n\n|$)",
+        "",
+    ),
+]
+
+PATTERNS = WHITESPACE_PATTERNS + NOISE_PATTERNS + WHITESPACE_PATTERNS
+COMPILED_PATTERNS = [(re.compile(pattern), repl) for pattern, repl in PATTERNS]
+
+
+def normalize_document(document: str) -> str:
+    """
+    Remove email noise from a claim document before it is put into a prompt.
+
+    Collapses whitespace and indentation, and drops quoted replies, repeated
+    header lines, reply-to headers, phone, fax, IBAN and registration details
+    and confidentiality disclaimers. Sender, subject, body and the
+    Eingangszeitpunkt are kept, since they carry the answers.
+    """
+    for pattern, repl in COMPILED_PATTERNS:
+        document = pattern.sub(repl, document)
+
+    return document.strip()
+
+
+def normalize_texts(texts: pd.Series) -> pd.Series:
+    """Vectorized `normalize_document` over a Series of documents."""
+    texts = texts.astype(str)
+    for pattern, repl in COMPILED_PATTERNS:
+        texts = texts.str.replace(pattern, repl, regex=True)
+
+    return texts.str.strip()
+
+
+def normalize_column(df: pd.DataFrame, column: str = "text") -> pd.DataFrame:
+    """Normalize the documents in `column` and report the tokens saved.
+
+    Args:
+        df: DataFrame holding the documents.
+        column: Name of the text column to normalize.
+
+    Returns:
+        DataFrame with `column` normalized and the columns tokens_before,
+        tokens_after and tokens_saved per document.
+    """
+    logger.info(f"Normalizing column '{column}'")
+    tokens_before = df[column].astype(str).str.len() // 4 + 1
+    normalized = normalize_texts(df[column])
+    tokens_after = normalized.str.len() // 4 + 1
+
+    df = df.assign(
+        **{
+            column: normalized,
+            "tokens_before": tokens_before,
+            "tokens_after": tokens_after,
+            "tokens_saved": tokens_before - tokens_after,
+        }
+    )
+    saved, total = df["tokens_saved"].sum(), df["tokens_before"].sum()
+    logger.info(
+        f"Normalization saved {saved} of {total} estimated tokens per field call "
+        f"({saved / max(total, 1):.1%})"
+    )
+
+    return df
+
+
+def tokens_saved(document: str) -> int:
+    """Estimated prompt tokens saved by normalizing one document."""
+    return estimate_tokens(document) - estimate_tokens(normalize_document(document))
@@ -0,0 +1,166 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+from loguru import logger
+
+from async_gpt import AsyncGPT
+from normalize import normalize_document
+
+STORE_COLUMNS = ["doc_id", "text"]
+
+# per-worker state, set by `_init_worker` in each process of the pool
+_store: Optional[pa.Table] = None
+_gpt: Optional[AsyncGPT] = None
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_normalize = True
+_max_concurrency = 16
+
+
+def write_document_store(
+    df: pd.DataFrame, path: str, batch_size: int = 10_000
+) -> str:
+    """
+    Write doc_id and text of `df` to an Arrow IPC file for `ProcessRunner`.
+
+    Args:
+        df: DataFrame with doc_id and text columns.
+        path: Path of the IPC file to write.
+        batch_size: Rows per record batch in the file.
+
+    Returns:
+        `path`.
+    """
+    table = pa.Table.from_pandas(
+        df[STORE_COLUMNS].astype({"doc_id": str, "text": str}), preserve_index=False
+    )
+    with pa.OSFile(path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table, max_chunksize=batch_size)
+    logger.info(f"Wrote {table.num_rows} documents to {path}")
+
+    return path
+
+
+def _open_store(path: str) -> pa.Table:
+    """Memory-map the IPC file; the returned table references the mapped pages."""
+    return pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+
+
+def _init_worker(
+    store_path: str,
+    gpt_factory: Callable[[], AsyncGPT],
+    normalize: bool,
+    max_concurrency: int,
+):
+    global _store, _gpt, _loop, _normalize, _max_concurrency
+    _store = _open_store(store_path)
+    # one loop per worker for all its chunks, so the pooled clients stay usable
+    _loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(_loop)
+    _gpt = gpt_factory()
+    _normalize = normalize
+    _max_concurrency = max_concurrency
+
+
+def _process_range(start: int, stop: int) -> List[dict]:
+    rows = _store.slice(start, stop - start)
+    documents = zip(rows.column("doc_id").to_pylist(), rows.column("text").to_pylist())
+    if _normalize:
+        documents = (
+            (doc_id, normalize_document(document)) for doc_id, document in documents
+        )
+
+    return _loop.run_until_complete(
+        _gpt.process_many(list(documents), max_concurrency=_max_concurrency)
+    )
+
+
+class ProcessRunner:
+    """
+    Runs the FNOL extraction for a document store on a pool of processes.
+
+    The documents are read by every worker from one memory-mapped Arrow IPC
+    file written by `write_document_store`, so only row ranges are sent to
+    the workers and only result dicts are sent back. Each worker builds its
+    own `AsyncGPT` with `gpt_factory`, keeps up to `max_concurrency`
+    documents of its chunk in flight with `process_many`, and does the
+    CPU-side work of its documents (normalization, answer parsing,
+    `cause_mapper`). Network waits are overlapped within every worker, so a
+    pool has `processes * max_concurrency` documents in flight.
+
+    `gpt_factory` must be picklable, i.e. a module-level function. Since
+    every worker has its own rate limiter, the factory should give each one
+    its share of the model limits; a `ResponseCache` on the same path can be
+    shared by all workers.
+
+    Attributes:
+        gpt_factory (Callable[[], AsyncGPT]): Builds the client of a worker.
+        processes (int): Number of worker processes.
+        chunk_size (int): Documents per task sent to a worker.
+        normalize (bool): Whether workers apply `normalize_document` first.
+        max_concurrency (int): Documents in flight per worker.
+    """
+
+    def __init__(
+        self,
+        gpt_factory: Callable[[], AsyncGPT],
+        processes: Optional[int] = None,
+        chunk_size: int = 256,
+        normalize: bool = True,
+        max_concurrency: int = 16,
+    ):
+        self.gpt_factory = gpt_factory
+        self.processes = processes or os.cpu_count()
+        self.chunk_size = chunk_size
+        self.normalize = normalize
+        self.max_concurrency = max_concurrency
+
+    def run(
+        self, store_path: str, on_result: Optional[Callable[[dict], None]] = None
+    ) -> List[dict]:
+        """
+        Process every document in the store.
+
+        Args:
+            store_path: IPC file written by `write_document_store`.
+            on_result: Called in the parent with each result as its chunk
+                finishes, e.g. `Checkpoint.write`.
+
+        Returns:
+            One result dict per document, in store order, each carrying its
+            doc_id.
+        """
+        num_rows = _open_store(store_path).num_rows
+        ranges = [
+            (start, min(start + self.chunk_size, num_rows))
+            for start in range(0, num_rows, self.chunk_size)
+        ]
+        logger.info(
+            f"Processing {num_rows} documents in {len(ranges)} chunks "
+            f"on {self.processes} processes"
+        )
+
+        chunks = {}
+        with ProcessPoolExecutor(
+            max_workers=self.processes,
+            initializer=_init_worker,
+            initargs=(
+                store_path, self.gpt_factory, self.normalize, self.max_concurrency
+            ),
+        ) as executor:
+            futures = {
+                executor.submit(_process_range, start, stop): start
+                for start, stop in ranges
+            }
+            for future in as_completed(futures):
+                results = future.result()
+                chunks[futures[future]] = results
+                if on_result is not None:
+                    for result in results:
+                        on_result(result)
+
+        return [result for start, _ in ranges for result in chunks[start]]
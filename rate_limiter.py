@@ -0,0 +1,291 @@
+import asyncio
+import random
+import threading
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Dict
+
+from loguru import logger
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate of a text, about four characters per token."""
+    return len(text) // 4 + 1
+
+
+def estimate_request_tokens(request: dict, completion_tokens: int = 100) -> int:
+    """Estimate the tokens a completion request counts against the TPM quota."""
+    prompt_tokens = sum(
+        estimate_tokens(message["content"]) for message in request["messages"]
+    )
+
+    return prompt_tokens + request.get("max_tokens", completion_tokens)
+
+
+@dataclass
+class ModelLimits:
+    """
+    Quota of one model.
+
+    Attributes:
+        requests_per_minute (int): Requests allowed per minute (RPM).
+        tokens_per_minute (int): Tokens allowed per minute (TPM).
+    """
+
+    requests_per_minute: int
+    tokens_per_minute: int
+
+
+class TokenBucket:
+    """
+    Token bucket that refills continuously up to its capacity.
+
+    `reserve` never blocks. It takes the amount right away, letting the level
+    go negative, and returns how long the caller has to wait before the
+    reservation is covered. The same bucket therefore works for threads and
+    for asyncio tasks.
+    """
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(
+            self.capacity, self.level + (now - self.updated) * self.refill_per_second
+        )
+        self.updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        self._refill(now)
+        self.level -= amount
+        if self.level >= 0:
+            return 0.0
+
+        return -self.level / self.refill_per_second
+
+    def adjust(self, amount: float):
+        """Correct an earlier reservation, e.g. once the real usage is known."""
+        self.level = min(self.capacity, self.level - amount)
+
+
+class AdaptiveConcurrency:
+    """
+    Concurrency limit adapted with AIMD.
+
+    Each healthy response raises the limit by 1/limit, about one slot per
+    round of requests. A throttled response halves it, at most once per
+    `cooldown` seconds so a burst of 429s from one window counts once.
+    """
+
+    def __init__(
+        self,
+        initial: int = 8,
+        minimum: int = 1,
+        maximum: int = 64,
+        decrease_factor: float = 0.5,
+        cooldown: float = 1.0,
+    ):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    def on_success(self):
+        with self._condition:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+    def on_throttle(self):
+        with self._condition:
+            now = time.monotonic()
+            if now - self._last_decrease < self.cooldown:
+                return
+            self._last_decrease = now
+            self.limit = max(self.minimum, self.limit * self.decrease_factor)
+            logger.warning(f"Throttled, concurrency limit cut to {int(self.limit)}")
+
+    def _try_acquire(self) -> bool:
+        if self.in_flight < int(self.limit):
+            self.in_flight += 1
+            return True
+
+        return False
+
+    def acquire(self):
+        with self._condition:
+            while not self._try_acquire():
+                self._condition.wait()
+
+    async def acquire_async(self, poll_interval: float = 0.01):
+        while True:
+            with self._condition:
+                if self._try_acquire():
+                    return
+            await asyncio.sleep(poll_interval)
+
+    def release(self):
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+
+class RateLimiter:
+    """
+    Client-side rate limiter for chat completion requests.
+
+    Every model gets its own request and token buckets sized from its
+    `ModelLimits`. The tokens of each request are estimated before sending
+    and corrected with `response.usage` afterwards. On a 429 the model is
+    paused for the Retry-After interval (or an exponential backoff when the
+    header is missing), its concurrency is cut, and the request is retried.
+    Healthy responses grow concurrency again, so runs settle at the quota
+    ceiling instead of far below it. Like the buckets, every model has its
+    own `AdaptiveConcurrency`, so a 429 on one model does not slow down
+    models that still have headroom.
+
+    Create the OpenAI client with `max_retries=0`, otherwise the client's
+    own retries hide 429s from the limiter.
+    """
+
+    def __init__(
+        self,
+        limits: Dict[str, ModelLimits],
+        concurrency: Callable[[], AdaptiveConcurrency] = AdaptiveConcurrency,
+        max_retries: int = 6,
+    ):
+        self.limits = limits
+        self.concurrency_factory = concurrency
+        self.max_retries = max_retries
+        self._lock = threading.Lock()
+        self._request_buckets = {
+            model: TokenBucket(limit.requests_per_minute, limit.requests_per_minute / 60)
+            for model, limit in limits.items()
+        }
+        self._token_buckets = {
+            model: TokenBucket(limit.tokens_per_minute, limit.tokens_per_minute / 60)
+            for model, limit in limits.items()
+        }
+        self._paused_until = {}
+        self._concurrency: Dict[str, AdaptiveConcurrency] = {}
+
+    def concurrency(self, model: str) -> AdaptiveConcurrency:
+        """The AIMD concurrency limit of `model`, created on first use."""
+        with self._lock:
+            if model not in self._concurrency:
+                self._concurrency[model] = self.concurrency_factory()
+
+            return self._concurrency[model]
+
+    def reserve(self, model: str, tokens: int) -> float:
+        """Reserve one request and `tokens` tokens, returning the wait in seconds."""
+        with self._lock:
+            now = time.monotonic()
+            wait = max(0.0, self._paused_until.get(model, 0.0) - now)
+            if model in self.limits:
+                wait = max(
+                    wait,
+                    self._request_buckets[model].reserve(1, now),
+                    self._token_buckets[model].reserve(tokens, now),
+                )
+
+        return wait
+
+    def _record_usage(self, model: str, estimated: int, response):
+        total_tokens = getattr(getattr(response, "usage", None), "total_tokens", None)
+        if total_tokens is None or model not in self.limits:
+            return
+        with self._lock:
+            self._token_buckets[model].adjust(total_tokens - estimated)
+
+    @staticmethod
+    def retry_after(error) -> float | None:
+        """Read the Retry-After delay of a 429 response, if the server sent one."""
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None) or {}
+        if (value := headers.get("retry-after-ms")) is not None:
+            try:
+                return float(value) / 1000
+            except ValueError:
+                pass
+        if (value := headers.get("retry-after")) is not None:
+            try:
+                return float(value)
+            except ValueError:
+                try:
+                    return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+                except (TypeError, ValueError):
+                    return None
+
+        return None
+
+    def _throttled(self, model: str, error, attempt: int) -> float:
+        """Handle a 429: pause the model, cut concurrency, return the delay."""
+        if attempt >= self.max_retries:
+            raise error
+        delay = self.retry_after(error)
+        if delay is None:
+            delay = min(60.0, 2**attempt) * (0.5 + random.random() / 2)
+        with self._lock:
+            self._paused_until[model] = max(
+                self._paused_until.get(model, 0.0), time.monotonic() + delay
+            )
+        self.concurrency(model).on_throttle()
+        logger.warning(f"Rate limited on {model}, retrying in {delay:.1f}s")
+
+        return delay
+
+    @staticmethod
+    def _is_rate_limit(error: Exception) -> bool:
+        return getattr(error, "status_code", None) == 429
+
+    def call(self, request: dict, send: Callable[[], object]):
+        """Send a request through the limiter, retrying on 429."""
+        model = request["model"]
+        tokens = estimate_request_tokens(request)
+        concurrency = self.concurrency(model)
+        for attempt in range(self.max_retries + 1):
+            time.sleep(self.reserve(model, tokens))
+            concurrency.acquire()
+            try:
+                response = send()
+            except Exception as e:
+                if not self._is_rate_limit(e):
+                    raise
+                delay = self._throttled(model, e, attempt)
+            else:
+                concurrency.on_success()
+                self._record_usage(model, tokens, response)
+                return response
+            finally:
+                concurrency.release()
+            time.sleep(delay)
+
+    async def call_async(self, request: dict, send: Callable[[], Awaitable[object]]):
+        """Awaitable version of `call`."""
+        model = request["model"]
+        tokens = estimate_request_tokens(request)
+        concurrency = self.concurrency(model)
+        for attempt in range(self.max_retries + 1):
+            await asyncio.sleep(self.reserve(model, tokens))
+            await concurrency.acquire_async()
+            try:
+                response = await send()
+            except Exception as e:
+                if not self._is_rate_limit(e):
+                    raise
+                delay = self._throttled(model, e, attempt)
+            else:
+                concurrency.on_success()
+                self._record_usage(model, tokens, response)
+                return response
+            finally:
+                concurrency.release()
+            await asyncio.sleep(delay)
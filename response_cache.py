@@ -0,0 +1,146 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+from loguru import logger
+
+
+class ResponseCache:
+    """
+    Persistent, content-addressed cache for chat completion answers.
+
+    Entries are stored in SQLite and keyed by a hash of the full request
+    (model, messages, response_format and any other parameters). Changing
+    the prompt of one field method therefore only changes the keys of that
+    field: its old entries stop being hit, while every other field keeps
+    coming from cache. Stale entries are removed by LRU eviction once the
+    cache exceeds `max_bytes`, or explicitly with `invalidate`.
+
+    Attributes:
+        hits (Counter): Cache hits per field.
+        misses (Counter): Cache misses per field.
+    """
+
+    def __init__(self, path: str = "llm_cache.sqlite", max_bytes: int = 256 * 2**20):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = Counter()
+        self.misses = Counter()
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                field TEXT NOT NULL,
+                content TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS responses_last_access "
+            "ON responses (last_access)"
+        )
+        self._connection.commit()
+        self._size = self._connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+
+    @staticmethod
+    def key(request: dict) -> str:
+        """Hash a completion request into its cache key."""
+        payload = json.dumps(request, sort_keys=True, ensure_ascii=False)
+
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, field: str, request: dict) -> str | None:
+        key = self.key(request)
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT content FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses[field] += 1
+                return None
+
+            self._connection.execute(
+                "UPDATE responses SET last_access = ? WHERE key = ?",
+                (time.time(), key),
+            )
+            self._connection.commit()
+            self.hits[field] += 1
+
+        return row[0]
+
+    def put(self, field: str, request: dict, content: str):
+        key = self.key(request)
+        size = len(content.encode("utf-8"))
+        with self._lock:
+            previous = self._connection.execute(
+                "SELECT size FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (key, field, content, size, time.time()),
+            )
+            self._size += size - (previous[0] if previous else 0)
+            self._evict()
+            self._connection.commit()
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits `max_bytes`."""
+        evicted = 0
+        while self._size > self.max_bytes:
+            rows = self._connection.execute(
+                "SELECT key, size FROM responses ORDER BY last_access LIMIT 100"
+            ).fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                if self._size <= self.max_bytes:
+                    break
+                self._connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._size -= size
+                evicted += 1
+
+        if evicted:
+            logger.info(f"Evicted {evicted} cached responses")
+
+    def invalidate(self, field: str) -> int:
+        """Remove all entries of one field and return how many were removed."""
+        with self._lock:
+            size, count = self._connection.execute(
+                "SELECT COALESCE(SUM(size), 0), COUNT(*) FROM responses "
+                "WHERE field = ?",
+                (field,),
+            ).fetchone()
+            self._connection.execute("DELETE FROM responses WHERE field = ?", (field,))
+            self._connection.commit()
+            self._size -= size
+
+        logger.info(f"Invalidated {count} cached responses for '{field}'")
+
+        return count
+
+    def stats(self) -> dict:
+        """Return hit and miss counters per field and the cache size."""
+        fields = sorted(set(self.hits) | set(self.misses))
+
+        return {
+            "size_bytes": self._size,
+            "fields": {
+                field: {"hits": self.hits[field], "misses": self.misses[field]}
+                for field in fields
+            },
+        }
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
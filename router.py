@@ -0,0 +1,60 @@
+import threading
+from collections import Counter
+from typing import Dict, Sequence, Tuple
+
+# cheapest model first; every model must support json_object and json_schema
+DEFAULT_ROUTES = {
+    field: ("gpt-4o-mini-2024-07-18", "gpt-4o-2024-08-06")
+    for field in ("type", "cause", "objekt", "notifier", "date")
+}
+
+
+class ModelRouter:
+    """
+    Picks the models a field is asked with, cheapest first.
+
+    `GPT` sends each routed field to the first model of its route. If the
+    answer fails validation (a code outside the allowed set, a cause that
+    `cause_mapper` cannot map, a malformed date), the same request is sent
+    to the next model of the route, until an answer is valid or the route is
+    exhausted. Fields without a route keep the model of their request.
+
+    Attributes:
+        routes (Dict[str, Sequence[str]]): Models per field, cheapest first.
+        calls (Counter): Answered fields per field.
+        escalations (Counter): Answers per field that needed a stronger model.
+        invalid (Counter): Answers per field still invalid on the last model.
+    """
+
+    def __init__(self, routes: Dict[str, Sequence[str]] | None = None):
+        self.routes = dict(DEFAULT_ROUTES if routes is None else routes)
+        self.calls = Counter()
+        self.escalations = Counter()
+        self.invalid = Counter()
+        self._lock = threading.Lock()
+
+    def models(self, field: str, default: str) -> Tuple[str, ...]:
+        """Models to try for `field`, or just `default` if it has no route."""
+        return tuple(self.routes.get(field) or (default,))
+
+    def record(self, field: str, level: int, valid: bool):
+        """Record the answer of `field` given by the model at `level` of its route."""
+        with self._lock:
+            self.calls[field] += 1
+            if level > 0:
+                self.escalations[field] += 1
+            if not valid:
+                self.invalid[field] += 1
+
+    def report(self) -> dict:
+        """Escalation rate and remaining invalid answers per field."""
+        with self._lock:
+            return {
+                field: {
+                    "calls": calls,
+                    "escalations": self.escalations[field],
+                    "escalation_rate": self.escalations[field] / calls,
+                    "invalid": self.invalid[field],
+                }
+                for field, calls in self.calls.items()
+            }
@@ -0,0 +1,296 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, List
+
+from dotenv import find_dotenv, load_dotenv
+from loguru import logger
+
+from async_gpt import AsyncGPT
+from clients import ClientConfig, ClientFactory
+from metrics import Metrics, prometheus_labels, quantile
+from rate_limiter import ModelLimits, RateLimiter
+from response_cache import ResponseCache
+
+
+class FNOLService:
+    """
+    Long-running HTTP service for `fde_first_notification_of_loss`.
+
+    One `AsyncGPT`, built once by `gpt_factory`, runs on a background event
+    loop with warm pooled clients. HTTP requests are handled on threads and
+    handed to that loop:
+
+    - Identical documents in flight at the same time share one computation
+      (singleflight); later requests simply await the first one's result.
+    - New documents are dispatched immediately, with at most
+      `max_concurrency` documents being extracted at once. There is no
+      multi-document prompt, so holding requests back to batch them would
+      only add latency.
+
+    Endpoints: POST /v1/fnol with {"text": ..., "doc_id": ...}, GET /metrics
+    (Prometheus text with service latency p50/p99 and the `Metrics` of the
+    GPT) and GET /health.
+
+    Usage:
+        with FNOLService(make_gpt, port=8080) as service:
+            ...
+    """
+
+    QUANTILES = (0.5, 0.99)
+
+    def __init__(
+        self,
+        gpt_factory: Callable[[], AsyncGPT],
+        host: str = "127.0.0.1",
+        port: int = 8080,
+        max_concurrency: int = 32,
+        request_timeout: float = 300.0,
+    ):
+        self.gpt_factory = gpt_factory
+        self.max_concurrency = max_concurrency
+        self.request_timeout = request_timeout
+        self.gpt = None
+        self.requests = 0
+        self.coalesced = 0
+        self.latencies = deque(maxlen=10_000)
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._tasks = set()
+        self._loop = asyncio.new_event_loop()
+        self._loop_thread = None
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._server_thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+
+        return f"http://{host}:{port}"
+
+    async def _setup(self):
+        self.gpt = self.gpt_factory()
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    def start(self) -> "FNOLService":
+        self._loop_thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._loop_thread.start()
+        asyncio.run_coroutine_threadsafe(self._setup(), self._loop).result()
+        self._server_thread = threading.Thread(
+            target=self._server.serve_forever, daemon=True
+        )
+        self._server_thread.start()
+        logger.success(f"FNOL service listening on {self.base_url}")
+
+        return self
+
+    async def _teardown(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self.gpt is not None:
+            # the pooled connections belong to this loop and are closed in it
+            await self.gpt.client.close()
+            if self.gpt.cache is not None:
+                self.gpt.cache.close()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        asyncio.run_coroutine_threadsafe(self._teardown(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop_thread.join()
+
+    def __enter__(self) -> "FNOLService":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    @staticmethod
+    def _key(document: str) -> str:
+        return hashlib.sha256(document.encode("utf-8")).hexdigest()
+
+    async def _extract(self, document: str) -> dict:
+        key = self._key(document)
+        if key in self._inflight:
+            self.coalesced += 1
+            return await asyncio.shield(self._inflight[key])
+
+        future = self._loop.create_future()
+        self._inflight[key] = future
+        try:
+            task = asyncio.create_task(self._run(document, future))
+            # keep a reference, the loop only holds tasks weakly
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            return await asyncio.shield(future)
+        finally:
+            del self._inflight[key]
+
+    async def _run(self, document: str, future: asyncio.Future):
+        async with self._semaphore:
+            try:
+                result = await self.gpt.fde_first_notification_of_loss(document)
+            except Exception as e:
+                logger.exception("Extraction failed")
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+    def extract(self, document: str) -> dict:
+        """Extract the FNOL fields of one document; callable from any thread."""
+        start = time.perf_counter()
+        result = asyncio.run_coroutine_threadsafe(
+            self._extract(document), self._loop
+        ).result(self.request_timeout)
+        with self._lock:
+            self.requests += 1
+            self.latencies.append(time.perf_counter() - start)
+
+        return result
+
+    def to_prometheus(self) -> str:
+        """Service counters and latency quantiles, followed by the GPT's metrics."""
+        with self._lock:
+            latencies = list(self.latencies)
+        lines = [
+            "# HELP fnol_service_requests_total Answered extraction requests.",
+            "# TYPE fnol_service_requests_total counter",
+            f"fnol_service_requests_total {self.requests}",
+            "# HELP fnol_service_coalesced_total Requests served by an identical in-flight one.",
+            "# TYPE fnol_service_coalesced_total counter",
+            f"fnol_service_coalesced_total {self.coalesced}",
+            "# HELP fnol_service_latency_seconds Latency of extraction requests.",
+            "# TYPE fnol_service_latency_seconds summary",
+        ]
+        for q in self.QUANTILES:
+            lines.append(
+                f"fnol_service_latency_seconds{{{prometheus_labels(quantile=q)}}} "
+                f"{quantile(latencies, q)}"
+            )
+        lines.append(f"fnol_service_latency_seconds_sum {sum(latencies)}")
+        lines.append(f"fnol_service_latency_seconds_count {len(latencies)}")
+        text = "\n".join(lines) + "\n"
+        if self.gpt is not None and self.gpt.metrics is not None:
+            text += self.gpt.metrics.to_prometheus()
+
+        return text
+
+    def _handler(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status: int, payload: bytes, content_type: str):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _send_json(self, status: int, body: dict):
+                payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+                self._send(status, payload, "application/json")
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if self.path != "/v1/fnol":
+                    self._send_json(404, {"error": f"Unknown {self.path}"})
+                    return
+                try:
+                    request = json.loads(body)
+                    document = request["text"]
+                except (ValueError, KeyError, TypeError):
+                    self._send_json(400, {"error": "Expected JSON with a 'text' field"})
+                    return
+                try:
+                    result = service.extract(document)
+                except Exception as e:
+                    self._send_json(502, {"error": str(e)})
+                    return
+                self._send_json(200, {**result, "doc_id": request.get("doc_id")})
+
+            def do_GET(self):
+                if self.path == "/metrics":
+                    self._send(
+                        200,
+                        service.to_prometheus().encode("utf-8"),
+                        "text/plain; version=0.0.4",
+                    )
+                elif self.path == "/health":
+                    self._send_json(200, {"status": "ok"})
+                else:
+                    self._send_json(404, {"error": f"Unknown {self.path}"})
+
+        return Handler
+
+
+def default_rate_limiter() -> RateLimiter:
+    """`RateLimiter` with the limits used in main.py."""
+    return RateLimiter(
+        {
+            "gpt-4-turbo": ModelLimits(requests_per_minute=500, tokens_per_minute=300_000),
+            "gpt-3.5-turbo-0125": ModelLimits(
+                requests_per_minute=3_500, tokens_per_minute=1_000_000
+            ),
+        }
+    )
+
+
+def default_gpt_factory(base_url: str | None = None) -> Callable[[], AsyncGPT]:
+    """Factory for the service's `AsyncGPT` with the limits used in main.py."""
+    load_dotenv(find_dotenv())
+    api_key = os.getenv("OPENAI_API_KEY", "mock" if base_url else None)
+
+    def make() -> AsyncGPT:
+        clients = ClientFactory(
+            ClientConfig(max_retries=0), api_key=api_key, base_url=base_url
+        )
+
+        return AsyncGPT(
+            client=clients.async_openai(),
+            cache=ResponseCache("llm_cache.sqlite"),
+            rate_limiter=default_rate_limiter(),
+            metrics=Metrics(),
+            form_parser=True,
+        )
+
+    return make
+
+
+def main(argv: List[str] | None = None):
+    parser = argparse.ArgumentParser(description="FNOL extraction service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--base-url", help="OpenAI-compatible endpoint, e.g. a mock")
+    parser.add_argument("--max-concurrency", type=int, default=32)
+    args = parser.parse_args(argv)
+
+    service = FNOLService(
+        default_gpt_factory(args.base_url),
+        host=args.host,
+        port=args.port,
+        max_concurrency=args.max_concurrency,
+    )
+    with service:
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            logger.info("Shutting down")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+from bench import compare
+
+BASELINE = {"fnol": {"docs_per_sec": 20.0, "latency_p95": 0.5, "peak_rss_mb": 150.0}}
+
+
+def test_same_results_pass():
+    assert compare(BASELINE, BASELINE) == []
+
+
+def test_larger_peak_rss_fails():
+    results = {"fnol": {**BASELINE["fnol"], "peak_rss_mb": 200.0}}
+
+    regressions = compare(results, BASELINE)
+
+    assert len(regressions) == 1
+    assert "peak RSS 200 MB" in regressions[0]
+
+
+def test_peak_rss_within_memory_tolerance_passes():
+    results = {"fnol": {**BASELINE["fnol"], "peak_rss_mb": 160.0}}
+
+    assert compare(results, BASELINE, memory_tolerance=0.1) == []
@@ -0,0 +1,33 @@
+import numpy as np
+
+from checkpoint import Checkpoint
+
+
+def test_resumes_only_with_the_same_config(tmp_path):
+    with Checkpoint(tmp_path, config={"date_mode": "reasoning"}) as checkpoint:
+        checkpoint.write({"doc_id": "a", "date": "01.03.2024"})
+
+    assert Checkpoint(tmp_path, config={"date_mode": "reasoning"}).done == {"a"}
+    assert Checkpoint(tmp_path, config={"date_mode": "strict"}).done == set()
+
+
+def test_compacted_run_is_not_resumed(tmp_path):
+    checkpoint = Checkpoint(tmp_path, config={"date_mode": "reasoning"})
+    checkpoint.write({"doc_id": "a", "date": "01.03.2024"})
+    path = checkpoint.compact()
+
+    assert path.parent == tmp_path
+    assert path.read_text(encoding="utf-8").count("\n") == 1
+    assert Checkpoint(tmp_path, config={"date_mode": "reasoning"}).done == set()
+
+
+def test_numpy_doc_ids_are_resumed(tmp_path):
+    doc_id = np.int64(42)
+    with Checkpoint(tmp_path) as checkpoint:
+        checkpoint.write({"doc_id": doc_id, "date": None})
+
+    checkpoint = Checkpoint(tmp_path)
+    assert checkpoint.pending([(doc_id, "text"), (np.int64(7), "text")]) == [
+        (7, "text")
+    ]
+    assert [result["doc_id"] for result in checkpoint.results()] == ["42"]
@@ -0,0 +1,37 @@
+import numpy as np
+
+from claims import ClaimComparison, ClaimTable
+
+
+def claims(doc_id, sd_urs_art):
+    return ClaimTable(
+        doc_id=doc_id,
+        schaden_objekt=["Gebäude"] * len(doc_id),
+        schaden_typ=["LW"] * len(doc_id),
+        sd_urs_art=sd_urs_art,
+        schaden_datum=[None] * len(doc_id),
+    )
+
+
+def test_int_and_float_labels_match_string_predictions():
+    labels = claims([1, 2, 3], np.array([1, 2, np.nan]))
+    predictions = claims([1, 2, 3], ["1", "1", None])
+
+    comparison = predictions.compare(labels)
+
+    assert comparison.masks["sd_urs_art"].tolist() == [True, False, True]
+    matrix = comparison.confusion["sd_urs_art"]
+    assert list(matrix.index) == ["None", "1", "2"]
+    assert matrix.index.is_unique and matrix.columns.is_unique
+
+
+def test_combine_adds_up_batches():
+    first = claims([1, 2], ["1", "2"]).compare(claims([1, 2], [1, 1]))
+    second = claims([3], ["4"]).compare(claims([3], [4]))
+
+    combined = ClaimComparison.combine([first, second, first + second])
+
+    assert len(combined.masks) == 6
+    assert combined.masks["sd_urs_art"].sum() == 4
+    assert combined.confusion["sd_urs_art"].loc["1", "1"] == 2
+    assert combined.confusion["sd_urs_art"].loc["4", "4"] == 2
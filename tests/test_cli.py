@@ -0,0 +1,49 @@
+import json
+
+import cli
+from mock_openai import MockOpenAI
+
+
+def test_streams_results_without_writing_a_cache(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    closed = []
+    aclose = cli.ClientFactory.aclose
+
+    async def record_aclose(self):
+        await aclose(self)
+        closed.append(self)
+
+    monkeypatch.setattr(cli.ClientFactory, "aclose", record_aclose)
+    source = tmp_path / "in.jsonl"
+    lines = [json.dumps({"doc_id": str(i), "text": "Rohrbruch"}) for i in range(3)]
+    source.write_text("\n".join(lines), encoding="utf-8")
+
+    with MockOpenAI() as mock:
+        argv = [str(source), "-o", "out.jsonl", "--base-url", mock.base_url]
+        assert cli.main(argv) == 0
+
+    results = [json.loads(line) for line in open("out.jsonl", encoding="utf-8")]
+    assert sorted(result["doc_id"] for result in results) == ["0", "1", "2"]
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["in.jsonl", "out.jsonl"]
+    assert len(closed) == 1
+
+
+def test_cache_is_opt_in(tmp_path):
+    source = tmp_path / "in.jsonl"
+    source.write_text(json.dumps({"doc_id": "1", "text": "Sturm"}), encoding="utf-8")
+    cache = tmp_path / "cache.sqlite"
+
+    with MockOpenAI() as mock:
+        cli.main(
+            [
+                str(source),
+                "-o",
+                str(tmp_path / "out.jsonl"),
+                "--base-url",
+                mock.base_url,
+                "--cache",
+                str(cache),
+            ]
+        )
+
+    assert cache.exists()
@@ -0,0 +1,86 @@
+import re
+
+import pytest
+
+from dates import find_anchor, resolve_claims_date
+from gpt import GPT
+
+# Friday, 22.03.2024
+HEADER = (
+    "Von: Anna Berg <anna@example.de>\n"
+    "Gesendet: Freitag, 22. März 2024 16:25\n"
+    "Betreff: Schaden\n"
+    "Eingangszeitpunkt: 22.03.2024 17:14:12\n"
+)
+
+
+def prompt_examples():
+    """Documents of the fixed examples in the reasoning date prompt."""
+    instructions = GPT(client=None).claims_date_request("")["messages"][-1]["content"]
+
+    return re.findall(r"<example_\d>(.*?)\{\{", instructions, re.DOTALL)
+
+
+def test_anchor_is_the_receipt_date():
+    assert str(find_anchor(HEADER)) == "2024-03-22"
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("Vorgestern ist im Keller ein Rohr geplatzt.", "20.03.2024"),
+        ("Gestern hat der Sturm das Dach beschädigt.", "21.03.2024"),
+        ("Letzte Woche Dienstag wurde das Fahrrad gestohlen.", "12.03.2024"),
+        ("Am Mittwoch wurde das Fahrrad gestohlen.", "20.03.2024"),
+        ("Vor drei Tagen ist die Scheibe gerissen.", "19.03.2024"),
+        ("Am Wochenende hat es gebrannt.", "16.03.2024"),
+        ("Der Sturmschaden kurz vor Ostern.", None),
+        ("Vorgestern am 20.03.2024 ist Wasser ausgetreten.", "20.03.2024"),
+    ],
+)
+def test_relative_dates(text, expected):
+    assert resolve_claims_date(HEADER + text) == expected
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("In der Nacht vom 19. auf den 20.03.2024 wurde eingebrochen.", "19.03.2024"),
+        ("In der Nacht vom 21./22.03.2024 wurde eingebrochen.", "21.03.2024"),
+        ("Am 20. oder 21. März ist der Schaden passiert.", "20.03.2024"),
+        ("Schaden am 02.03.2024 und erneut am 15.03.2024.", None),
+    ],
+)
+def test_first_of_consecutive_dates(text, expected):
+    assert resolve_claims_date(HEADER + text) == expected
+
+
+def test_date_without_year_before_a_january_anchor():
+    document = "Eingangszeitpunkt: 03.01.2024 09:12:00\nAm 28.12. platzte ein Rohr."
+
+    assert resolve_claims_date(document) == "28.12.2023"
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("Schaden am 02.03.2024, Vertrag seit 01.01.2020.", "02.03.2024"),
+        ("Bezugnehmend auf Ihr Schreiben vom 15.03.2024 melde ich den Schaden.", None),
+        ("Besichtigung des Sturmschadens am 20.03.2024 möglich.", None),
+        ("Ich bin am Montag erreichbar.", None),
+        (
+            "Der Wasserschaden ist am Mittwoch passiert, ich bin am Montag erreichbar.",
+            "20.03.2024",
+        ),
+        ("Die Rechnung vom 10.03.2024 liegt bei.", None),
+    ],
+)
+def test_contract_letter_and_appointment_dates_are_ignored(text, expected):
+    assert resolve_claims_date(HEADER + text) == expected
+
+
+def test_prompt_examples_are_left_to_the_model():
+    examples = prompt_examples()
+
+    assert len(examples) == 2
+    assert [resolve_claims_date(example) for example in examples] == [None, None]
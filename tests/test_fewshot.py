@@ -0,0 +1,43 @@
+import pandas as pd
+
+from fewshot import FewShotSelector
+from gpt import GPT
+
+FILLER = "Sehr geehrte Damen und Herren, anbei die Unterlagen zum Vorgang. " * 20
+
+
+def test_date_example_is_cut_around_its_date():
+    document = FILLER * 2 + "Am 21.03.2024 platzte das Rohr im Keller. " + FILLER
+    selector = FewShotSelector(
+        [document, "Sturm Dach Ziegel"], {"date": ["21.03.2024", "02.03.2024"]}
+    )
+
+    examples = selector.examples("date", "Rohr im Keller geplatzt Unterlagen")
+
+    block = examples.split("</example_1>")[0]
+    assert "Am 21.03.2024 platzte das Rohr" in block
+    assert block.count("21.03.2024") == 2
+
+
+def test_cut_keeps_the_date_or_gives_up():
+    document = "Wasser " + " " * 2000 + "Am 21.03.2024 platzte das Rohr."
+
+    assert FewShotSelector._cut(document, 20, "21.03.2024") == "... Am 21.03.2024 ..."
+    assert FewShotSelector._cut(document, 5, "21.03.2024") is None
+    assert FewShotSelector._cut(" " * 400, 100) is None
+
+
+def test_cause_examples_need_the_claims_type():
+    df = pd.DataFrame(
+        {
+            "text": ["Hagel auf dem Dach", "Rohr geplatzt"],
+            "sd_urs_art": ["7", "1"],
+            "schadentag": ["01.03.2024", "02.03.2024"],
+        }
+    )
+
+    selector = FewShotSelector.from_frame(df, cause_mapping=GPT.cause_mapping)
+
+    assert "cause" not in selector.labels
+    assert selector.labels["date"] == ["01.03.2024", "02.03.2024"]
+    assert selector.examples("cause", "Hagel", claims_type="ST") == ""
@@ -0,0 +1,230 @@
+import random
+
+import pandas as pd
+import pytest
+
+from evaluation import group_sd_urs_art
+
+
+def legacy_group_sd_urs_art(df: pd.DataFrame) -> pd.DataFrame:
+    """group_sd_urs_art before it was vectorized, kept as the reference."""
+    list_sub_dfs = [
+        y
+        for x, y in df.groupby(
+            ["sd_typ_kennung", "schaden_objekt"], as_index=False
+        )
+    ]
+
+    result_df_list = []
+
+    for sub_df in list_sub_dfs:
+        if sub_df["sd_typ_kennung"].iloc[0] == "LW":
+            sub_df.sd_urs_art = sub_df.sd_urs_art.astype(str)
+            sub_df.sd_urs_art = sub_df.sd_urs_art.apply(lambda x: x[0])
+            sub_df = sub_df.replace(
+                {"sd_urs_art": {r"^[^0249]*$": "0"}}, regex=True
+            )
+            result_df_list.append(sub_df)
+
+        elif sub_df["sd_typ_kennung"].iloc[0] == "ST":
+            sub_df.sd_urs_art = sub_df.sd_urs_art.astype(str)
+            sub_df["sd_urs_art"] = (
+                sub_df["sd_urs_art"]
+                .apply(lambda x: x[0] if x not in ["10", "19"] else x)
+                .apply(
+                    lambda x: x
+                    if x in ["0", "1", "10", "19", "4", "7"]
+                    else "1"
+                )
+                .apply(lambda x: "10" if x == "1" else x)
+            )
+            result_df_list.append(sub_df)
+
+        elif sub_df["sd_typ_kennung"].iloc[0] == "EL":
+            sub_df.sd_urs_art = sub_df.sd_urs_art.astype(str)
+            sub_df.sd_urs_art = sub_df.sd_urs_art.apply(lambda x: x[0])
+            sub_df = sub_df.replace(
+                {"sd_urs_art": {r"^.*[^2]$": "0"}}, regex=True, inplace=False
+            )
+            result_df_list.append(sub_df)
+
+        elif sub_df["sd_typ_kennung"].iloc[0] == "ED":
+            sub_df["sd_urs_art"] = (
+                sub_df["sd_urs_art"]
+                .astype(str)
+                .apply(lambda x: x[0] if x not in ["70", "79"] else x)
+                .apply(lambda x: x if x in ["0", "7", "70", "79"] else "0")
+                .apply(lambda x: "70" if x == "7" else x)
+            )
+
+            result_df_list.append(sub_df)
+
+        elif (
+            sub_df["sd_typ_kennung"].iloc[0] == "GL"
+            and sub_df["schaden_objekt"].iloc[0] == "GL"
+        ):
+            sub_df.sd_urs_art = sub_df.sd_urs_art.astype(str)
+            sub_df["sd_urs_art"] = sub_df["sd_urs_art"].replace("9", "09")
+            sub_df["sd_urs_art"] = sub_df["sd_urs_art"].replace(
+                {"^(?!09$|11$|12$).*$": "00"}, regex=True, inplace=False
+            )
+            result_df_list.append(sub_df)
+
+        elif sub_df["sd_typ_kennung"].iloc[0] == "GL" and (
+            sub_df["schaden_objekt"].iloc[0] in ["HR", "WG"]
+        ):
+            sub_df.sd_urs_art = sub_df.sd_urs_art.astype(str)
+            sub_df["sd_urs_art"] = "00"
+            result_df_list.append(sub_df)
+
+        elif sub_df["sd_typ_kennung"].iloc[0] == "FE":
+            sub_df.sd_urs_art = sub_df.sd_urs_art.astype(str)
+            sub_df.sd_urs_art = sub_df.sd_urs_art.apply(lambda x: x[0]).apply(
+                lambda x: x if x in ["6", "9"] else "0"
+            )
+
+            result_df_list.append(sub_df)
+
+        elif (
+            sub_df["sd_typ_kennung"].iloc[0] == "VK"
+            or sub_df["sd_typ_kennung"].iloc[0] == "TK"
+        ):
+            sd_typ_kennung = sub_df["sd_typ_kennung"].iloc[0]
+            sub_df.sd_urs_art = sub_df.sd_urs_art.astype(int)
+            categories = {
+                "VK": {1: [51], 2: [562], 3: [564, 561, 57, 563, 565]},
+                "TK": {
+                    77: [77],
+                    741: [741, 742, 743, 744],
+                    782: [782],
+                    751: [751],
+                    733: [
+                        71,
+                        78,
+                        781,
+                        72,
+                        79,
+                        791,
+                        76,
+                        753,
+                        731,
+                        732,
+                        752,
+                        733,
+                        734,
+                        771,
+                        783,
+                        792,
+                        793,
+                    ],
+                },
+            }
+
+            categories_mapping = {
+                **{
+                    "VK": {
+                        val: k
+                        for k, l in categories["VK"].items()
+                        for val in l
+                    }
+                },
+                **{
+                    "TK": {
+                        val: k
+                        for k, l in categories["TK"].items()
+                        for val in l
+                    }
+                },
+            }
+
+            sub_df["sd_urs_art"] = sub_df["sd_urs_art"].map(
+                categories_mapping[sd_typ_kennung]
+            )
+            sub_df.sd_urs_art = sub_df.sd_urs_art.astype(str)
+            result_df_list.append(sub_df)
+        else:
+            result_df_list.append(sub_df)
+
+    result_df = pd.concat(result_df_list)
+    result_df = result_df.reset_index(drop=True)
+
+    return result_df
+
+SD_URS_ART_VALUES = {
+    "LW": ["0", "2", "21", "4", "9", "5", "13", 2, 7],
+    "ST": ["10", "19", "1", "4", "45", "7", "8", 19, 3],
+    "EL": ["2", "21", "3", 2, 5],
+    "ED": ["70", "79", "7", "71", "0", "5", 70],
+    "GL": ["9", "09", "11", "12", "13", "0", 9],
+    "FE": ["6", "9", "61", "1", 6],
+    "VK": [51, 562, 564, 57, "51"],
+    "TK": [77, 741, 742, 782, 751, 71, 793],
+    "KH": ["x", 1],
+}
+
+
+def mixed_frame(rows: int, seed: int, unmapped: bool) -> pd.DataFrame:
+    """Claims of every type with int and str values, missing keys and, if
+    `unmapped`, VK/TK values without a category."""
+    rng = random.Random(seed)
+    values = {key: list(value) for key, value in SD_URS_ART_VALUES.items()}
+    if unmapped:
+        values["VK"].append(99)
+        values["TK"].append(5)
+    records = []
+    for doc_id in range(rows):
+        sd_typ_kennung = rng.choice(list(values) + [None])
+        schaden_objekt = rng.choice(
+            ["KF", "KH"] if sd_typ_kennung == "VK" else ["GL", "HR", "WG", "KF", None]
+        )
+        records.append(
+            {
+                "doc_id": doc_id,
+                "sd_typ_kennung": sd_typ_kennung,
+                "schaden_objekt": schaden_objekt,
+                "sd_urs_art": rng.choice(values.get(sd_typ_kennung, ["1"])),
+                "text": "t",
+            }
+        )
+
+    return pd.DataFrame(records)
+
+
+@pytest.mark.parametrize("seed, unmapped", [(1, False), (2, True), (3, True)])
+def test_matches_legacy_implementation(seed, unmapped):
+    df = mixed_frame(5_000, seed, unmapped)
+
+    expected = legacy_group_sd_urs_art(df.copy())
+    result = group_sd_urs_art(df)
+
+    # the legacy version returned the rows ordered by group keys
+    assert list(result.index) == sorted(result.index)
+    result = result.sort_values(
+        ["sd_typ_kennung", "schaden_objekt"], kind="stable"
+    ).reset_index(drop=True)
+    pd.testing.assert_frame_equal(result.astype(object), expected.astype(object))
+
+
+def test_does_not_mutate_input():
+    df = mixed_frame(500, 4, True)
+    before = df.copy()
+
+    group_sd_urs_art(df)
+
+    pd.testing.assert_frame_equal(df, before)
+
+
+@pytest.mark.parametrize("sd_typ_kennung", ["VK", "TK"])
+def test_missing_sd_urs_art_raises(sd_typ_kennung):
+    df = pd.DataFrame(
+        {
+            "doc_id": [1, 2],
+            "sd_typ_kennung": [sd_typ_kennung, sd_typ_kennung],
+            "schaden_objekt": ["KF", "KF"],
+            "sd_urs_art": [51, None],
+            "text": ["t", "t"],
+        }
+    )
+
+    with pytest.raises(ValueError, match="Missing sd_urs_art"):
+        group_sd_urs_art(df)
@@ -0,0 +1,6 @@
+from bench import IMPORT_BUDGETS_MS, check_import_budgets
+
+
+def test_inference_modules_import_within_budget():
+    """Cold imports of the inference path stay fast and free of pandas/NumPy."""
+    assert check_import_budgets(IMPORT_BUDGETS_MS) == []
@@ -0,0 +1,53 @@
+import pandas as pd
+
+from main import context
+from normalize import normalize_document, normalize_texts
+
+FORWARDED = (
+    "Von: Anna Berg <anna@example.de>\n"
+    "Gesendet: Montag, 22. März 2024 16:25\n"
+    "Betreff: Sturmschaden\n"
+    "Der Regenhut ist weggeweht worden.\n"
+    "Von: Anna Berg <anna@example.de>\n"
+    "Betreff: Sturmschaden\n"
+    "Bitte um Regulierung."
+)
+
+
+def test_keeps_body_line_with_kopie_an():
+    """Body text such as "Kopie an uns weiter." is not taken for a Cc header."""
+    normalized = normalize_document(context)
+
+    assert "Kopie an uns weiter." in normalized
+    assert "Vorgestern am 25.01.2024 gab es ein Sturm" in normalized
+
+
+def test_drops_reply_to_and_cc_headers():
+    document = "Bitte Antwort an info@example.de\nCc: Kai Ott\nKopie an: Eva\nText"
+
+    assert normalize_document(document) == "Text"
+
+
+def test_keeps_first_header_and_drops_later_copies():
+    normalized = normalize_document(FORWARDED)
+
+    assert normalized.splitlines() == [
+        "Von: Anna Berg <anna@example.de>",
+        "Gesendet: Montag, 22. März 2024 16:25",
+        "Betreff: Sturmschaden",
+        "Der Regenhut ist weggeweht worden.",
+        "Bitte um Regulierung.",
+    ]
+
+
+def test_drops_phone_numbers_written_with_colon():
+    assert normalize_document("Tel: 0173/1286423\nTel. 0173 128642") == ""
+
+
+def test_vectorized_matches_single_document():
+    texts = pd.Series([FORWARDED, context])
+
+    assert normalize_texts(texts).tolist() == [
+        normalize_document(FORWARDED),
+        normalize_document(context),
+    ]
@@ -0,0 +1,69 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from async_gpt import AsyncGPT
+from gpt import GPT
+from response_cache import ResponseCache
+from router import ModelRouter
+
+ROUTES = {"type": ("small", "large")}
+
+
+class Completions:
+    """Answers the type request with a fixed content per model."""
+
+    def __init__(self, contents):
+        self.contents = contents
+        self.models = []
+
+    def respond(self, request):
+        self.models.append(request["model"])
+        message = SimpleNamespace(content=self.contents[request["model"]])
+
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+    def create(self, **request):
+        return self.respond(request)
+
+
+class AsyncCompletions(Completions):
+    async def create(self, **request):
+        return self.respond(request)
+
+
+def client(completions):
+    return SimpleNamespace(chat=SimpleNamespace(completions=completions))
+
+
+@pytest.mark.parametrize("invalid", [None, "[1, 2]", '"LW"', "{}", "kein JSON"])
+def test_unparsable_answer_escalates(invalid, tmp_path):
+    completions = Completions({"small": invalid, "large": json.dumps({"Kategorie": "LW"})})
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+    gpt = GPT(client=client(completions), router=ModelRouter(ROUTES), cache=cache)
+
+    assert gpt.get_claims_type("Rohrbruch im Keller") == "LW"
+    assert completions.models == ["small", "large"]
+
+
+@pytest.mark.parametrize("invalid", [None, "[1, 2]"])
+def test_unparsable_answer_escalates_async(invalid):
+    completions = AsyncCompletions(
+        {"small": invalid, "large": json.dumps({"Kategorie": "LW"})}
+    )
+    gpt = AsyncGPT(client=client(completions), router=ModelRouter(ROUTES))
+
+    assert asyncio.run(gpt.get_claims_type("Rohrbruch im Keller")) == "LW"
+    assert completions.models == ["small", "large"]
+
+
+def test_refusal_is_not_cached(tmp_path):
+    completions = Completions({"small": None})
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+    gpt = GPT(client=client(completions), cache=cache)
+    request = {**gpt.claims_type_request("Rohrbruch im Keller"), "model": "small"}
+
+    assert gpt._send("type", request) is None
+    assert cache.get("type", request) is None
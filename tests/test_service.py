@@ -0,0 +1,33 @@
+import json
+import urllib.request
+
+from async_gpt import AsyncGPT
+from clients import ClientConfig, ClientFactory
+from metrics import Metrics
+from mock_openai import MockOpenAI
+from service import FNOLService
+
+
+def test_stop_closes_the_client_pool():
+    with MockOpenAI() as mock:
+
+        def make() -> AsyncGPT:
+            clients = ClientFactory(
+                ClientConfig(max_retries=0), api_key="mock", base_url=mock.base_url
+            )
+            return AsyncGPT(client=clients.async_openai(), metrics=Metrics())
+
+        with FNOLService(make, port=0) as service:
+            body = {"text": "Rohrbruch im Keller", "doc_id": "1"}
+            request = urllib.request.Request(
+                f"{service.base_url}/v1/fnol",
+                data=json.dumps(body).encode("utf-8"),
+                method="POST",
+            )
+            with urllib.request.urlopen(request) as response:
+                assert json.load(response)["doc_id"] == "1"
+            with urllib.request.urlopen(f"{service.base_url}/metrics") as response:
+                metrics = response.read().decode("utf-8")
+            assert 'fnol_service_latency_seconds{quantile="0.5"}' in metrics
+
+        assert service.gpt.client.is_closed()